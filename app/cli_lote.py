@@ -0,0 +1,133 @@
+# app/cli_lote.py
+# Limpieza por lotes sin Streamlit: aplica una receta a todos los archivos de una carpeta.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m app.cli_lote receta.json datos/ salida/ --patron "*.csv" --procesos 4
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from app.utils.data_loader import cargar_datos_desde_ruta
+from app.utils.limpieza_por_bloques import limpiar_archivo_por_bloques
+from app.utils.recetas import aplicar_receta, cargar_receta
+
+FORMATOS_SALIDA = ['csv', 'parquet']
+NOMBRE_REPORTE = 'reporte_lote'
+
+
+def _ruta_salida(ruta_entrada, dir_salida, formato):
+    return Path(dir_salida) / f"limpio_{Path(ruta_entrada).stem}.{formato}"
+
+
+def procesar_archivo(ruta_entrada, receta, dir_salida, formato='csv', por_bloques=False, motor='pandas'):
+    """
+    Limpia un archivo con la receta y escribe el resultado. Se ejecuta en un proceso
+    trabajador, así que nunca lanza excepciones: los errores quedan en el registro del reporte.
+    """
+    inicio = time.perf_counter()
+    ruta_salida = _ruta_salida(ruta_entrada, dir_salida, formato)
+    registro = {'archivo': str(ruta_entrada), 'salida': str(ruta_salida), 'estado': 'ok', 'mensaje': '',
+                'filas_entrada': None, 'filas_salida': None, 'columnas': None, 'codigos_faltantes': None}
+    try:
+        if por_bloques:
+            if receta['claves_duplicados']:
+                raise ValueError("La deduplicación por clave no está disponible en la limpieza por bloques.")
+            # Archivos más grandes que la memoria: dos pasadas por bloques
+            resumen = limpiar_archivo_por_bloques(
+                ruta_entrada, ruta_salida,
+                receta['opcion_nulos_num'], receta['opcion_nulos_cat'], receta['eliminar_duplicados'],
+                receta['columnas_a_mantener'], receta['normalizar_faltantes']
+            )
+            registro.update({'filas_entrada': resumen['filas_leidas'], 'filas_salida': resumen['filas_escritas'],
+                             'codigos_faltantes': sum(resumen['codigos_faltantes'].values())})
+        else:
+            df, msg = cargar_datos_desde_ruta(ruta_entrada)
+            if df is None:
+                raise ValueError(msg)
+            # Igual que al subir un archivo en la app: nombres de columna en minúsculas
+            df.columns = [str(col).lower() for col in df.columns]
+            df_limpio = aplicar_receta(df, receta, motor=motor)
+            if formato == 'parquet':
+                df_limpio.to_parquet(ruta_salida, index=False)
+            else:
+                df_limpio.to_csv(ruta_salida, index=False)
+            registro.update({'filas_entrada': len(df), 'filas_salida': len(df_limpio), 'columnas': df_limpio.shape[1],
+                             'codigos_faltantes': sum(df_limpio.attrs.get('codigos_faltantes', {}).values())})
+    except Exception as e:
+        registro.update({'estado': 'error', 'mensaje': f"{type(e).__name__}: {e}", 'salida': ''})
+    registro['segundos'] = round(time.perf_counter() - inicio, 3)
+    return registro
+
+
+def ejecutar_lote(receta, archivos, dir_salida, formato='csv', procesos=None, por_bloques=False, motor='pandas'):
+    """Procesa los archivos en paralelo (un proceso por archivo) y devuelve el reporte como DataFrame."""
+    Path(dir_salida).mkdir(parents=True, exist_ok=True)
+    registros = []
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        futuros = {
+            ejecutor.submit(procesar_archivo, str(ruta), receta, dir_salida, formato, por_bloques, motor): ruta
+            for ruta in archivos
+        }
+        for futuro in as_completed(futuros):
+            registro = futuro.result()
+            registros.append(registro)
+            print(f"[{registro['estado']:>5}] {registro['archivo']} ({registro['segundos']} s) {registro['mensaje']}")
+    reporte = pd.DataFrame(registros)
+    return reporte.sort_values('archivo').reset_index(drop=True) if len(reporte) else reporte
+
+
+def escribir_reporte(reporte, receta, dir_salida, argumentos):
+    """Guarda el reporte por archivo (CSV) y un resumen de la corrida con la receta usada (JSON)."""
+    reporte.to_csv(Path(dir_salida) / f"{NOMBRE_REPORTE}.csv", index=False)
+    resumen = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'argumentos': argumentos,
+        'receta': receta,
+        'archivos': int(len(reporte)),
+        'correctos': int((reporte['estado'] == 'ok').sum()) if len(reporte) else 0,
+        'errores': int((reporte['estado'] == 'error').sum()) if len(reporte) else 0,
+        'segundos_total': float(reporte['segundos'].sum()) if len(reporte) else 0.0,
+    }
+    (Path(dir_salida) / f"{NOMBRE_REPORTE}.json").write_text(
+        json.dumps(resumen, ensure_ascii=False, indent=2), encoding='utf-8'
+    )
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aplica una receta de limpieza a todos los archivos de una carpeta.")
+    parser.add_argument('receta', help="Archivo JSON de la receta (descargable desde la página de limpieza).")
+    parser.add_argument('entrada', help="Carpeta con los archivos a limpiar.")
+    parser.add_argument('salida', help="Carpeta donde se escriben los archivos limpios y el reporte.")
+    parser.add_argument('--patron', default='*.csv', help="Patrón de archivos a procesar (por defecto: *.csv).")
+    parser.add_argument('--formato', choices=FORMATOS_SALIDA, default='csv', help="Formato de salida.")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos en paralelo (por defecto: núcleos disponibles).")
+    parser.add_argument('--motor', choices=['pandas', 'polars', 'auto'], default='pandas', help="Motor de ejecución.")
+    parser.add_argument('--por-bloques', action='store_true',
+                        help="Limpia por bloques para archivos más grandes que la memoria (sin opciones por grupo).")
+    args = parser.parse_args(argv)
+
+    receta = cargar_receta(args.receta)
+    archivos = sorted(p for p in Path(args.entrada).glob(args.patron) if p.is_file())
+    if not archivos:
+        print(f"No hay archivos que coincidan con '{args.patron}' en {args.entrada}.", file=sys.stderr)
+        return 1
+
+    procesos = args.procesos or min(len(archivos), os.cpu_count() or 1)
+    print(f"Procesando {len(archivos)} archivos con {procesos} procesos...")
+    reporte = ejecutar_lote(receta, archivos, args.salida, args.formato, procesos, args.por_bloques, args.motor)
+    resumen = escribir_reporte(reporte, receta, args.salida, vars(args))
+    print(f"Listo: {resumen['correctos']} correctos, {resumen['errores']} con error. Reporte en {args.salida}")
+    return 1 if resumen['errores'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # app/components/data_selector.py
 import streamlit as st
+from app.visualization.cache_figuras import obtener_cache_figuras
 
 def select_active_dataset():
     st.markdown("---")
@@ -13,8 +14,9 @@ def select_active_dataset():
         dataset_activo_nombre = st.radio("Datasets Cargados:", options=nombres_datasets, horizontal=True, key='dataset_selector')
     with col2:
         if st.button(f"❌ Cerrar '{dataset_activo_nombre}'"):
+            obtener_cache_figuras().descartar_dataset(st.session_state.datasets[dataset_activo_nombre].get('id_cache'))
             del st.session_state.datasets[dataset_activo_nombre]
-            st.experimental_rerun()
+            st.rerun()
     if dataset_activo_nombre not in st.session_state.datasets:
         st.stop()
     return dataset_activo_nombre, st.session_state.datasets[dataset_activo_nombre]
\ No newline at end of file
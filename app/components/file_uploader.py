@@ -3,6 +3,7 @@
 
 import streamlit as st
 from app.utils.data_loader import cargar_datos
+from app.utils.codebooks import detectar_año
 
 def display_file_uploader():
     """Muestra una interfaz de carga de archivos simple y directa."""
@@ -30,10 +31,12 @@ def display_file_uploader():
                     # Normalizamos los nombres de columna a minúsculas
                     df.columns = [col.lower() for col in df.columns]
                     
-                    # Guardamos solo los DataFrames en el estado
+                    # Guardamos los DataFrames y el año de la encuesta (para elegir su codebook)
                     st.session_state.datasets[archivo.name] = {
                         'df_original': df,
-                        'df_limpio': df.copy()
+                        'df_limpio': df.copy(),
+                        'año': detectar_año(df),
+                        'version': 0  # versión 0 del historial de limpieza = datos originales
                     }
                 else:
                     st.error(f"Error al cargar '{archivo.name}': {msg}")
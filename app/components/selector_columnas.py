@@ -0,0 +1,139 @@
+# app/components/selector_columnas.py
+# Selector de columnas para módulos anchos: estado en un bitset y una sola tabla editable por página.
+
+import fnmatch
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.utils.labels_base import VARIABLE_DESCRIPTIONS, listar_variables_por_categoria
+from app.utils.buscador_variables import buscar_variables
+
+FILAS_POR_PAGINA = 50
+
+
+class SeleccionColumnas:
+    """
+    Columnas marcadas guardadas como bitset (`np.packbits`): un bit por columna,
+    en el orden de `columnas`. Las operaciones en bloque reciben posiciones.
+    """
+
+    def __init__(self, columnas, marcadas=None):
+        self.columnas = list(columnas)
+        self._posicion = {col: i for i, col in enumerate(self.columnas)}
+        self.bits = np.zeros(-(-len(self.columnas) // 8), dtype=np.uint8)
+        self.fijar(self.columnas if marcadas is None else marcadas)
+
+    def _mascara(self):
+        return np.unpackbits(self.bits, count=len(self.columnas)).astype(bool)
+
+    def fijar(self, marcadas):
+        """Reemplaza la selección por las columnas dadas (las que no existan se ignoran)."""
+        mascara = np.zeros(len(self.columnas), dtype=bool)
+        mascara[self.posiciones(marcadas)] = True
+        self.bits = np.packbits(mascara)
+
+    def marcar(self, posiciones, valor=True):
+        mascara = self._mascara()
+        mascara[np.asarray(posiciones, dtype=np.intp)] = valor
+        self.bits = np.packbits(mascara)
+
+    def posiciones(self, columnas):
+        return np.array([self._posicion[c] for c in columnas if c in self._posicion], dtype=np.intp)
+
+    def estado(self, posiciones):
+        """Arreglo booleano con el estado de las posiciones dadas."""
+        return self._mascara()[np.asarray(posiciones, dtype=np.intp)]
+
+    def marcadas(self):
+        """Columnas marcadas, en el orden original."""
+        return [self.columnas[i] for i in np.flatnonzero(self._mascara())]
+
+    def __len__(self):
+        return int(np.unpackbits(self.bits).sum())
+
+
+def posiciones_por_patron(columnas, patron):
+    """Posiciones de las columnas que cumplen un patrón tipo comodín ('p5*', '*$0?'), sin distinguir mayúsculas."""
+    patron = patron.strip().lower()
+    if not patron:
+        return np.arange(len(columnas))
+    return np.array([i for i, col in enumerate(columnas) if fnmatch.fnmatchcase(str(col).lower(), patron)], dtype=np.intp)
+
+
+def posiciones_por_categoria(columnas, categoria):
+    """Posiciones de las columnas que pertenecen a una categoría temática del diccionario."""
+    variables = set(listar_variables_por_categoria().get(categoria, []))
+    return np.array([i for i, col in enumerate(columnas) if str(col).lower() in variables], dtype=np.intp)
+
+
+def mostrar_selector_columnas(columnas, clave, marcadas_iniciales=None):
+    """
+    Muestra el selector y devuelve la `SeleccionColumnas` guardada en la sesión.
+    Búsqueda, categoría y patrón acotan la lista; los botones marcan o desmarcan todo lo
+    filtrado de una vez. Solo se dibuja una página de la lista, sin importar cuántas columnas haya.
+    """
+    clave_estado = f'{clave}_seleccion'
+    if clave_estado not in st.session_state or st.session_state[clave_estado].columnas != list(columnas):
+        st.session_state[clave_estado] = SeleccionColumnas(columnas, marcadas_iniciales)
+        st.session_state[f'{clave}_revision'] = 0
+    seleccion = st.session_state[clave_estado]
+
+    # 1. Filtros: búsqueda (código, descripción o etiquetas), categoría temática y patrón
+    busqueda = st.text_input("🔎 Buscar variable:", key=f'{clave}_buscar')
+    col_categoria, col_patron = st.columns(2)
+    with col_categoria:
+        categoria = st.selectbox("Categoría:", ["(todas)"] + list(listar_variables_por_categoria()), key=f'{clave}_categoria')
+    with col_patron:
+        patron = st.text_input("Patrón (p. ej. p5*):", key=f'{clave}_patron')
+
+    visibles = np.arange(len(seleccion.columnas))
+    if busqueda:
+        visibles = seleccion.posiciones(buscar_variables(busqueda, limite=None, variables=seleccion.columnas))
+    if categoria != "(todas)":
+        visibles = np.intersect1d(visibles, posiciones_por_categoria(seleccion.columnas, categoria))
+    if patron:
+        visibles = np.intersect1d(visibles, posiciones_por_patron(seleccion.columnas, patron))
+    if (busqueda or categoria != "(todas)" or patron) and len(visibles) == 0:
+        st.caption("Sin columnas para ese filtro.")
+
+    # 2. Selección en bloque sobre todo lo filtrado
+    col_marcar, col_desmarcar = st.columns(2)
+    with col_marcar:
+        marcar = st.button(f"✅ Marcar ({len(visibles):,})", key=f'{clave}_marcar', use_container_width=True)
+    with col_desmarcar:
+        desmarcar = st.button(f"⬜ Desmarcar ({len(visibles):,})", key=f'{clave}_desmarcar', use_container_width=True)
+    if marcar or desmarcar:
+        seleccion.marcar(visibles, valor=marcar)
+        # Una revisión nueva descarta las ediciones pendientes de la tabla anterior
+        st.session_state[f'{clave}_revision'] += 1
+
+    # 3. Una página de la lista filtrada como tabla editable
+    paginas = max(1, -(-len(visibles) // FILAS_POR_PAGINA))
+    pagina = 1
+    if paginas > 1:
+        if st.session_state.get(f'{clave}_pagina', 1) > paginas:
+            st.session_state[f'{clave}_pagina'] = paginas
+        pagina = int(st.number_input(f"Página (de {paginas:,}):", min_value=1, max_value=paginas, value=1, step=1, key=f'{clave}_pagina'))
+    en_pagina = visibles[(pagina - 1) * FILAS_POR_PAGINA:pagina * FILAS_POR_PAGINA]
+
+    tabla = pd.DataFrame({
+        'Mantener': seleccion.estado(en_pagina),
+        'Variable': [seleccion.columnas[i] for i in en_pagina],
+        'Descripción': [VARIABLE_DESCRIPTIONS.get(str(seleccion.columnas[i]).lower(), '') for i in en_pagina],
+    })
+    editada = st.data_editor(
+        tabla, hide_index=True, use_container_width=True, height=300,
+        disabled=['Variable', 'Descripción'],
+        key=f"{clave}_tabla_{st.session_state[f'{clave}_revision']}_{pagina}_{hash(tuple(en_pagina.tolist()))}"
+    )
+    # 4. Solo se escriben en el bitset las filas que cambió el usuario
+    cambiadas = editada['Mantener'].to_numpy(dtype=bool) != tabla['Mantener'].to_numpy(dtype=bool)
+    if cambiadas.any():
+        mantener = editada['Mantener'].to_numpy(dtype=bool)
+        seleccion.marcar(en_pagina[cambiadas & mantener], True)
+        seleccion.marcar(en_pagina[cambiadas & ~mantener], False)
+
+    st.caption(f"{len(seleccion):,} de {len(seleccion.columnas):,} columnas marcadas")
+    return seleccion
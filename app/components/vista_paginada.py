@@ -0,0 +1,135 @@
+# app/components/vista_paginada.py
+# Vista previa paginada: solo se envía al navegador la ventana visible (filas x columnas).
+
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+TAMANOS_PAGINA = [25, 50, 100, 250, 500]
+ANCHO_COLUMNAS = 20
+_PATRON_COMPARACION = re.compile(r'^\s*(>=|<=|!=|>|<|=)?\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def mascara_filtro(serie, texto):
+    """
+    Máscara booleana del filtro escrito por el usuario.
+    Columnas numéricas: '5', '>= 10', '< 3.5', '!= 99'. Texto: contiene (sin distinguir mayúsculas).
+    """
+    texto = texto.strip()
+    if not texto:
+        return np.ones(len(serie), dtype=bool)
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        coincidencia = _PATRON_COMPARACION.match(texto)
+        if coincidencia is None:
+            return np.zeros(len(serie), dtype=bool)
+        operador, valor = coincidencia.group(1) or '=', float(coincidencia.group(2))
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            return {
+                '=': valores == valor, '!=': (valores != valor) & ~np.isnan(valores),
+                '>': valores > valor, '<': valores < valor,
+                '>=': valores >= valor, '<=': valores <= valor,
+            }[operador]
+    return serie.astype(str).str.contains(texto, case=False, regex=False).to_numpy() & serie.notna().to_numpy()
+
+
+def _claves_orden(serie):
+    """Arreglo numérico que ordena como la columna; los nulos van siempre al final."""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.to_numpy(dtype='float64', na_value=np.nan)
+    try:
+        codigos, _ = pd.factorize(serie, sort=True)
+    except TypeError:
+        codigos, _ = pd.factorize(serie.astype(str).where(serie.notna()), sort=True)
+    return np.where(codigos < 0, np.nan, codigos.astype('float64'))
+
+
+def posiciones_ordenadas(serie, ascendente=True, hasta=None):
+    """
+    Posiciones de las filas ordenadas por `serie`, estable en empates (a igual valor, orden original).
+    Si solo se necesitan las primeras `hasta` (hasta la página visible), se busca en O(n) el valor
+    que ocupa el lugar `hasta` y se ordena solo ese tramo; el resultado es siempre el prefijo del
+    mismo orden total, así las páginas consecutivas no se solapan aunque haya empates.
+    """
+    claves = _claves_orden(serie)
+    nulos = np.isnan(claves)
+    claves = np.where(nulos, np.inf, claves if ascendente else -claves)
+    n = len(claves)
+    if hasta is not None and 0 < hasta < n // 2:
+        umbral = np.partition(claves, hasta - 1)[hasta - 1]
+        menores = np.flatnonzero(claves < umbral)
+        # Entre los empatados con el umbral entran los primeros en el orden original
+        iguales = np.flatnonzero(claves == umbral)[:hasta - len(menores)]
+        candidatas = np.concatenate([menores, iguales])
+        return candidatas[np.lexsort((candidatas, claves[candidatas]))]
+    return np.argsort(claves, kind='stable')
+
+
+def ventana(df, posiciones, inicio, tamano, columnas):
+    """Recorta la ventana visible: filas [inicio, inicio + tamano) de `posiciones` y las columnas dadas."""
+    return df.iloc[posiciones[inicio:inicio + tamano]][columnas]
+
+
+def mostrar_vista_paginada(df, clave, titulo=None):
+    """
+    Muestra `df` por páginas. Filtro, orden y ventana de columnas se resuelven en el servidor
+    y solo la porción visible se serializa hacia el navegador.
+    """
+    if titulo:
+        st.caption(titulo)
+    if df.shape[1] == 0:
+        st.info("El DataFrame no tiene columnas.")
+        return
+
+    columnas = list(df.columns)
+    col_filtro, col_texto, col_orden, col_sentido = st.columns([2, 2, 2, 1])
+    with col_filtro:
+        columna_filtro = st.selectbox("Filtrar columna:", ["(ninguna)"] + columnas, key=f'{clave}_filtro_col')
+    with col_texto:
+        texto_filtro = st.text_input("Condición (p. ej. '>= 10' o texto):", key=f'{clave}_filtro_txt',
+                                     disabled=columna_filtro == "(ninguna)")
+    with col_orden:
+        columna_orden = st.selectbox("Ordenar por:", ["(orden original)"] + columnas, key=f'{clave}_orden_col')
+    with col_sentido:
+        ascendente = st.radio("Sentido:", ["↑", "↓"], horizontal=True, key=f'{clave}_orden_dir') == "↑"
+
+    # 1. Filtro: posiciones que cumplen la condición
+    if columna_filtro != "(ninguna)" and texto_filtro:
+        posiciones = np.flatnonzero(mascara_filtro(df[columna_filtro], texto_filtro))
+    else:
+        posiciones = np.arange(len(df))
+    total = len(posiciones)
+
+    # 2. Paginación
+    col_tamano, col_pagina, col_columnas = st.columns([1, 1, 3])
+    with col_tamano:
+        tamano = st.selectbox("Filas por página:", TAMANOS_PAGINA, index=2, key=f'{clave}_tamano')
+    paginas = max(1, -(-total // tamano))
+    # Si el filtro o una nueva versión reducen las páginas, la página guardada se ajusta antes del widget
+    if st.session_state.get(f'{clave}_pagina', 1) > paginas:
+        st.session_state[f'{clave}_pagina'] = paginas
+    with col_pagina:
+        pagina = st.number_input(f"Página (de {paginas:,}):", min_value=1, max_value=paginas, value=1, step=1, key=f'{clave}_pagina')
+    inicio = (int(pagina) - 1) * tamano
+
+    # 3. Ventana de columnas
+    with col_columnas:
+        if len(columnas) > ANCHO_COLUMNAS:
+            primera = st.slider("Columnas visibles desde:", 1, len(columnas) - ANCHO_COLUMNAS + 1, 1, key=f'{clave}_columnas')
+            visibles = columnas[primera - 1:primera - 1 + ANCHO_COLUMNAS]
+        else:
+            visibles = columnas
+
+    # 4. Orden: solo se ordena lo necesario para llegar a la página pedida
+    if columna_orden != "(orden original)":
+        orden = posiciones_ordenadas(df[columna_orden].iloc[posiciones], ascendente, hasta=inicio + tamano)
+        posiciones = posiciones[orden]
+
+    st.dataframe(ventana(df, posiciones, inicio, tamano, visibles), use_container_width=True)
+    st.caption(
+        f"Filas {min(inicio + 1, total):,}–{min(inicio + tamano, total):,} de {total:,}"
+        + (f" (filtradas de {len(df):,})" if total != len(df) else "")
+        + f" · columnas {columnas.index(visibles[0]) + 1}–{columnas.index(visibles[-1]) + 1} de {len(columnas):,}"
+    )
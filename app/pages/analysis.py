@@ -4,8 +4,9 @@ import streamlit as st
 from app.utils.data_analyzer import analizar_dataframe
 from app.visualization.dashboard import display_analysis_dashboard
 
-# ✅ Agregar importaciones para usar el diccionario
-from app.utils.labels_base import obtener_descripcion, generar_tabla_frecuencias
+# ✅ Agregar importaciones para usar el diccionario (según el año del dataset)
+from app.utils.labels_base import generar_tabla_frecuencias
+from app.utils.codebooks import obtener_descripcion, obtener_etiquetas
 
 def display(dataset_activo, dataset_nombre):
     st.title("🔍 Análisis de Datos")
@@ -20,7 +21,7 @@ def display(dataset_activo, dataset_nombre):
     df_seleccionado = dataset_activo['df_original'] if df_a_analizar_nombre == 'Original' else dataset_activo['df_limpio']
 
     st.subheader("📈 Estadísticas Generales")
-    metricas = analizar_dataframe(df_seleccionado)
+    metricas = analizar_dataframe(df_seleccionado, dataset_activo.get('motor', 'pandas'))
     display_analysis_dashboard(metricas, f"{dataset_nombre} ({df_a_analizar_nombre})")
 
     st.markdown("---")
@@ -31,12 +32,13 @@ def display(dataset_activo, dataset_nombre):
     columnas = list(df_seleccionado.columns)
     variable = st.selectbox("Selecciona una variable", columnas, key=f'analisis_variable_selector_{dataset_nombre}')
 
-    descripcion = obtener_descripcion(variable)
+    año = dataset_activo.get('año')
+    descripcion = obtener_descripcion(variable, año)
     if descripcion:
         st.markdown(f"**Descripción:** {descripcion}")
     else:
         st.markdown(f"**Descripción:** (No encontrada en el diccionario)")
 
     st.markdown("#### Tabla de Frecuencias")
-    tabla = generar_tabla_frecuencias(df_seleccionado, variable)
+    tabla = generar_tabla_frecuencias(df_seleccionado, variable, obtener_etiquetas(variable, año))
     st.dataframe(tabla, use_container_width=True)
@@ -1,15 +1,34 @@
 # app/pages/cleaning.py
-# VERSIÓN FINAL: Usa una lista vertical de checkboxes para la selección de variables.
+# Limpieza del dataset activo: selección de columnas, plan de limpieza, historial de versiones y exportación.
 
 import streamlit as st
 import pandas as pd
-from app.utils.data_cleaner import limpiar_dataframe
-from app.utils.labels_base import VARIABLE_DESCRIPTIONS
+from pathlib import Path
+from app.utils.data_cleaner import (
+    construir_plan, optimizar_plan, estimar_costo_plan,
+    CLAVES_GRUPO_DISPONIBLES, claves_grupo_validas
+)
+from app.utils.limpieza_por_bloques import (
+    DIRECTORIO_DATOS, EXTENSIONES_SALIDA, archivos_de_datos, limpiar_archivo_por_bloques, ruta_en_directorio_datos
+)
+from app.utils.backends import motores_disponibles, UMBRAL_FILAS_POLARS
+from app.utils.historial import obtener_historial, activar_version
+from app.utils.recetas import crear_receta, receta_a_json, OPCIONES_NULOS_NUM, OPCIONES_NULOS_CAT
+from app.utils.cache_limpieza import CacheLimpieza, huella_dataframe, limpiar_con_cache
+from app.utils.exportador import FORMATOS_EXPORTACION, formatos_disponibles, obtener_exportacion, exportacion_lista
+from app.utils.claves import CLAVES_HOGAR, CLAVES_PERSONA, POLITICAS_DUPLICADOS, obtener_indice_claves, detectar_nivel
+from app.components.vista_paginada import mostrar_vista_paginada
+from app.components.selector_columnas import mostrar_selector_columnas
+
+@st.cache_resource
+def _cache_limpieza():
+    """Caché de resultados compartida por todas las sesiones del servidor."""
+    return CacheLimpieza()
 
 def display(dataset_activo, dataset_nombre):
     """
-    Muestra la página de Limpieza y Transformación con una lista vertical
-    de checkboxes para una selección de columnas clara y organizada.
+    Muestra la página de Limpieza y Transformación con un selector de columnas
+    que admite búsqueda y selección en bloque por categoría o patrón.
     """
     
     with st.sidebar:
@@ -17,74 +36,238 @@ def display(dataset_activo, dataset_nombre):
 
         # --- Sección de Limpieza (Nulos y Duplicados) ---
         st.subheader("Opciones de Limpieza")
-        op_nulos_num = st.selectbox("Nulos numéricos:", ["No hacer nada", "Eliminar filas con nulos", "Rellenar con la media", "Rellenar con la mediana"], key=f'nulos_num_{dataset_nombre}')
-        op_nulos_cat = st.selectbox("Nulos categóricos:", ["No hacer nada", "Rellenar con la moda", "Rellenar con 'Desconocido'"], key=f'nulos_cat_{dataset_nombre}')
+        op_nulos_num = st.selectbox("Nulos numéricos:", OPCIONES_NULOS_NUM, key=f'nulos_num_{dataset_nombre}')
+        op_nulos_cat = st.selectbox("Nulos categóricos:", OPCIONES_NULOS_CAT, key=f'nulos_cat_{dataset_nombre}')
+
+        # Claves de agrupación para las opciones "por grupo" (se toman del dataset original)
+        columnas_grupo = []
+        if "por grupo" in f"{op_nulos_num} {op_nulos_cat}":
+            claves_disponibles = claves_grupo_validas(dataset_activo['df_original'].columns, CLAVES_GRUPO_DISPONIBLES)
+            columnas_grupo = st.multiselect(
+                "Agrupar imputación por:",
+                claves_disponibles,
+                default=claves_disponibles[:1],
+                format_func=lambda clave: "departamento (ubigeo)" if clave == 'departamento' else clave,
+                key=f'grupos_{dataset_nombre}'
+            )
+            if not claves_disponibles:
+                st.caption("El dataset no tiene dominio, estrato, area ni ubigeo: se usarán estadísticos globales.")
         eliminar_dup = st.checkbox("Eliminar duplicados", key=f'duplicados_{dataset_nombre}')
+
+        # Duplicados por clave ENAHO (hogar / persona) en lugar de fila completa
+        claves_duplicados, politica_duplicados = None, 'primero'
+        if eliminar_dup:
+            columnas_df = dataset_activo['df_original'].columns
+            opciones_clave = {"Fila completa": None}
+            if all(c in columnas_df for c in CLAVES_HOGAR):
+                opciones_clave["Clave de hogar (conglome, vivienda, hogar)"] = CLAVES_HOGAR
+            if all(c in columnas_df for c in CLAVES_PERSONA):
+                opciones_clave["Clave de persona (+ codperso)"] = CLAVES_PERSONA
+            tipo_clave = st.selectbox("Duplicados según:", list(opciones_clave), key=f'tipo_clave_{dataset_nombre}')
+            claves_duplicados = opciones_clave[tipo_clave]
+            if claves_duplicados:
+                politica_duplicados = st.selectbox(
+                    "Si una clave se repite:", list(POLITICAS_DUPLICADOS),
+                    format_func=POLITICAS_DUPLICADOS.get, key=f'politica_dup_{dataset_nombre}'
+                )
+        normalizar_faltantes = st.checkbox("Convertir códigos de no respuesta documentados (p. ej. 9 = Missing value) a nulos", key=f'faltantes_{dataset_nombre}')
+
+        # Motor de ejecución: también lo usa la página de análisis para este dataset
+        motores = motores_disponibles()
+        motor = st.selectbox(
+            "⚙️ Motor de ejecución:",
+            motores,
+            index=motores.index(dataset_activo.get('motor', 'pandas')) if dataset_activo.get('motor', 'pandas') in motores else 0,
+            help=f"'auto' usa Polars (multihilo) desde {UMBRAL_FILAS_POLARS:,} filas si está instalado.",
+            key=f'motor_{dataset_nombre}'
+        )
+        dataset_activo['motor'] = motor
         
         st.markdown("---")
 
-        # --- NUEVO: Lista Vertical de Checkboxes para Seleccionar Variables ---
+        # --- Selector de columnas a mantener (búsqueda, filtros y páginas) ---
         st.subheader("Columnas a Mantener")
 
         columnas_originales = dataset_activo['df_original'].columns.tolist()
-        
-        # 1. Definimos una clave única para guardar el estado de los checkboxes
-        checkbox_state_key = f'column_states_{dataset_nombre}'
-        
-        # 2. Inicializamos el estado si no existe
-        if checkbox_state_key not in st.session_state:
-            st.session_state[checkbox_state_key] = {
-                col: col in dataset_activo['df_limpio'].columns for col in columnas_originales
-            }
-
-        # 3. Creamos un contenedor para que la lista tenga scroll si es muy larga
-        with st.container(height=300): # Puedes ajustar la altura (height) como desees
-            # 4. Iteramos y creamos un checkbox por cada variable, uno debajo del otro
-            for col_name in columnas_originales:
-                label = f"{col_name} - {VARIABLE_DESCRIPTIONS.get(col_name.lower(), '')}"
-                
-                st.session_state[checkbox_state_key][col_name] = st.checkbox(
-                    label, 
-                    value=st.session_state[checkbox_state_key][col_name], 
-                    key=f"check_{col_name}_{dataset_nombre}"
-                )
+
+        # 1-5. Selector con búsqueda, categorías y patrones; la selección se guarda como bitset
+        seleccion = mostrar_selector_columnas(
+            columnas_originales, f'columnas_{dataset_nombre}',
+            marcadas_iniciales=dataset_activo['df_limpio'].columns
+        )
 
         st.markdown("---")
 
-        # 5. El botón "Aplicar" funciona igual que antes, leyendo el estado guardado
+        # 6. Vista previa del plan optimizado y su costo estimado (no ejecuta la limpieza)
+        if st.checkbox("🧭 Previsualizar plan de limpieza", key=f'plan_{dataset_nombre}'):
+            cols_marcadas = seleccion.marcadas()
+            plan = optimizar_plan(construir_plan(op_nulos_num, op_nulos_cat, eliminar_dup, cols_marcadas, normalizar_faltantes, columnas_grupo,
+                                                 claves_duplicados, politica_duplicados))
+            costo = estimar_costo_plan(dataset_activo['df_original'], plan)
+            st.dataframe(costo, use_container_width=True, hide_index=True)
+            st.caption(f"Memoria a recorrer (estimada): {costo['MB procesados (est.)'].sum():,.2f} MB")
+
+        # Receta: las opciones actuales en JSON, para repetirlas en lote con `python -m app.cli_lote`
+        receta = crear_receta(
+            op_nulos_num, op_nulos_cat, eliminar_dup,
+            seleccion.marcadas(),
+            normalizar_faltantes, columnas_grupo, claves_duplicados, politica_duplicados
+        )
+        st.download_button(
+            label="💾 Descargar receta de limpieza",
+            data=receta_a_json(receta).encode('utf-8'),
+            file_name=f"receta_{dataset_nombre}.json",
+            mime='application/json',
+            key=f'receta_{dataset_nombre}'
+        )
+
+        # 7. El botón "Aplicar" funciona igual que antes, leyendo el estado guardado
         if st.button("Aplicar Cambios Manuales", key=f'aplicar_{dataset_nombre}', type="primary"):
-            cols_reales_a_mantener = [
-                col for col, is_checked in st.session_state[checkbox_state_key].items() if is_checked
-            ]
+            cols_reales_a_mantener = seleccion.marcadas()
             
-            df_procesado = limpiar_dataframe(
-                dataset_activo['df_original'], 
+            receta_aplicada = crear_receta(
                 op_nulos_num, 
                 op_nulos_cat, 
                 eliminar_dup, 
-                cols_reales_a_mantener
+                cols_reales_a_mantener,
+                normalizar_faltantes,
+                columnas_grupo,
+                claves_duplicados,
+                politica_duplicados
+            )
+            # La huella del original se calcula una sola vez por dataset
+            if 'huella' not in dataset_activo:
+                dataset_activo['huella'] = huella_dataframe(dataset_activo['df_original'])
+            # Una receta ya aplicada a este mismo contenido se recupera de la caché sin recalcular
+            df_procesado, desde_cache = limpiar_con_cache(
+                dataset_activo['df_original'], receta_aplicada, _cache_limpieza(),
+                huella=dataset_activo['huella'], motor=motor, resetear_indice=False
             )
-            dataset_activo['df_limpio'] = df_procesado
+            # Se guarda como versión nueva: solo ocupa memoria lo que cambió respecto a su padre
+            descripcion = f"{op_nulos_num} / {op_nulos_cat}" + (" / sin duplicados" if eliminar_dup else "") + f" / {len(cols_reales_a_mantener)} columnas"
+            descripcion += " (caché)" if desde_cache else ""
+            obtener_historial(dataset_activo).registrar(df_procesado, descripcion, dict(df_procesado.attrs))
+            activar_version(dataset_activo)
             
-            st.session_state[checkbox_state_key] = {
-                col: col in df_procesado.columns for col in columnas_originales
-            }
+            seleccion.fijar(df_procesado.columns)
             
             st.success("¡Cambios de limpieza aplicados!")
-            st.experimental_rerun()
+            st.rerun()
+
+        # 8. Deshacer / rehacer: cambia de versión sin recalcular la limpieza
+        historial = obtener_historial(dataset_activo)
+        col_deshacer, col_rehacer = st.columns(2)
+        with col_deshacer:
+            deshacer = st.button("↩️ Deshacer", key=f'deshacer_{dataset_nombre}', disabled=not historial.puede_deshacer(), use_container_width=True)
+        with col_rehacer:
+            rehacer = st.button("↪️ Rehacer", key=f'rehacer_{dataset_nombre}', disabled=not historial.puede_rehacer(), use_container_width=True)
+        if deshacer or rehacer:
+            activar_version(dataset_activo, historial.deshacer() if deshacer else historial.rehacer())
+            seleccion.fijar(dataset_activo['df_limpio'].columns)
+            st.rerun()
             
     # --- La vista principal no necesita cambios ---
     st.header(f"Vista Previa y Descarga: {dataset_nombre}")
     tab_original, tab_limpio = st.tabs(["📄 Datos Originales", "✨ Datos Limpiados"])
     with tab_original:
-        st.dataframe(dataset_activo['df_original'])
+        mostrar_vista_paginada(dataset_activo['df_original'], clave=f'vista_original_{dataset_nombre}')
     with tab_limpio:
-        st.dataframe(dataset_activo['df_limpio'])
+        reporte_faltantes = dataset_activo.get('reporte_faltantes')
+        if reporte_faltantes:
+            with st.expander(f"Códigos de no respuesta convertidos a nulos ({sum(reporte_faltantes.values()):,})"):
+                st.dataframe(
+                    pd.DataFrame(list(reporte_faltantes.items()), columns=['Variable', 'Valores convertidos']),
+                    use_container_width=True
+                )
+        mostrar_vista_paginada(dataset_activo['df_limpio'], clave=f'vista_limpio_{dataset_nombre}')
         st.markdown("---")
-        csv = dataset_activo['df_limpio'].to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Descargar CSV Limpio",
-            data=csv,
-            file_name=f"limpio_{dataset_nombre}.csv",
-            mime='text/csv'
-        )
\ No newline at end of file
+        # La exportación se genera solo al pedirla y se reutiliza mientras no cambie la versión
+        formato = st.selectbox(
+            "Formato de descarga:", formatos_disponibles(),
+            format_func=lambda f: FORMATOS_EXPORTACION[f][0], key=f'formato_descarga_{dataset_nombre}'
+        )
+        etiqueta, extension, mime = FORMATOS_EXPORTACION[formato]
+        if not exportacion_lista(dataset_activo, formato):
+            if st.button("📦 Preparar descarga", key=f'preparar_descarga_{dataset_nombre}'):
+                with st.spinner(f"Generando {etiqueta}..."):
+                    obtener_exportacion(dataset_activo, formato)
+                st.rerun()
+        else:
+            ruta = obtener_exportacion(dataset_activo, formato)
+            with open(ruta, 'rb') as archivo:
+                st.download_button(
+                    label=f"📥 Descargar datos limpios ({Path(ruta).stat().st_size / 1e6:,.1f} MB)",
+                    data=archivo,
+                    file_name=f"limpio_{Path(dataset_nombre).stem}{extension}",
+                    mime=mime,
+                    key=f'descargar_{dataset_nombre}'
+                )
+
+    # --- Historial de versiones: ramas, memoria por versión y comparación ---
+    historial = obtener_historial(dataset_activo)
+    with st.expander(f"🕘 Historial de limpieza ({len(historial.versiones)} versiones)"):
+        st.dataframe(historial.resumen(), use_container_width=True, hide_index=True)
+        ids_versiones = list(historial.versiones)
+        etiqueta_version = lambda v: f"v{v} - {historial.versiones[v].descripcion}"
+        col_ir, col_comparar = st.columns(2)
+        with col_ir:
+            destino = st.selectbox("Ir a la versión:", ids_versiones, index=ids_versiones.index(historial.actual),
+                                   format_func=etiqueta_version, key=f'ir_version_{dataset_nombre}')
+            if destino != historial.actual and st.button("Activar versión", key=f'activar_version_{dataset_nombre}'):
+                activar_version(dataset_activo, destino)
+                seleccion.fijar(dataset_activo['df_limpio'].columns)
+                st.rerun()
+        with col_comparar:
+            otra = st.selectbox("Comparar la versión actual con:", ids_versiones, format_func=etiqueta_version,
+                                key=f'comparar_version_{dataset_nombre}')
+            if otra != historial.actual:
+                st.json(historial.comparar(historial.actual, otra))
+
+    # --- Claves ENAHO: nivel del módulo y claves repetidas ---
+    claves_dataset = [c for c in CLAVES_PERSONA if c in dataset_activo['df_original'].columns]
+    if all(c in claves_dataset for c in CLAVES_HOGAR):
+        with st.expander("🔑 Claves del dataset (hogar / persona)"):
+            # Los índices se guardan en el dataset: no se recalculan en cada rerun
+            nivel_clave = CLAVES_PERSONA if 'codperso' in claves_dataset else CLAVES_HOGAR
+            indice = obtener_indice_claves(dataset_activo, nivel_clave)
+            st.markdown(f"**Nivel detectado:** {detectar_nivel(dataset_activo['df_original'], dataset_activo['indices_claves'])}")
+            st.json(indice.resumen())
+            if not indice.es_unico:
+                st.markdown("Claves repetidas (las más frecuentes):")
+                st.dataframe(indice.colisiones(limite=100), use_container_width=True, hide_index=True)
+
+    # --- Limpieza por bloques: archivos del directorio de datos que no caben en memoria ---
+    with st.expander("🗄️ Limpieza por bloques (archivos más grandes que la memoria)"):
+        if not DIRECTORIO_DATOS:
+            st.info("Función desactivada: define la variable de entorno ENAHO_DIRECTORIO_DATOS con la carpeta del servidor "
+                    "donde están los archivos grandes. Solo se podrá leer y escribir dentro de ella.")
+        else:
+            st.caption("Aplica las opciones de la barra lateral leyendo el archivo por partes y escribiendo el resultado "
+                       "directo a disco, dentro del directorio de datos del servidor.")
+            archivos = archivos_de_datos()
+            ruta_entrada = st.selectbox("Archivo de entrada (CSV o Parquet):", archivos, key=f'bloques_entrada_{dataset_nombre}')
+            ruta_salida = st.text_input("Archivo de salida (.csv, .csv.gz o .parquet, relativo al directorio de datos):",
+                                        key=f'bloques_salida_{dataset_nombre}').strip()
+            usar_seleccion = st.checkbox("Conservar solo las columnas marcadas en la barra lateral", key=f'bloques_cols_{dataset_nombre}')
+            if claves_duplicados:
+                # Como en cli_lote: los bloques solo deduplican filas completas, la clave no se ignora en silencio
+                st.error("La deduplicación por clave no está disponible en la limpieza por bloques. "
+                         "Elige 'Fila completa' en 'Duplicados según' para procesar por bloques.")
+            if st.button("Procesar por bloques", key=f'bloques_{dataset_nombre}',
+                         disabled=not (ruta_entrada and ruta_salida) or bool(claves_duplicados)):
+                columnas = seleccion.marcadas() if usar_seleccion else None
+                try:
+                    entrada, salida = ruta_en_directorio_datos(ruta_entrada), ruta_en_directorio_datos(ruta_salida)
+                    if not salida.name.lower().endswith(EXTENSIONES_SALIDA):
+                        raise ValueError("El archivo de salida debe terminar en .csv, .csv.gz o .parquet.")
+                    if salida == entrada:
+                        raise ValueError("El archivo de salida no puede ser el mismo que el de entrada.")
+                    with st.spinner("Procesando por bloques..."):
+                        resumen = limpiar_archivo_por_bloques(
+                            entrada, salida, op_nulos_num, op_nulos_cat, eliminar_dup,
+                            columnas, normalizar_faltantes
+                        )
+                    st.success(f"Listo: {resumen['filas_escritas']:,} filas escritas en '{ruta_salida}'.")
+                    st.json(resumen)
+                except (OSError, ValueError, ImportError) as e:
+                    st.error(f"Error al procesar el archivo: {e}")
\ No newline at end of file
@@ -0,0 +1,138 @@
+# app/pages/graficos.py
+# Constructor de gráficos sobre df_limpio: toda figura pasa por la capa de agregación y la caché.
+
+import streamlit as st
+
+from app.utils.codebooks import obtener_descripcion, obtener_etiquetas
+from app.visualization.charts import (
+    plot_histogram, plot_bar_chart, plot_scatter, plot_box_plot, plot_correlation_heatmap,
+    etiquetar_figura, contar_puntos
+)
+from app.visualization.agregaciones import FACTORES_EXPANSION, LIMITE_PUNTOS, MAX_GRUPOS, detectar_factor
+from app.visualization.correlaciones import METODOS_CORRELACION, MUESTRA_APROXIMADA, obtener_correlaciones, pares_mas_fuertes
+from app.visualization.cache_figuras import en_cache
+
+TIPOS_GRAFICO = {
+    'histograma': "📊 Histograma",
+    'barras': "📶 Barras de frecuencias",
+    'dispersion': "✴️ Dispersión",
+    'caja': "📦 Diagrama de caja",
+    'correlacion': "🌡️ Mapa de correlaciones",
+}
+SIN_PONDERAR = "(sin ponderar)"
+NINGUNA = "(ninguna)"
+
+
+def _titulo_eje(variable, año):
+    descripcion = obtener_descripcion(variable, año)
+    return f"{variable} - {descripcion}" if descripcion else variable
+
+
+def _construir_figura(df, tipo, x, y=None, color=None, opciones=None, año=None):
+    """Arma la figura con el constructor de charts y reemplaza códigos por etiquetas del codebook."""
+    opciones = dict(opciones or {})
+    if tipo == 'histograma':
+        fig = plot_histogram(df, x, color_col=color, **opciones)
+    elif tipo == 'barras':
+        fig = plot_bar_chart(df, x, **opciones)
+    elif tipo == 'dispersion':
+        fig = plot_scatter(df, x, y, color_col=color, color_categorico=bool(color and obtener_etiquetas(color, año)) or None, **opciones)
+    else:
+        fig = plot_box_plot(df, y, color)
+    if fig is None:
+        return None
+
+    etiquetas_x = obtener_etiquetas(x, año) if tipo == 'barras' else (obtener_etiquetas(color, año) if tipo == 'caja' and color else None)
+    etiquetas_color = obtener_etiquetas(color, año) if color else None
+    etiquetar_figura(fig, etiquetas_x, etiquetas_color)
+    if tipo in ('histograma', 'barras', 'dispersion'):
+        fig.update_xaxes(title_text=_titulo_eje(x, año))
+    if tipo in ('dispersion', 'caja'):
+        fig.update_yaxes(title_text=_titulo_eje(y, año))
+    if tipo == 'caja' and color:
+        fig.update_xaxes(title_text=_titulo_eje(color, año))
+    return fig
+
+
+def display(dataset_activo, dataset_nombre):
+    st.header(f"📈 Constructor de Gráficos - {dataset_nombre}")
+    df = dataset_activo['df_limpio']
+    año = dataset_activo.get('año')
+    st.info(f"Los gráficos se agregan en el servidor: ninguno envía más de {LIMITE_PUNTOS:,} puntos al navegador.")
+
+    columnas = df.columns.tolist()
+    numericas = df.select_dtypes(include='number').columns.tolist()
+    # Agrupan bien las columnas de texto y las codificadas con etiquetas en el codebook
+    categoricas = [c for c in columnas if c not in numericas or obtener_etiquetas(c, año)]
+    formato = lambda var: var if var == NINGUNA else f"{var} - {obtener_descripcion(var, año) or ''}"
+
+    # 1. Tipo de gráfico
+    tipo = st.selectbox("Tipo de gráfico:", list(TIPOS_GRAFICO), format_func=TIPOS_GRAFICO.get, key=f'graf_tipo_{dataset_nombre}')
+
+    # 2. Variables según el tipo
+    x = y = color = None
+    opciones = {}
+    col1, col2, col3 = st.columns(3)
+    if tipo in ('histograma', 'dispersion'):
+        if not numericas:
+            st.warning("El dataset no tiene variables numéricas.")
+            st.stop()
+        with col1:
+            x = st.selectbox("Variable (eje X):", numericas, format_func=formato, key=f'graf_x_{dataset_nombre}')
+    elif tipo == 'barras':
+        with col1:
+            x = st.selectbox("Variable:", categoricas or columnas, format_func=formato, key=f'graf_x_{dataset_nombre}')
+    if tipo in ('dispersion', 'caja'):
+        if not numericas:
+            st.warning("El dataset no tiene variables numéricas.")
+            st.stop()
+        with col2:
+            y = st.selectbox("Variable (eje Y):", numericas, index=min(1, len(numericas) - 1) if tipo == 'dispersion' else 0,
+                             format_func=formato, key=f'graf_y_{dataset_nombre}')
+    if tipo in ('histograma', 'dispersion', 'caja'):
+        with col3:
+            color = st.selectbox("Agrupar / colorear por:", [NINGUNA] + categoricas, format_func=formato, key=f'graf_color_{dataset_nombre}')
+            color = None if color == NINGUNA else color
+        if color:
+            st.caption(f"Se muestran hasta {MAX_GRUPOS} grupos; los menos frecuentes se juntan en \"Otros\".")
+
+    # 3. Opciones propias de cada gráfico
+    if tipo in ('histograma', 'barras'):
+        factores = [f for f in FACTORES_EXPANSION if f in columnas]
+        por_defecto = detectar_factor(df)
+        factor = st.selectbox("Ponderar por factor de expansión:", [SIN_PONDERAR] + factores,
+                              index=factores.index(por_defecto) + 1 if por_defecto else 0, key=f'graf_factor_{dataset_nombre}')
+        opciones['factor'] = None if factor == SIN_PONDERAR else factor
+    if tipo == 'histograma':
+        opciones['bins'] = st.slider("Número de bins:", 5, 200, 40, key=f'graf_bins_{dataset_nombre}')
+    elif tipo == 'dispersion':
+        opciones['modo'] = st.radio("Con muchos puntos:", ['auto', 'densidad'], horizontal=True, key=f'graf_modo_{dataset_nombre}',
+                                    format_func={'auto': "Muestra estratificada", 'densidad': "Mapa de densidad"}.get)
+    elif tipo == 'correlacion':
+        col_metodo, col_opciones = st.columns(2)
+        with col_metodo:
+            opciones['metodo'] = st.selectbox("Método:", list(METODOS_CORRELACION), format_func=METODOS_CORRELACION.get, key=f'graf_metodo_{dataset_nombre}')
+        with col_opciones:
+            opciones['reordenar'] = st.checkbox("Agrupar variables correlacionadas", value=True, key=f'graf_reordenar_{dataset_nombre}')
+            opciones['aproximada'] = st.checkbox("Cálculo aproximado (muestra de filas)", value=len(df) > 500_000, key=f'graf_aprox_{dataset_nombre}')
+
+    # 4. Figura desde la caché (se recalcula solo si cambian la versión, las variables o las opciones)
+    with st.spinner("Agregando datos..."):
+        if tipo == 'correlacion':
+            # La matriz se guarda por versión en el dataset y la comparten el mapa y la tabla de pares
+            muestra = MUESTRA_APROXIMADA if opciones['aproximada'] else None
+            corr = obtener_correlaciones(dataset_activo, metodo=opciones['metodo'], muestra=muestra)
+            fig = en_cache(dataset_activo, 'grafico_correlacion',
+                           lambda df_, metodo, reordenar, muestra: plot_correlation_heatmap(df_, metodo, reordenar=reordenar, corr=corr),
+                           opciones['metodo'], opciones['reordenar'], muestra)
+        else:
+            fig = en_cache(dataset_activo, f'grafico_{tipo}', _construir_figura, tipo, x, y, color, opciones, año)
+    if fig is None:
+        st.warning("No hay datos suficientes para este gráfico.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Valores enviados al navegador: {contar_puntos(fig):,}")
+
+    if tipo == 'correlacion':
+        with st.expander("🔗 Pares más correlacionados"):
+            st.dataframe(pares_mas_fuertes(corr, k=20), use_container_width=True, hide_index=True)
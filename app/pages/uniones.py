@@ -0,0 +1,172 @@
+# app/pages/uniones.py
+# Unión de módulos ENAHO cargados (vivienda, hogar, educación, empleo, sumaria...) por sus claves.
+
+import streamlit as st
+
+from app.components.selector_columnas import mostrar_selector_columnas
+from app.utils.claves import CLAVES_HOGAR
+from app.utils.codebooks import obtener_etiquetas
+from app.utils.colapsar import ESTADISTICAS, colapsar
+from app.utils.panel import año_de_dataset, panel_desde_datasets
+from app.utils.uniones import TIPOS_UNION, LIMITE_MB_UNION, claves_comunes, estimar_union, unir_datasets
+from app.visualization.agregaciones import FACTORES_EXPANSION
+from app.visualization.cache_figuras import clave_figura, en_cache
+
+SIN_VALIDAR = "(no validar)"
+SIN_PONDERAR = "(sin ponderar)"
+
+
+def _guardar_dataset(nombre, df, año):
+    st.session_state.datasets[nombre] = {
+        'df_original': df,
+        'df_limpio': df.copy(),
+        'año': año,
+        'version': 0
+    }
+
+
+def _colapsar_a_hogar(dataset_activo, dataset_nombre):
+    """Colapsa un módulo de personas a una fila por hogar, listo para unirse a módulos de hogar."""
+    df = dataset_activo['df_limpio']
+    año = dataset_activo.get('año')
+    columnas = [c for c in df.columns if c not in CLAVES_HOGAR and c != 'codperso']
+
+    # 1. Variables numéricas y sus estadísticas; variables categóricas para proporciones
+    numericas = st.multiselect("Variables numéricas:", [c for c in columnas if c in df.select_dtypes(include='number').columns],
+                               key=f'colapso_numericas_{dataset_nombre}')
+    estadisticas = st.multiselect("Estadísticas:", [e for e in ESTADISTICAS if e != 'proporcion'], default=['suma', 'media'],
+                                  format_func=ESTADISTICAS.get, key=f'colapso_estadisticas_{dataset_nombre}')
+    categoricas = st.multiselect("Proporción de cada categoría en el hogar:", [c for c in columnas if obtener_etiquetas(c, año)],
+                                 key=f'colapso_categoricas_{dataset_nombre}', help="P. ej. p207: proporción de hombres y mujeres del hogar.")
+    factores = [c for c in FACTORES_EXPANSION if c in df.columns]
+    pesos = st.selectbox("Ponderar por:", [SIN_PONDERAR] + factores, key=f'colapso_pesos_{dataset_nombre}')
+    pesos = None if pesos == SIN_PONDERAR else pesos
+
+    especificacion = {c: list(estadisticas) for c in numericas if estadisticas}
+    for c in categoricas:
+        especificacion.setdefault(c, []).append('proporcion')
+
+    # 2. Colapsar y guardar como dataset nuevo
+    nombre_por_defecto = f"{dataset_nombre} (hogar)"
+    nombre_nuevo = st.text_input("Nombre del dataset colapsado:", value=nombre_por_defecto, key=f'colapso_nombre_{dataset_nombre}').strip() or nombre_por_defecto
+    if st.button("📉 Colapsar", key=f'colapso_boton_{dataset_nombre}', disabled=not especificacion):
+        if nombre_nuevo in st.session_state.datasets:
+            st.error(f"Ya existe un dataset llamado '{nombre_nuevo}'.")
+            return
+        with st.spinner("Colapsando..."):
+            try:
+                colapsado = colapsar(df, especificacion, pesos=pesos, año=año)
+            except (ValueError, KeyError) as error:
+                st.error(str(error))
+                return
+        _guardar_dataset(nombre_nuevo, colapsado, año)
+        st.success(f"Dataset '{nombre_nuevo}' creado: {len(colapsado):,} hogares a partir de {len(df):,} filas.")
+        st.rerun()
+
+
+def _apilar_años(dataset_activo, dataset_nombre):
+    """Apila el mismo módulo de varios años en un panel con columna año."""
+    años = {nombre: año_de_dataset(dataset) for nombre, dataset in st.session_state.datasets.items()}
+    con_año = [nombre for nombre, año in años.items() if año]
+    if len(con_año) < 2:
+        st.info("Carga el mismo módulo de al menos dos años distintos para construir un panel.")
+        return
+
+    # 1. Un dataset por año (se usan sus versiones limpias)
+    nombres = st.multiselect("Datasets a apilar:", con_año, default=[dataset_nombre] if dataset_nombre in con_año else [],
+                             format_func=lambda nombre: f"{nombre} ({años[nombre]})", key=f'panel_datasets_{dataset_nombre}')
+    usar_codebook = st.checkbox("Emparejar columnas renombradas por su descripción en el codebook", value=True,
+                                key=f'panel_codebook_{dataset_nombre}')
+
+    # 2. Construir y guardar el panel como dataset nuevo
+    nombre_por_defecto = f"{dataset_nombre} (panel)"
+    nombre_nuevo = st.text_input("Nombre del panel:", value=nombre_por_defecto, key=f'panel_nombre_{dataset_nombre}').strip() or nombre_por_defecto
+    if st.button("📚 Construir panel", key=f'panel_boton_{dataset_nombre}', disabled=len(nombres) < 2):
+        if nombre_nuevo in st.session_state.datasets:
+            st.error(f"Ya existe un dataset llamado '{nombre_nuevo}'.")
+            return
+        with st.spinner("Apilando años..."):
+            try:
+                panel = panel_desde_datasets(st.session_state.datasets, nombres, usar_codebook=usar_codebook)
+            except (ValueError, KeyError) as error:
+                st.error(str(error))
+                return
+        _guardar_dataset(nombre_nuevo, panel, None)
+        info = panel.attrs['panel']
+        st.success(f"Panel '{nombre_nuevo}' creado: {len(panel):,} filas de {len(info['años'])} años "
+                   f"({panel.memory_usage(deep=True).sum() / 1e6:,.1f} MB).")
+        if info['columnas_incompletas']:
+            st.warning(f"Columnas que faltan en algún año (quedan nulas en esos años): {', '.join(info['columnas_incompletas'])}")
+        st.rerun()
+
+
+def display(dataset_activo, dataset_nombre):
+    st.header(f"🔗 Unir Módulos - {dataset_nombre}")
+    if 'codperso' in dataset_activo['df_limpio'].columns and all(c in dataset_activo['df_limpio'].columns for c in CLAVES_HOGAR):
+        with st.expander("📉 Colapsar personas a nivel de hogar", expanded=False):
+            _colapsar_a_hogar(dataset_activo, dataset_nombre)
+
+    otros = [nombre for nombre in st.session_state.datasets if nombre != dataset_nombre]
+    if not otros:
+        st.info("Carga otro módulo ENAHO (p. ej. sumaria o el de educación) para unirlo con este.")
+        return
+    with st.expander("📚 Apilar años del mismo módulo (panel)", expanded=False):
+        _apilar_años(dataset_activo, dataset_nombre)
+
+    # 1. Dataset a unir con el activo (se usan las versiones limpias de ambos)
+    nombre_der = st.selectbox("Dataset a unir:", otros, key=f'union_der_{dataset_nombre}')
+    dataset_der = st.session_state.datasets[nombre_der]
+    df_izq, df_der = dataset_activo['df_limpio'], dataset_der['df_limpio']
+
+    # 2. Claves: por defecto las de persona si ambos las tienen, si no las de hogar
+    comunes = [c for c in df_izq.columns if c in df_der.columns]
+    claves = st.multiselect("Claves de unión:", comunes, default=claves_comunes(df_izq, df_der), key=f'union_claves_{dataset_nombre}_{nombre_der}')
+    if not claves:
+        st.warning("Elige al menos una clave común (conglome, vivienda, hogar, codperso).")
+        return
+
+    # 3. Tipo de unión y relación esperada
+    col_tipo, col_validar = st.columns(2)
+    with col_tipo:
+        how = st.radio("Tipo de unión:", list(TIPOS_UNION), format_func=TIPOS_UNION.get, key=f'union_tipo_{dataset_nombre}')
+    with col_validar:
+        validar = st.selectbox("Validar relación (activo : a unir):", [SIN_VALIDAR, 'm:1', '1:1', '1:m'], key=f'union_validar_{dataset_nombre}',
+                               help="m:1 = varias personas por hogar del dataset a unir (p. ej. personas + sumaria).")
+    validar = None if validar == SIN_VALIDAR else validar
+
+    # 4. Columnas que se traen del dataset a unir (las claves vienen del activo)
+    with st.expander(f"Columnas a traer de '{nombre_der}'", expanded=False):
+        seleccion = mostrar_selector_columnas([c for c in df_der.columns if c not in claves], f'union_columnas_{dataset_nombre}_{nombre_der}')
+    columnas_der = seleccion.marcadas()
+
+    # 5. Estimación antes de unir: filas exactas, relación y memoria (no materializa el resultado)
+    id_der = clave_figura(dataset_der, 'union')[:2]
+    estimado = en_cache(dataset_activo, 'estimacion_union',
+                        lambda df, _id, claves_, how_, columnas_: estimar_union(df, df_der, list(claves_), how_, columnas_der=list(columnas_)),
+                        id_der, claves, how, columnas_der)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Filas resultantes", f"{estimado['filas']:,}")
+    c2.metric("Filas con pareja", f"{estimado['filas_con_pareja']:,}", f"{estimado['filas_con_pareja'] / max(estimado['filas_izquierda'], 1):.1%}")
+    c3.metric("Relación", estimado['relacion'])
+    c4.metric("Memoria estimada", f"{estimado['mb_estimados']:,.1f} MB")
+    if estimado['supera_limite']:
+        st.error(f"El resultado superaría el límite de {LIMITE_MB_UNION:,.0f} MB. Trae menos columnas o usa una unión 'inner'.")
+    if validar and any(e == '1' and r == 'm' for e, r in zip(validar.split(':'), estimado['relacion'].split(':'))):
+        st.warning(f"Las claves no cumplen la relación {validar} (relación real: {estimado['relacion']}).")
+
+    # 6. Unir y guardar el resultado como un dataset nuevo
+    nombre_por_defecto = f"{dataset_nombre} + {nombre_der}"
+    nombre_nuevo = st.text_input("Nombre del nuevo dataset:", value=nombre_por_defecto, key=f'union_nombre_{dataset_nombre}').strip() or nombre_por_defecto
+    if st.button("🔗 Unir", key=f'union_boton_{dataset_nombre}', type="primary", disabled=estimado['supera_limite']):
+        if nombre_nuevo in st.session_state.datasets:
+            st.error(f"Ya existe un dataset llamado '{nombre_nuevo}'.")
+            return
+        with st.spinner("Uniendo..."):
+            try:
+                df = unir_datasets(df_izq, df_der, claves, how, columnas_der=columnas_der, validar=validar)
+            except (ValueError, KeyError) as error:
+                st.error(str(error))
+                return
+        _guardar_dataset(nombre_nuevo, df, dataset_activo.get('año'))
+        st.success(f"Dataset '{nombre_nuevo}' creado: {len(df):,} filas y {df.shape[1]:,} columnas.")
+        st.rerun()
@@ -3,39 +3,52 @@
 import streamlit as st
 from app.utils.labels_base import (
     listar_variables_por_categoria,
-    obtener_descripcion,
     generar_tabla_frecuencias
 )
+from app.utils.codebooks import obtener_descripcion, obtener_etiquetas
+from app.utils.buscador_variables import buscar_variables
+from app.visualization.cache_figuras import en_cache
 
-def display(df_limpio, dataset_nombre):
+def display(dataset_activo, dataset_nombre):
+    df_limpio, año = dataset_activo['df_limpio'], dataset_activo.get('año')
     st.header(f"📊 Exploración de Variables - {dataset_nombre}")
     st.subheader("Descripción de Variables (estilo Stata)")
-    st.info("Selecciona una categoría y luego una variable para ver su tabla de frecuencias detallada.")
+    st.info("Busca una variable o selecciona una categoría y luego una variable para ver su tabla de frecuencias detallada.")
 
-    # ✅ Llamar categorías desde labels_base
-    categorias = listar_variables_por_categoria()
+    # ✅ Búsqueda directa por código, descripción o etiquetas
+    busqueda = st.text_input("🔎 Buscar variable:", key=f"buscar_var_vis_{dataset_nombre}")
 
-    categoria_seleccionada = st.selectbox(
-        "📁 Categoría:",
-        list(categorias.keys()),
-        key=f"cat_select_{dataset_nombre}"
-    )
+    if busqueda:
+        variables_en_categoria = buscar_variables(busqueda, variables=df_limpio.columns)
+        if not variables_en_categoria:
+            st.warning(f"Ninguna variable del dataset actual coincide con '{busqueda}'.")
+            st.stop()
+    else:
+        # ✅ Llamar categorías desde labels_base
+        categorias = listar_variables_por_categoria()
+
+        categoria_seleccionada = st.selectbox(
+            "📁 Categoría:",
+            list(categorias.keys()),
+            key=f"cat_select_{dataset_nombre}"
+        )
+
+        variables_en_categoria = [var for var in categorias[categoria_seleccionada] if var in df_limpio.columns]
+
+        if not variables_en_categoria:
+            st.warning(f"Ninguna variable de la categoría '{categoria_seleccionada}' se encuentra en el dataset actual.")
+            st.stop()
 
-    variables_en_categoria = [var for var in categorias[categoria_seleccionada] if var in df_limpio.columns]
-    
-    if not variables_en_categoria:
-        st.warning(f"Ninguna variable de la categoría '{categoria_seleccionada}' se encuentra en el dataset actual.")
-        st.stop()
-    
     variable_seleccionada = st.selectbox(
         "🧪 Variable a describir:",
         variables_en_categoria,
+        format_func=lambda var: f"{var} - {obtener_descripcion(var, año) or ''}",
         key=f"var_select_{dataset_nombre}"
     )
 
     if variable_seleccionada:
         st.markdown("---")
-        descripcion = obtener_descripcion(variable_seleccionada)
+        descripcion = obtener_descripcion(variable_seleccionada, año)
 
         col1, col2 = st.columns([1, 3])
         with col1:
@@ -45,7 +58,9 @@ def display(df_limpio, dataset_nombre):
             st.write("**Descripción:**")
             st.success(descripcion or "Sin descripción disponible.")
 
-        tabla_frecuencias = generar_tabla_frecuencias(df_limpio, variable_seleccionada)
+        # La tabla se reutiliza mientras no cambie la versión del dataset
+        tabla_frecuencias = en_cache(dataset_activo, 'tabla_frecuencias', generar_tabla_frecuencias,
+                                     variable_seleccionada, obtener_etiquetas(variable_seleccionada, año))
         if tabla_frecuencias is not None:
             st.markdown("#### 📋 Tabla de Frecuencias")
             st.dataframe(tabla_frecuencias, use_container_width=True)
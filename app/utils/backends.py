@@ -0,0 +1,314 @@
+# app/utils/backends.py
+# Motores de ejecución intercambiables (pandas / Polars) para limpieza y perfilado.
+
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_cleaner import (_ENTEROS_CON_MASCARA, CLAVE_DEPARTAMENTO, _tiene_decimales, claves_grupo_validas,
+                                     ejecutar_plan)
+from app.utils.labels_base import MISSING_CODES
+
+try:
+    import polars as pl
+except ImportError:  # Polars es opcional: sin él solo está disponible pandas
+    pl = None
+
+# Con "auto", a partir de este número de filas se usa Polars (si está instalado)
+UMBRAL_FILAS_POLARS = 1_000_000
+
+_COLUMNAS_DESCRIBE = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+# Conversiones a Polars guardadas por DataFrame (cada versión del dataset es un objeto distinto)
+MAX_CONVERSIONES = 4
+_conversiones = OrderedDict()
+
+
+class BackendPandas:
+    """Ejecución en pandas (un solo núcleo, evaluación inmediata). Es el motor de referencia."""
+    nombre = 'pandas'
+
+    def ejecutar_plan(self, df, plan, resetear_indice=True):
+        return ejecutar_plan(df, plan, resetear_indice)
+
+    def contar_duplicados(self, df):
+        return int(df.duplicated().sum())
+
+    def nulos_por_columna(self, df):
+        return df.isnull().sum()
+
+    def describir_numericas(self, df):
+        return df.describe(include='number').T
+
+    def describir_categoricas(self, df):
+        return df.describe(include=['object', 'category']).T
+
+    def contar_valores(self, df, columna):
+        return df[columna].value_counts(dropna=False)
+
+
+class BackendPolars:
+    """
+    Ejecución en Polars: multihilo, nativo en Arrow y con optimización de consultas diferidas.
+    Recibe y devuelve DataFrames de pandas para que el resto de la app no cambie.
+    """
+    nombre = 'polars'
+
+    @staticmethod
+    def _a_polars(df):
+        return pl.from_pandas(df, nan_to_null=True)
+
+    @staticmethod
+    def _a_polars_guardado(df):
+        """
+        Conversión a Polars reutilizada mientras exista el mismo DataFrame: el perfilado de una
+        versión del dataset convierte el frame completo una sola vez y no en cada consulta ni rerun.
+        Los DataFrames de la app se tratan como inmutables (cada versión nueva es otro objeto).
+        """
+        entrada = _conversiones.get(id(df))
+        if entrada is not None and entrada[0]() is df:
+            _conversiones.move_to_end(id(df))
+            return entrada[1]
+        df_pl = pl.from_pandas(df, nan_to_null=True)
+        clave = id(df)
+        # Al liberarse el DataFrame se libera también su conversión
+        _conversiones[clave] = (weakref.ref(df, lambda _ref: _conversiones.pop(clave, None)), df_pl)
+        while len(_conversiones) > MAX_CONVERSIONES:
+            _conversiones.popitem(last=False)
+        return df_pl
+
+    @staticmethod
+    def _a_pandas(df_pl, referencia, normalizadas=()):
+        """
+        Convierte a pandas con los tipos del motor de referencia: `object` en las columnas de texto que ya lo eran
+        y tipos con máscara en las enteras que tenían o recibieron nulos (`normalizadas`): Int64... o,
+        si la imputación les dejó decimales, Float64.
+        """
+        df = df_pl.to_pandas()
+        tipos = {}
+        for col in df.columns:
+            if col not in referencia.columns:
+                continue
+            original = referencia[col].dtype
+            if original == object:
+                tipos[col] = object
+                continue
+            con_mascara = _ENTEROS_CON_MASCARA.get(str(original)) if col in normalizadas else None
+            if con_mascara is None and pd.api.types.is_extension_array_dtype(original) and pd.api.types.is_integer_dtype(original):
+                con_mascara = str(original)
+            if con_mascara is not None:
+                tipos[col] = 'Float64' if _tiene_decimales(df[col].to_numpy(dtype='float64', na_value=np.nan)) else con_mascara
+        return df.astype(tipos) if tipos else df
+
+    @staticmethod
+    def _es_numerica(dtype):
+        return dtype.is_numeric()
+
+    @staticmethod
+    def _es_texto(dtype):
+        return dtype in (pl.String, pl.Categorical) or isinstance(dtype, pl.Categorical)
+
+    def ejecutar_plan(self, df, plan, resetear_indice=True):
+        df_pl = self._a_polars(df)
+        info = {'codigos_faltantes': {}}
+
+        # Claves de agrupación como columnas temporales, calculadas antes de proyectar
+        claves = next((paso['grupos'] for paso in plan if paso.get('grupos')), None)
+        claves = claves_grupo_validas(df.columns, claves) if claves else []
+        temporales = [f'__grupo_{i}' for i in range(len(claves))]
+        if claves:
+            df_pl = df_pl.with_columns([
+                (pl.col('ubigeo').cast(pl.Float64, strict=False) // 10000 if clave == CLAVE_DEPARTAMENTO and clave not in df.columns
+                 else pl.col(clave)).alias(tmp)
+                for clave, tmp in zip(claves, temporales)
+            ])
+        # Claves de deduplicación, también como columnas temporales
+        claves_dup = next((paso['claves'] for paso in plan if paso.get('claves')), [])
+        temporales_dup = [f'__clave_{i}' for i in range(len(claves_dup))]
+        if claves_dup:
+            df_pl = df_pl.with_columns([pl.col(clave).alias(tmp) for clave, tmp in zip(claves_dup, temporales_dup)])
+        # Columnas que acompañan a los datos hasta el final: grupos, claves y, si se pide, la posición de la fila
+        arrastradas = temporales + temporales_dup
+        if not resetear_indice:
+            df_pl = df_pl.with_row_index('__fila')
+            arrastradas.append('__fila')
+
+        lf = df_pl.lazy()
+        columnas = list(df.columns)
+        for paso in plan:
+            op = paso['op']
+            esquema = lf.collect_schema()
+            if op == 'proyectar':
+                columnas = [col for col in paso['columnas'] if col in esquema]
+                lf = lf.select(columnas + arrastradas)
+            elif op in ('normalizar', 'normalizar_filtrar'):
+                codigos = {col: MISSING_CODES.get(str(col).lower()) for col in columnas}
+                # Se compara en float para no depender del ancho entero de cada columna
+                mascaras = {col: pl.col(col).cast(pl.Float64).is_in([float(x) for x in c])
+                            for col, c in codigos.items() if c and self._es_numerica(esquema[col])}
+                if mascaras:
+                    conteos = lf.select([m.sum().alias(col) for col, m in mascaras.items()]).collect()
+                    info['codigos_faltantes'] = {col: int(n) for col, n in conteos.row(0, named=True).items() if n}
+                    lf = lf.with_columns([
+                        pl.when(m).then(None).otherwise(pl.col(col)).alias(col) for col, m in mascaras.items()
+                    ])
+                if op == 'normalizar_filtrar':
+                    lf = lf.drop_nulls(subset=columnas)
+            elif op == 'filtrar':
+                lf = lf.drop_nulls(subset=columnas)
+            elif op == 'imputar':
+                if '__nulos' not in esquema and any(p.get('politica') == 'mas_completo' for p in plan):
+                    # 'mas_completo' compara los nulos reales: se cuentan antes de imputar
+                    lf = lf.with_columns(pl.sum_horizontal([pl.col(c).is_null().cast(pl.Int64) for c in columnas]).alias('__nulos'))
+                lf = lf.with_columns(self._expresiones_imputacion(lf, paso, columnas, temporales))
+            elif op == 'deduplicar' and paso.get('claves'):
+                lf = self._deduplicar_por_claves(lf, columnas, temporales_dup, paso.get('politica', 'primero'),
+                                                 '__nulos' if '__nulos' in esquema else None)
+            elif op == 'deduplicar':
+                lf = lf.unique(subset=columnas, maintain_order=True, keep='first')
+
+        resultado = lf.select(columnas + (['__fila'] if not resetear_indice else [])).collect()
+        df_limpio = self._a_pandas(resultado.select(columnas), df, info['codigos_faltantes'])
+        if not resetear_indice:
+            df_limpio.index = df.index.take(resultado.get_column('__fila').to_numpy())
+        df_limpio.attrs['codigos_faltantes'] = info['codigos_faltantes']
+        return df_limpio
+
+    @staticmethod
+    def _deduplicar_por_claves(lf, columnas, claves, politica, columna_nulos=None):
+        """
+        Una fila por clave según la política; las filas con alguna clave nula se conservan todas.
+        `columna_nulos` trae los nulos por fila contados antes de imputar (para 'mas_completo').
+        """
+        sin_clave = pl.any_horizontal([pl.col(c).is_null() for c in claves])
+        if politica == 'primero':
+            return lf.filter(pl.struct(claves).is_first_distinct() | sin_clave)
+        if politica == 'ultimo':
+            return lf.filter(pl.struct(claves).is_last_distinct() | sin_clave)
+        # mas_completo: menos nulos y, en empate, la fila que aparece antes
+        nulos = pl.col(columna_nulos) if columna_nulos else pl.sum_horizontal([pl.col(c).is_null().cast(pl.Int64) for c in columnas])
+        mejor = pl.col('__pos').sort_by([nulos, pl.col('__pos')]).first().over(claves)
+        return lf.with_row_index('__pos').filter((pl.col('__pos') == mejor) | sin_clave).drop('__pos')
+
+    def _expresiones_imputacion(self, lf, paso, columnas, temporales):
+        esquema = lf.collect_schema()
+        # Solo se tocan las columnas con nulos, así las enteras completas no pasan a float (como en pandas)
+        nulos = lf.select(pl.col(columnas).null_count()).collect().row(0, named=True)
+        columnas = [col for col in columnas if nulos[col]]
+        grupos = temporales if paso.get('grupos') else []
+        sin_grupo = pl.any_horizontal([pl.col(t).is_null() for t in grupos]) if grupos else None
+        expresiones = []
+
+        def con_grupo(expr_global, expr_grupo, col):
+            if not grupos:
+                return pl.col(col).fill_null(expr_global)
+            # Filas sin clave de grupo -> estadístico global; grupos sin datos -> global
+            por_grupo = pl.when(sin_grupo).then(None).otherwise(expr_grupo.over(grupos))
+            return pl.col(col).fill_null(por_grupo).fill_null(expr_global)
+
+        estrategia_num = paso.get('numerico', '')
+        for col in columnas:
+            if not self._es_numerica(esquema[col]):
+                continue
+            if estrategia_num.startswith("Rellenar con la mediana"):
+                stat = pl.col(col).median()
+            elif estrategia_num.startswith("Rellenar con la media"):
+                stat = pl.col(col).mean()
+            else:
+                continue
+            expr = con_grupo(stat, stat, col) if estrategia_num.endswith("por grupo") else pl.col(col).fill_null(stat)
+            expresiones.append(expr.alias(col))
+
+        estrategia_cat = paso.get('categorico', '')
+        for col in columnas:
+            if not self._es_texto(esquema[col]):
+                continue
+            if estrategia_cat.startswith("Rellenar con la moda"):
+                # En empate gana el valor menor, como Series.mode()[0]
+                moda = pl.col(col).drop_nulls().mode().sort().first()
+                expr = con_grupo(moda, moda, col) if estrategia_cat.endswith("por grupo") else pl.col(col).fill_null(moda)
+            elif estrategia_cat == "Rellenar con 'Desconocido'":
+                expr = pl.col(col).fill_null(pl.lit('Desconocido'))
+            else:
+                continue
+            expresiones.append(expr.alias(col))
+        return expresiones
+
+    def contar_duplicados(self, df):
+        df_pl = self._a_polars_guardado(df)
+        return df_pl.height - df_pl.unique().height
+
+    def nulos_por_columna(self, df):
+        conteos = self._a_polars_guardado(df).null_count().row(0, named=True)
+        return pd.Series(conteos, index=df.columns, dtype='int64')
+
+    def describir_numericas(self, df):
+        columnas = df.select_dtypes(include='number').columns
+        if len(columnas) == 0:
+            return pd.DataFrame(columns=_COLUMNAS_DESCRIBE)
+        df_pl = self._a_polars_guardado(df).select(list(columnas))
+        # Todas las agregaciones de todas las columnas en una sola consulta (en paralelo)
+        fila = df_pl.select([
+            expr
+            for col in columnas
+            for expr in (
+                pl.col(col).count().cast(pl.Float64).alias(f'{col}|count'),
+                pl.col(col).mean().alias(f'{col}|mean'),
+                pl.col(col).std().alias(f'{col}|std'),
+                pl.col(col).min().cast(pl.Float64).alias(f'{col}|min'),
+                pl.col(col).quantile(0.25, interpolation='linear').alias(f'{col}|25%'),
+                pl.col(col).quantile(0.5, interpolation='linear').alias(f'{col}|50%'),
+                pl.col(col).quantile(0.75, interpolation='linear').alias(f'{col}|75%'),
+                pl.col(col).max().cast(pl.Float64).alias(f'{col}|max'),
+            )
+        ]).row(0)
+        return pd.DataFrame(
+            [fila[i * len(_COLUMNAS_DESCRIBE):(i + 1) * len(_COLUMNAS_DESCRIBE)] for i in range(len(columnas))],
+            index=columnas, columns=_COLUMNAS_DESCRIBE
+        )
+
+    def describir_categoricas(self, df):
+        columnas = df.select_dtypes(include=['object', 'category']).columns
+        if len(columnas) == 0:
+            return pd.DataFrame(columns=['count', 'unique', 'top', 'freq'])
+        # Los valores se comparan como texto (igual que describe de pandas sobre object)
+        df_pl = self._a_polars_guardado(df).select([pl.col(col).cast(pl.String) for col in columnas])
+        filas = {}
+        for col in columnas:
+            conteo = df_pl.get_column(col).drop_nulls().value_counts(sort=True)
+            top, freq = conteo.row(0) if conteo.height else (None, None)
+            filas[col] = {'count': int(conteo[conteo.columns[1]].sum()) if conteo.height else 0,
+                          'unique': conteo.height, 'top': top, 'freq': freq}
+        return pd.DataFrame.from_dict(filas, orient='index')
+
+    def contar_valores(self, df, columna):
+        conteo = self._a_polars_guardado(df).get_column(columna).value_counts(sort=True)
+        serie = pd.Series(conteo[conteo.columns[1]].to_numpy(), index=conteo[columna].to_list(), name='count')
+        serie.index.name = columna
+        return serie
+
+
+def polars_disponible():
+    return pl is not None
+
+
+def motores_disponibles():
+    """Opciones para la interfaz: 'auto' más los motores instalados."""
+    return ['auto', 'pandas'] + (['polars'] if polars_disponible() else [])
+
+
+def obtener_backend(motor='pandas', df=None):
+    """
+    Devuelve el motor pedido ('pandas', 'polars' o 'auto').
+    Con 'auto' se elige Polars para datasets grandes si está instalado.
+    """
+    if motor == 'auto':
+        grande = df is not None and len(df) >= UMBRAL_FILAS_POLARS
+        motor = 'polars' if grande and polars_disponible() else 'pandas'
+    if motor == 'polars':
+        if not polars_disponible():
+            raise ImportError("El motor 'polars' requiere instalar el paquete polars.")
+        return BackendPolars()
+    return BackendPandas()
+
@@ -0,0 +1,168 @@
+# app/utils/buscador_variables.py
+# Índice invertido para buscar variables por código, descripción o etiquetas de valores.
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.labels_base import VARIABLE_DESCRIPTIONS, VALUE_LABELS
+
+# Peso de un término según el campo donde aparece
+PESO_CODIGO = 5.0
+PESO_DESCRIPCION = 2.0
+PESO_ETIQUETA = 0.5
+
+# Factor aplicado según el tipo de coincidencia del término buscado
+FACTOR_EXACTO = 1.0
+FACTOR_PREFIJO = 0.8
+FACTOR_APROXIMADO = 0.6
+
+_PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'que', 'se', 'su', 'un', 'una', 'y'
+}
+_PATRON_TOKEN = re.compile(r'[a-z0-9$_]+')
+
+
+def normalizar_texto(texto) -> str:
+    """Pasa el texto a minúsculas y elimina tildes ('Educación' -> 'educacion')."""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto) -> List[str]:
+    """Divide un texto normalizado en términos, descartando palabras vacías."""
+    return [t for t in _PATRON_TOKEN.findall(normalizar_texto(texto)) if t not in _PALABRAS_VACIAS]
+
+
+def _trigramas(termino: str) -> Set[str]:
+    relleno = f"  {termino} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Distancia de Levenshtein con corte temprano cuando supera `maximo`."""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+class IndiceVariables:
+    """
+    Índice invertido sobre VARIABLE_DESCRIPTIONS y VALUE_LABELS.
+    Se construye una sola vez; cada búsqueda solo hace consultas a diccionarios.
+    """
+
+    def __init__(self, descripciones: Dict[str, str], etiquetas: Dict[str, Dict]):
+        # término -> {variable: puntaje}
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for var, descripcion in descripciones.items():
+            self._agregar(var, [normalizar_texto(var)], PESO_CODIGO)
+            self._agregar(var, tokenizar(descripcion), PESO_DESCRIPCION)
+        for var, tabla in etiquetas.items():
+            self._agregar(var, [normalizar_texto(var)], PESO_CODIGO)
+            self._agregar(var, [t for texto in tabla.values() for t in tokenizar(texto)], PESO_ETIQUETA)
+
+        self.vocabulario = sorted(self.postings)
+        # trigrama -> términos del vocabulario (para tolerar errores de tipeo)
+        self.trigramas: Dict[str, Set[str]] = defaultdict(set)
+        for termino in self.vocabulario:
+            for tri in _trigramas(termino):
+                self.trigramas[tri].add(termino)
+
+    def _agregar(self, var: str, terminos: Iterable[str], peso: float):
+        for termino in set(terminos):
+            self.postings[termino][var] = max(self.postings[termino].get(var, 0.0), peso)
+
+    def _terminos_candidatos(self, termino: str) -> Dict[str, float]:
+        """Devuelve los términos del vocabulario que coinciden con `termino` y su factor."""
+        candidatos = {}
+        if termino in self.postings:
+            candidatos[termino] = FACTOR_EXACTO
+
+        # Coincidencias por prefijo ('educ' -> 'educacion', 'educativo', ...)
+        if len(termino) >= 3:
+            pos = bisect_left(self.vocabulario, termino)
+            while pos < len(self.vocabulario) and self.vocabulario[pos].startswith(termino):
+                candidatos.setdefault(self.vocabulario[pos], FACTOR_PREFIJO)
+                pos += 1
+
+        # Coincidencias aproximadas solo si no hubo exacta
+        if termino not in self.postings and len(termino) >= 4:
+            maximo = 1 if len(termino) <= 6 else 2
+            tris = _trigramas(termino)
+            conteo = defaultdict(int)
+            for tri in tris:
+                for otro in self.trigramas.get(tri, ()):
+                    conteo[otro] += 1
+            for otro, comunes in conteo.items():
+                if comunes * 2 < len(tris) or otro in candidatos:
+                    continue
+                if _distancia_edicion(termino, otro, maximo) <= maximo:
+                    candidatos[otro] = FACTOR_APROXIMADO
+        return candidatos
+
+    def buscar(self, consulta: str, limite: Optional[int] = 20) -> List[Tuple[str, float]]:
+        """Devuelve pares (variable, puntaje) ordenados de mayor a menor relevancia."""
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+
+        puntajes: Dict[str, float] = defaultdict(float)
+        cobertura: Dict[str, int] = defaultdict(int)
+        for termino in terminos:
+            mejores: Dict[str, float] = {}
+            for candidato, factor in self._terminos_candidatos(termino).items():
+                for var, peso in self.postings[candidato].items():
+                    mejores[var] = max(mejores.get(var, 0.0), peso * factor)
+            for var, puntaje in mejores.items():
+                puntajes[var] += puntaje
+                cobertura[var] += 1
+
+        # Se premian las variables que cubren todos los términos de la consulta
+        resultado = [(var, puntaje * cobertura[var] / len(terminos)) for var, puntaje in puntajes.items()]
+        resultado.sort(key=lambda par: (-par[1], par[0]))
+        return resultado[:limite] if limite else resultado
+
+
+@lru_cache(maxsize=1)
+def obtener_indice() -> IndiceVariables:
+    """Construye (una sola vez por proceso) el índice sobre el diccionario ENAHO."""
+    return IndiceVariables(VARIABLE_DESCRIPTIONS, VALUE_LABELS)
+
+
+@lru_cache(maxsize=512)
+def _buscar_en_cache(consulta: str) -> Tuple[Tuple[str, float], ...]:
+    return tuple(obtener_indice().buscar(consulta, limite=None))
+
+
+def buscar_variables(consulta: str, limite: Optional[int] = 20, variables: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Busca variables por código, descripción o etiquetas de valores.
+    Es insensible a tildes y mayúsculas y tolera errores de tipeo.
+    Si se pasa `variables` (p. ej. las columnas del dataset), el resultado se restringe a ellas
+    y se agregan las columnas no documentadas cuyo código contiene la consulta.
+    """
+    consulta_norm = normalizar_texto(consulta).strip()
+    if not consulta_norm:
+        return []
+
+    codigos = [var for var, _ in _buscar_en_cache(consulta_norm)]
+    if variables is not None:
+        disponibles = {str(v).lower(): v for v in variables}
+        codigos = [disponibles[var] for var in codigos if var in disponibles]
+        vistos = set(codigos)
+        codigos += [v for clave, v in disponibles.items()
+                    if v not in vistos and consulta_norm in normalizar_texto(clave)]
+    return codigos[:limite] if limite else codigos
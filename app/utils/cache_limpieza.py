@@ -0,0 +1,143 @@
+# app/utils/cache_limpieza.py
+# Caché de resultados de limpieza indexada por (huella del dataset, hash de la receta).
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from app.utils.recetas import aplicar_receta, validar_receta
+
+# Carpeta opcional para persistir resultados en Parquet entre sesiones (vacío = solo memoria)
+DIRECTORIO_CACHE = os.environ.get('ENAHO_CACHE_LIMPIEZA', '')
+MAX_ENTRADAS = 16
+MAX_MB = 2048
+
+# Errores de la escritura en Parquet, que es opcional: la entrada queda igual en memoria
+_ERRORES_PARQUET = (ImportError, ValueError, TypeError)
+try:
+    from pyarrow import ArrowException  # incluye ArrowNotImplementedError (tipos que Parquet no admite)
+    _ERRORES_PARQUET += (ArrowException,)
+except ImportError:
+    pass
+
+
+def huella_dataframe(df):
+    """
+    Huella del contenido de un DataFrame: nombres y tipos de columnas más un hash
+    vectorizado de todas las filas (índice incluido). Dos DataFrames con la misma huella
+    tienen el mismo contenido con altísima probabilidad.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([(str(col), str(tipo)) for col, tipo in df.dtypes.items()]).encode('utf-8'))
+    try:
+        filas = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:
+        # Columnas con objetos no hasheables (listas, dicts...): se hashea su texto
+        filas = pd.util.hash_pandas_object(df.astype(str), index=True)
+    h.update(filas.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def hash_receta(receta, **opciones):
+    """Hash canónico de la receta (JSON con claves ordenadas) y de las opciones que cambian el resultado."""
+    canonica = json.dumps({'receta': validar_receta(receta), 'opciones': opciones},
+                          sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(canonica.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CacheLimpieza:
+    """
+    Caché LRU en memoria (limitada por cantidad de entradas y MB) con copia opcional en disco.
+    Las entradas se tratan como de solo lectura: quien las use no debe modificarlas en sitio.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_mb=MAX_MB, directorio=DIRECTORIO_CACHE):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_mb * 1e6
+        self.directorio = Path(directorio) if directorio else None
+        self._entradas = OrderedDict()
+        self._bytes = {}
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _rutas(self, clave):
+        return self.directorio / f"{clave}.parquet", self.directorio / f"{clave}.json"
+
+    def obtener(self, clave):
+        if clave in self._entradas:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return self._entradas[clave]
+
+        if self.directorio is not None:
+            ruta_datos, ruta_attrs = self._rutas(clave)
+            if ruta_datos.exists():
+                df = pd.read_parquet(ruta_datos)
+                if ruta_attrs.exists():
+                    meta = json.loads(ruta_attrs.read_text(encoding='utf-8'))
+                    # Parquet no distingue texto `object` de `string`: se restaura el tipo original
+                    if meta['objetos']:
+                        df[meta['objetos']] = df[meta['objetos']].astype(object)
+                    df.attrs.update(meta['attrs'])
+                self._guardar_en_memoria(clave, df)
+                self.aciertos += 1
+                return df
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, df):
+        self._guardar_en_memoria(clave, df)
+        if self.directorio is not None:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            ruta_datos, ruta_attrs = self._rutas(clave)
+            try:
+                df.to_parquet(ruta_datos, index=True)
+                meta = {'attrs': df.attrs, 'objetos': [col for col in df.columns if df[col].dtype == object]}
+                ruta_attrs.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+            except _ERRORES_PARQUET:
+                # Sin pyarrow o con tipos que Parquet no admite: queda solo en memoria
+                ruta_datos.unlink(missing_ok=True)
+                ruta_attrs.unlink(missing_ok=True)
+
+    def _guardar_en_memoria(self, clave, df):
+        self._entradas[clave] = df
+        self._entradas.move_to_end(clave)
+        self._bytes[clave] = int(df.memory_usage(index=True, deep=True).sum())
+        # Se expulsan las menos usadas, pero nunca la recién guardada
+        while len(self._entradas) > 1 and (len(self._entradas) > self.max_entradas or sum(self._bytes.values()) > self.max_bytes):
+            expulsada, _ = self._entradas.popitem(last=False)
+            del self._bytes[expulsada]
+
+    def limpiar(self):
+        self._entradas.clear()
+        self._bytes.clear()
+
+    def estadisticas(self):
+        return {
+            'entradas': len(self._entradas),
+            'mb': round(sum(self._bytes.values()) / 1e6, 2),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'disco': str(self.directorio) if self.directorio else None,
+        }
+
+
+def limpiar_con_cache(df, receta, cache, huella=None, motor='pandas', **opciones):
+    """
+    Aplica la receta usando la caché. `huella` evita recalcular la huella de `df`
+    si el llamador ya la tiene. El motor forma parte de la clave: un resultado de Polars
+    no se sirve a quien pidió pandas (ni al revés).
+    Devuelve (df_limpio, desde_cache).
+    """
+    clave = f"{huella or huella_dataframe(df)}-{hash_receta(receta, motor=motor, **opciones)}"
+    resultado = cache.obtener(clave)
+    if resultado is not None:
+        return resultado, True
+    resultado = aplicar_receta(df, receta, motor=motor, **opciones)
+    cache.guardar(clave, resultado)
+    return resultado, False
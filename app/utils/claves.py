@@ -0,0 +1,206 @@
+# app/utils/claves.py
+# Índice de claves ENAHO (hogar / persona): unicidad, colisiones y deduplicación por clave.
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Identificadores de un hogar y de una persona en los módulos ENAHO
+CLAVES_HOGAR = ['conglome', 'vivienda', 'hogar']
+CLAVES_PERSONA = CLAVES_HOGAR + ['codperso']
+
+# Qué fila conservar cuando varias comparten la misma clave
+POLITICAS_DUPLICADOS = {
+    'primero': "Conservar la primera",
+    'ultimo': "Conservar la última",
+    'mas_completo': "Conservar la más completa (menos nulos)",
+}
+
+
+def _codigos_clave(serie, ordenar):
+    """Códigos enteros de una columna clave (-1 = nulo)."""
+    if pd.api.types.is_integer_dtype(serie.dtype) and not isinstance(serie.dtype, pd.api.extensions.ExtensionDtype) and len(serie):
+        valores = serie.to_numpy()
+        minimo = int(valores.min())
+        if int(valores.max()) - minimo <= 4 * len(valores) + 1024:
+            # Enteros de rango chico (conglome, vivienda, hogar...): el valor desplazado ya es un código ordenado
+            return (valores - minimo).astype(np.int64), None
+    try:
+        return pd.factorize(serie, sort=ordenar)
+    except TypeError:
+        return pd.factorize(serie.astype(str).where(serie.notna()), sort=ordenar)
+
+
+def codificar_claves(df, claves, metodo='hash'):
+    """
+    Codifica la combinación de `claves` de cada fila como un id entero denso.
+    - 'hash': factoriza cada clave con tablas hash (o desplaza enteros de rango chico) y combina los códigos.
+    - 'orden': ordena las filas por sus claves (lexsort) y numera los bloques de claves iguales;
+      los ids quedan en el orden de las claves y además se devuelve ese ordenamiento.
+    Las filas con alguna clave nula reciben -1. Devuelve (ids, orden o None).
+    """
+    n = len(df)
+    if not claves:
+        return np.arange(n, dtype=np.int64), None
+    codigos = []
+    nulos = np.zeros(n, dtype=bool)
+    for clave in claves:
+        cods, _ = _codigos_clave(df[clave], ordenar=(metodo == 'orden'))
+        nulos |= cods < 0
+        codigos.append(cods.astype(np.int64))
+
+    if metodo == 'orden':
+        orden = np.lexsort(codigos[::-1])
+        ordenados = np.stack([c[orden] for c in codigos]) if n else np.empty((len(claves), 0), dtype=np.int64)
+        # Un id nuevo empieza donde cambia cualquiera de las claves respecto a la fila anterior
+        cambios = np.ones(n, dtype=bool)
+        if n > 1:
+            cambios[1:] = (ordenados[:, 1:] != ordenados[:, :-1]).any(axis=0)
+        ids = np.empty(n, dtype=np.int64)
+        ids[orden] = np.cumsum(cambios) - 1
+    else:
+        ids = np.zeros(n, dtype=np.int64)
+        rango = 1
+        for cods in codigos:
+            base = int(cods.max(initial=-1)) + 2
+            if rango * base >= 2 ** 62:
+                # Se densifica solo si la combinación de códigos podría desbordar int64
+                ids, _ = pd.factorize(ids)
+                rango = int(ids.max(initial=0)) + 1
+            ids = ids * base + cods + 1
+            rango *= base
+        if rango <= 4 * n + 1024:
+            # Densificación sin tabla hash: mapa de códigos presentes sobre el rango
+            presentes = np.zeros(rango, dtype=bool)
+            presentes[ids] = True
+            ids = (np.cumsum(presentes) - 1)[ids]
+        else:
+            ids, _ = pd.factorize(ids)
+        orden = None
+
+    if nulos.any():
+        ids[nulos] = -1
+        validos = ids >= 0
+        # Se vuelven a numerar 0..K-1 sin huecos tras descartar las filas sin clave
+        _, ids[validos] = np.unique(ids[validos], return_inverse=True)
+    return ids, orden
+
+
+def seleccionar_filas(ids, politica='primero', nulos_por_fila=None):
+    """
+    Posiciones (ordenadas) de las filas a conservar: una por clave según la política,
+    más todas las filas sin clave (id -1), que nunca se consideran duplicadas.
+    """
+    ids = np.asarray(ids)
+    posiciones = np.arange(len(ids))
+    validas = ids >= 0
+    if politica in ('primero', 'ultimo'):
+        # `duplicated` sobre los ids enteros es una sola pasada con tabla hash (sin ordenar)
+        repetidas = pd.Series(ids).duplicated(keep='first' if politica == 'primero' else 'last').to_numpy()
+        return posiciones[~repetidas | ~validas]
+    if politica == 'mas_completo':
+        if nulos_por_fila is None:
+            raise ValueError("La política 'mas_completo' necesita el número de nulos por fila.")
+        pos, grupos, nulos = posiciones[validas], ids[validas], np.asarray(nulos_por_fila)[validas]
+        # Por clave: menos nulos primero y, en empate, la fila que aparece antes
+        orden = np.lexsort((pos, nulos, grupos))
+        grupos = grupos[orden]
+        primeras = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]]) if len(grupos) else np.empty(0, dtype=np.int64)
+        elegidas = pos[orden][primeras]
+    else:
+        raise ValueError(f"Política de duplicados desconocida: {politica!r}.")
+    return np.sort(np.concatenate([elegidas, posiciones[~validas]]))
+
+
+class IndiceClaves:
+    """
+    Índice de las claves de un dataset: id denso por fila, tamaño de cada clave y
+    colisiones. Sirve para deduplicar por clave, para uniones y para detectar si un
+    módulo está a nivel de hogar o de persona.
+    """
+
+    def __init__(self, df: pd.DataFrame, claves: Sequence[str], metodo: str = 'hash'):
+        faltantes = [c for c in claves if c not in df.columns]
+        if faltantes:
+            raise KeyError(f"El dataset no tiene las columnas clave: {', '.join(faltantes)}.")
+        self.claves = list(claves)
+        self.metodo = metodo
+        self.ids, self.orden = codificar_claves(df, self.claves, metodo)
+        self.n_claves = int(self.ids.max(initial=-1)) + 1
+        self.tamanos = np.bincount(self.ids[self.ids >= 0], minlength=self.n_claves)
+        self.filas_sin_clave = int((self.ids < 0).sum())
+        self._df = df
+
+    @property
+    def es_unico(self) -> bool:
+        """True si ninguna clave se repite (las filas sin clave no cuentan)."""
+        return bool((self.tamanos <= 1).all())
+
+    @property
+    def filas_duplicadas(self) -> int:
+        """Filas que sobran: las que repiten una clave ya vista."""
+        return int((self.tamanos - 1).clip(min=0).sum())
+
+    def colisiones(self, limite: Optional[int] = 1000) -> pd.DataFrame:
+        """Claves repetidas con su número de filas, de mayor a menor."""
+        repetidos = np.flatnonzero(self.tamanos > 1)
+        if limite:
+            repetidos = repetidos[np.argsort(-self.tamanos[repetidos], kind='stable')][:limite]
+        _, primera_fila = np.unique(self.ids, return_index=True)
+        primera_fila = primera_fila[-self.n_claves:] if self.n_claves else primera_fila[:0]
+        tabla = self._df.iloc[primera_fila[repetidos]][self.claves].reset_index(drop=True)
+        tabla['repeticiones'] = self.tamanos[repetidos]
+        return tabla
+
+    def seleccionar(self, politica: str = 'primero') -> np.ndarray:
+        nulos = self._df.isna().sum(axis=1).to_numpy() if politica == 'mas_completo' else None
+        return seleccionar_filas(self.ids, politica, nulos)
+
+    def deduplicar(self, politica: str = 'primero') -> pd.DataFrame:
+        """Una fila por clave, en una sola pasada vectorizada (conserva el índice original)."""
+        return self._df.iloc[self.seleccionar(politica)]
+
+    def resumen(self) -> dict:
+        return {
+            'claves': self.claves,
+            'filas': len(self.ids),
+            'claves_distintas': self.n_claves,
+            'filas_sin_clave': self.filas_sin_clave,
+            'claves_repetidas': int((self.tamanos > 1).sum()),
+            'filas_duplicadas': self.filas_duplicadas,
+            'es_unico': self.es_unico,
+        }
+
+
+def claves_disponibles(columnas: Sequence[str]) -> List[str]:
+    """Claves ENAHO presentes en las columnas (en el orden estándar)."""
+    return [c for c in CLAVES_PERSONA if c in columnas]
+
+
+def obtener_indice_claves(dataset: dict, claves: Sequence[str]) -> IndiceClaves:
+    """Índice de claves de `df_original`, construido una sola vez por dataset y conjunto de claves."""
+    indices = dataset.setdefault('indices_claves', {})
+    if tuple(claves) not in indices:
+        indices[tuple(claves)] = IndiceClaves(dataset['df_original'], claves)
+    return indices[tuple(claves)]
+
+
+def detectar_nivel(df: pd.DataFrame, indices: Optional[dict] = None) -> str:
+    """
+    Nivel del módulo según sus claves: 'hogar' si la clave de hogar es única,
+    'persona' si (hogar + codperso) es única, y 'desconocido' en otro caso.
+    `indices` ({tupla de claves: IndiceClaves}) permite reutilizar índices ya construidos.
+    """
+    indices = {} if indices is None else indices
+    for nivel, claves in (('hogar', CLAVES_HOGAR), ('persona', CLAVES_PERSONA)):
+        if all(c in df.columns for c in claves):
+            if tuple(claves) not in indices:
+                indices[tuple(claves)] = IndiceClaves(df, claves)
+            if indices[tuple(claves)].es_unico:
+                return nivel
+    return 'desconocido'
+
+
+def deduplicar_por_claves(df: pd.DataFrame, claves: Sequence[str], politica: str = 'primero') -> pd.DataFrame:
+    return IndiceClaves(df, claves).deduplicar(politica)
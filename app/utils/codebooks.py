@@ -0,0 +1,155 @@
+# app/utils/codebooks.py
+# Registro de diccionarios (codebooks) ENAHO por año y módulo, con tablas de etiquetas compartidas.
+
+import re
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from app.utils.labels_base import VARIABLE_DESCRIPTIONS, VALUE_LABELS
+
+AÑO_BASE = 2023
+
+# Columnas donde ENAHO guarda el año (según la codificación con que se leyó el archivo)
+COLUMNAS_AÑO = ['año', 'ano', 'anio', 'a�o']
+
+VARIABLES_IDENTIFICACION = {
+    'año', 'mes', 'nconglome', 'sub_conglome', 'conglome', 'vivienda', 'hogar', 'ubigeo',
+    'dominio', 'estrato', 'periodo', 'tipenc', 'fecent', 'result', 'panel', 'factor07',
+    'codccpp', 'nomccpp', 'longitud', 'latitud'
+}
+_PATRON_MODULO = re.compile(r'^[pdit](\d+)')
+
+
+class EntradaCodebook(NamedTuple):
+    """Resultado de resolver una variable: metadatos y año del codebook que la documenta."""
+    variable: str
+    año: int
+    modulo: str
+    descripcion: Optional[str]
+    etiquetas: Mapping
+
+
+def modulo_de_variable(variable: str) -> str:
+    """Deduce el módulo ENAHO a partir del código de la variable (p301a -> '300', p2005 -> '2000')."""
+    variable = variable.lower()
+    if variable in VARIABLES_IDENTIFICACION:
+        return 'identificacion'
+    coincidencia = _PATRON_MODULO.match(variable)
+    if not coincidencia:
+        return 'sumaria'
+    digitos = coincidencia.group(1)
+    if digitos.startswith('20') and len(digitos) >= 4:
+        return '2000'
+    return f"{digitos[0]}00"
+
+
+class RegistroCodebooks:
+    """
+    Guarda los codebooks por (año, módulo). Las descripciones y tablas de etiquetas
+    idénticas entre años se almacenan una sola vez y se comparten por referencia.
+    """
+
+    def __init__(self):
+        self._tablas: Dict[Tuple, Mapping] = {}
+        self._textos: Dict[str, str] = {}
+        # (año, módulo) -> {variable: (descripción, etiquetas)}
+        self._codebooks: Dict[Tuple[int, str], Dict[str, Tuple[Optional[str], Mapping]]] = {}
+        # año -> {variable: módulo}, para resolver (año, variable) sin recorrer módulos
+        self._indice: Dict[int, Dict[str, str]] = {}
+
+    def _internar_tabla(self, tabla: Optional[Mapping]) -> Mapping:
+        clave = tuple(sorted((repr(k), v) for k, v in (tabla or {}).items()))
+        if clave not in self._tablas:
+            self._tablas[clave] = MappingProxyType(dict(tabla or {}))
+        return self._tablas[clave]
+
+    def _internar_texto(self, texto: Optional[str]) -> Optional[str]:
+        if texto is None:
+            return None
+        return self._textos.setdefault(texto, texto)
+
+    def registrar(self, año: int, descripciones: Mapping[str, str], etiquetas: Mapping[str, Mapping],
+                  modulo: Optional[str] = None):
+        """
+        Registra el codebook de un año. Si no se indica `modulo`, cada variable
+        se asigna a su módulo según su código.
+        """
+        año = int(año)
+        variables = set(descripciones) | set(etiquetas)
+        for variable in sorted(variables):
+            var = variable.lower()
+            mod = modulo or modulo_de_variable(var)
+            entrada = (self._internar_texto(descripciones.get(variable)), self._internar_tabla(etiquetas.get(variable)))
+            self._codebooks.setdefault((año, mod), {})[var] = entrada
+            self._indice.setdefault(año, {})[var] = mod
+
+    def años(self) -> List[int]:
+        return sorted(self._indice)
+
+    def modulos(self, año: int) -> List[str]:
+        return sorted(mod for (a, mod) in self._codebooks if a == año)
+
+    def _años_candidatos(self, año: Optional[int]) -> List[int]:
+        """Orden de búsqueda: el año pedido, luego los anteriores más cercanos y al final los posteriores."""
+        registrados = self.años()
+        if año is None:
+            return sorted(registrados, key=lambda a: (a != AÑO_BASE, -a))
+        return sorted(registrados, key=lambda a: (a > año, abs(a - año)))
+
+    def resolver(self, año: Optional[int], variable: str) -> Optional[EntradaCodebook]:
+        """Devuelve los metadatos de `variable` según el codebook más cercano a `año`."""
+        var = variable.lower()
+        for candidato in self._años_candidatos(año):
+            modulo = self._indice[candidato].get(var)
+            if modulo is not None:
+                descripcion, etiquetas = self._codebooks[(candidato, modulo)][var]
+                return EntradaCodebook(var, candidato, modulo, descripcion, etiquetas)
+        return None
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Resume cuánto se comparte: referencias registradas frente a tablas únicas almacenadas."""
+        referencias = sum(len(vars_) for vars_ in self._codebooks.values())
+        return {
+            'años': len(self._indice),
+            'codebooks': len(self._codebooks),
+            'referencias': referencias,
+            'tablas_unicas': len(self._tablas),
+            'textos_unicos': len(self._textos),
+        }
+
+
+# Registro único del proceso: se comparte entre sesiones sin copiar diccionarios
+REGISTRO = RegistroCodebooks()
+REGISTRO.registrar(AÑO_BASE, VARIABLE_DESCRIPTIONS, VALUE_LABELS)
+
+
+def registrar_codebook(año: int, descripciones: Mapping[str, str], etiquetas: Mapping[str, Mapping],
+                       modulo: Optional[str] = None):
+    """Agrega al registro global el codebook de otro año (p. ej. ENAHO 2015-2024)."""
+    REGISTRO.registrar(año, descripciones, etiquetas, modulo)
+
+
+def detectar_año(df: pd.DataFrame) -> Optional[int]:
+    """Detecta el año de la encuesta a partir de la columna `año` (valor más frecuente)."""
+    columna = next((c for c in COLUMNAS_AÑO if c in df.columns), None)
+    if columna is None:
+        return None
+    valores = pd.to_numeric(df[columna], errors='coerce').dropna()
+    if valores.empty:
+        return None
+    año = int(valores.mode().iloc[0])
+    return año if 1990 <= año <= 2100 else None
+
+
+def obtener_descripcion(variable: str, año: Optional[int] = None) -> Optional[str]:
+    """Descripción de la variable según el codebook del año indicado (o el más cercano)."""
+    entrada = REGISTRO.resolver(año, variable)
+    return entrada.descripcion if entrada else None
+
+
+def obtener_etiquetas(variable: str, año: Optional[int] = None) -> Mapping:
+    """Etiquetas de valores de la variable según el codebook del año indicado (o el más cercano)."""
+    entrada = REGISTRO.resolver(año, variable)
+    return entrada.etiquetas if entrada else MappingProxyType({})
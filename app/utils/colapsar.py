@@ -0,0 +1,145 @@
+# app/utils/colapsar.py
+# Colapso de módulos de personas al nivel de hogar (como `collapse` de Stata) con reducciones por segmentos.
+
+import numpy as np
+import pandas as pd
+
+from app.utils.claves import CLAVES_HOGAR, codificar_claves
+from app.utils.codebooks import obtener_etiquetas
+
+ESTADISTICAS = {
+    'suma': "Suma",
+    'media': "Media",
+    'conteo': "Conteo de valores no nulos",
+    'max': "Máximo",
+    'min': "Mínimo",
+    'proporcion': "Proporción de cada categoría",
+}
+# Más categorías que esto en una proporción generaría demasiadas columnas
+MAX_CATEGORIAS_PROPORCION = 50
+
+
+class _Segmentos:
+    """Orden de las filas por id y el inicio de cada grupo, calculados una sola vez y solo si se piden max/min."""
+
+    def __init__(self, ids, n_grupos):
+        validas = np.flatnonzero(ids >= 0)
+        self.orden = validas[np.argsort(ids[validas], kind='stable')]
+        tamanos = np.bincount(ids[validas], minlength=n_grupos)
+        self.inicios = np.concatenate(([0], np.cumsum(tamanos)[:-1]))
+
+    def reducir(self, valores, ufunc, neutro):
+        """`ufunc.reduceat` por grupo ignorando nulos (los nulos valen `neutro`)."""
+        ordenados = valores[self.orden]
+        ordenados = np.where(np.isnan(ordenados), neutro, ordenados)
+        if len(ordenados) == 0:
+            return np.full(len(self.inicios), np.nan)
+        return ufunc.reduceat(ordenados, np.minimum(self.inicios, len(ordenados) - 1))
+
+
+def _numerico(serie):
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _codigo_texto(valor):
+    numero = pd.to_numeric(pd.Series([valor]), errors='coerce').iloc[0]
+    return str(int(numero)) if pd.notna(numero) and float(numero).is_integer() else str(valor)
+
+
+def colapsar(df, especificacion, claves=CLAVES_HOGAR, pesos=None, año=None):
+    """
+    Colapsa `df` a una fila por combinación de `claves` (por defecto, el hogar).
+    `especificacion` es {columna: [estadísticas]} con estadísticas de ESTADISTICAS, p. ej.
+    {'p208a': ['media', 'max'], 'i524': ['suma'], 'p207': ['proporcion']}.
+    La clave se codifica una vez como ids densos y cada estadística es una reducción vectorizada
+    (`bincount` para sumas, medias, conteos y proporciones; `reduceat` sobre segmentos para max/min).
+    Con `pesos` (p. ej. 'facpob07'), suma, media y proporción se ponderan; las filas con peso nulo no cuentan en ellas.
+    Las proporciones usan las etiquetas del codebook de `año` para describir sus columnas.
+    Devuelve las claves más una columna por estadística (p. ej. 'p208a_media', 'p207_prop_1'),
+    lista para unirse a módulos de hogar.
+    """
+    faltantes = [c for c in list(claves) + list(especificacion) + ([pesos] if pesos else []) if c not in df.columns]
+    if faltantes:
+        raise KeyError(f"El dataset no tiene las columnas: {', '.join(dict.fromkeys(faltantes))}.")
+    desconocidas = {e for estadisticas in especificacion.values() for e in estadisticas} - set(ESTADISTICAS)
+    if desconocidas:
+        raise ValueError(f"Estadísticas desconocidas: {', '.join(sorted(desconocidas))}.")
+
+    # 1. La clave se codifica una sola vez (ids densos 0..G-1, -1 = clave nula)
+    ids, _ = codificar_claves(df, list(claves))
+    n_grupos = int(ids.max(initial=-1)) + 1
+    con_clave = ids >= 0
+    ids_validos = ids[con_clave]
+    w = _numerico(df[pesos])[con_clave] if pesos else None
+
+    # Primera fila de cada grupo: de ahí salen los valores de las claves
+    primeras = np.flatnonzero(~pd.Series(ids).duplicated().to_numpy() & con_clave)
+    resultado = {clave: df[clave].to_numpy()[primeras] for clave in claves}
+    orden_grupos = ids[primeras]
+    descripciones = {}
+    segmentos = None
+
+    def _suma(valores):
+        return np.bincount(ids_validos, weights=valores, minlength=n_grupos)
+
+    # 2. Una reducción vectorizada por estadística
+    for columna, estadisticas in especificacion.items():
+        if 'proporcion' in estadisticas:
+            codigos, categorias = pd.factorize(df[columna].to_numpy()[con_clave], sort=True)
+            if len(categorias) > MAX_CATEGORIAS_PROPORCION:
+                raise ValueError(f"'{columna}' tiene {len(categorias)} categorías; el máximo para proporciones es {MAX_CATEGORIAS_PROPORCION}.")
+            validos = codigos >= 0
+            if w is not None:
+                validos &= ~np.isnan(w)
+            peso = np.where(validos, 1.0 if w is None else w, 0.0)
+            # Conteos (ponderados) por (grupo, categoría) en un solo bincount sobre ids * K + categoría
+            conteos = np.bincount(ids_validos[validos] * len(categorias) + codigos[validos], weights=peso[validos],
+                                  minlength=n_grupos * len(categorias)).reshape(n_grupos, len(categorias))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                proporciones = conteos / conteos.sum(axis=1, keepdims=True)
+            etiquetas = {_codigo_texto(k): v for k, v in obtener_etiquetas(columna, año).items()}
+            for j, categoria in enumerate(categorias):
+                codigo = _codigo_texto(categoria)
+                nombre = f"{columna}_prop_{codigo}"
+                resultado[nombre] = proporciones[orden_grupos, j]
+                descripciones[nombre] = f"Proporción de {columna} = {etiquetas.get(codigo, codigo)}"
+
+        numericas = [e for e in estadisticas if e != 'proporcion']
+        if not numericas:
+            continue
+        valores = _numerico(df[columna])[con_clave]
+        validos = ~np.isnan(valores)
+        conteo = _suma(validos.astype('float64'))
+        if 'suma' in numericas or 'media' in numericas:
+            # Con pesos, una fila sin peso no entra ni en el numerador ni en el denominador (como Stata)
+            ponderables = validos if w is None else validos & ~np.isnan(w)
+            ponderados = np.where(ponderables, valores if w is None else valores * w, 0.0)
+            suma = _suma(ponderados)
+            denominador = conteo if w is None else _suma(np.where(ponderables, w, 0.0))
+        for estadistica in numericas:
+            nombre = f"{columna}_{estadistica}"
+            if estadistica == 'suma':
+                valores_grupo = suma
+            elif estadistica == 'media':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    valores_grupo = suma / denominador
+            elif estadistica == 'conteo':
+                valores_grupo = conteo.astype(np.int64)
+            else:
+                if segmentos is None:
+                    segmentos = _Segmentos(ids, n_grupos)
+                completos = _numerico(df[columna])
+                if estadistica == 'max':
+                    valores_grupo = segmentos.reducir(completos, np.maximum, -np.inf)
+                else:
+                    valores_grupo = segmentos.reducir(completos, np.minimum, np.inf)
+                # Grupos sin ningún valor: nulo (como groupby.max/min)
+                valores_grupo = np.where(conteo > 0, valores_grupo, np.nan)
+            resultado[nombre] = valores_grupo[orden_grupos]
+            descripciones[nombre] = f"{ESTADISTICAS[estadistica]} de {columna}" + (f" (ponderada por {pesos})" if pesos and estadistica in ('suma', 'media') else "")
+
+    # 3. Una fila por grupo, ordenada por las claves (como `collapse ..., by()` de Stata)
+    colapsado = pd.DataFrame(resultado).sort_values(list(claves), kind='stable', ignore_index=True)
+    colapsado.attrs['descripciones'] = descripciones
+    colapsado.attrs['colapso'] = {'claves': list(claves), 'filas_origen': len(df), 'grupos': n_grupos, 'pesos': pesos}
+    return colapsado
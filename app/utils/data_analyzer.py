@@ -2,19 +2,23 @@
 
 import pandas as pd
 from app.utils.labels_base import obtener_descripcion  # ✅ Agregamos labels
+from app.utils.backends import obtener_backend
 
-def analizar_dataframe(df):
+def analizar_dataframe(df, motor='pandas'):
     """
     Realiza un análisis completo de un DataFrame y devuelve las métricas.
     Versión enriquecida con descripciones desde labels_base.
+    Los conteos y estadísticas los calcula el motor elegido ('pandas', 'polars' o 'auto').
     """
+    backend = obtener_backend(motor, df)
 
     # Métricas generales
     num_rows, num_cols = df.shape
     total_cells = num_rows * num_cols
-    num_duplicates = df.duplicated().sum()
+    num_duplicates = backend.contar_duplicados(df)
     percent_duplicates = (num_duplicates / num_rows) * 100 if num_rows > 0 else 0
-    total_nulls = df.isnull().sum().sum()
+    nulos = backend.nulos_por_columna(df)
+    total_nulls = nulos.sum()
     percent_nulls = (total_nulls / total_cells) * 100 if total_cells > 0 else 0
 
     # Tipos de datos
@@ -22,16 +26,16 @@ def analizar_dataframe(df):
     dtype_counts.columns = ['Tipo de Dato', 'Cantidad']
 
     # Columnas con valores nulos
-    nulls_per_column = df.isnull().sum().reset_index()
+    nulls_per_column = nulos.reset_index()
     nulls_per_column.columns = ['Columna', 'Nulos']
     nulls_per_column = nulls_per_column[nulls_per_column['Nulos'] > 0].sort_values(by='Nulos', ascending=False)
 
     # Estadísticas descriptivas
-    desc_numericas = df.describe(include='number').T.reset_index()
+    desc_numericas = backend.describir_numericas(df).reset_index()
     desc_numericas.rename(columns={'index': 'Variable'}, inplace=True)
     desc_numericas['Descripción'] = desc_numericas['Variable'].apply(lambda var: obtener_descripcion(var) or "Sin descripción")
 
-    desc_categoricas = df.describe(include=['object', 'category']).T.reset_index()
+    desc_categoricas = backend.describir_categoricas(df).reset_index()
     desc_categoricas.rename(columns={'index': 'Variable'}, inplace=True)
     desc_categoricas['Descripción'] = desc_categoricas['Variable'].apply(lambda var: obtener_descripcion(var) or "Sin descripción")
 
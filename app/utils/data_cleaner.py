@@ -1,46 +1,457 @@
 # app/utils/data_cleaner.py
 
+from collections import defaultdict
+
+import numpy as np
 import pandas as pd
+from app.utils.labels_base import MISSING_CODES
+from app.utils.claves import IndiceClaves, seleccionar_filas
+
+# Tipos enteros con máscara: permiten NA sin convertir la columna a float
+_ENTEROS_CON_MASCARA = {
+    'int8': 'Int8', 'int16': 'Int16', 'int32': 'Int32', 'int64': 'Int64',
+    'uint8': 'UInt8', 'uint16': 'UInt16', 'uint32': 'UInt32', 'uint64': 'UInt64',
+}
+
+# Claves disponibles para imputar por grupo; 'departamento' se deriva del ubigeo
+CLAVE_DEPARTAMENTO = 'departamento'
+CLAVES_GRUPO_DISPONIBLES = ['dominio', 'estrato', 'area', CLAVE_DEPARTAMENTO]
 
-def limpiar_dataframe(df, opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados, columnas_a_mantener):
+# Orden en que el optimizador ejecuta los pasos del plan (menor = antes)
+_PRIORIDAD_PASOS = {
+    'proyectar': 0,
+    'normalizar': 1,
+    'filtrar': 2,
+    'normalizar_filtrar': 2,
+    'imputar': 3,
+    'deduplicar': 4,
+}
+
+def _mascaras_centinelas(df, codigos):
     """
-    Aplica las operaciones de limpieza seleccionadas al DataFrame.
-    Esta función solo procesa datos, no muestra nada en la UI.
+    Agrupa las columnas numéricas por su conjunto de códigos centinela y calcula
+    una máscara booleana por grupo con un solo `isin`. Devuelve [(columnas, máscara)].
+    """
+    grupos = defaultdict(list)
+    for col in df.columns:
+        codigos_col = codigos.get(str(col).lower())
+        if codigos_col and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            grupos[tuple(sorted(codigos_col))].append(col)
+    return [(cols, df[cols].isin(codigos_grupo)) for codigos_grupo, cols in grupos.items()]
+
+def _tipos_con_mascara(df, columnas):
+    """Tipos destino para que las columnas enteras acepten NA sin pasar a float."""
+    return {col: _ENTEROS_CON_MASCARA.get(str(df[col].dtype), df[col].dtype) for col in columnas}
+
+def normalizar_codigos_faltantes(df, codigos=None, copiar=True):
     """
-    df_limpio = df.copy()
+    Convierte en NA los códigos de no respuesta que el diccionario ENAHO documenta (p. ej. 9 = "Missing value").
+    Las columnas con el mismo conjunto de códigos se evalúan en bloque con un solo `isin`,
+    y las columnas enteras pasan a tipos con máscara (Int64...) en lugar de float.
+    Devuelve el DataFrame normalizado y un dict {variable: cantidad de valores convertidos}.
+    Con `copiar=False` modifica `df` directamente (útil cuando el llamador ya trabaja sobre una copia).
+    """
+    codigos = MISSING_CODES if codigos is None else codigos
+    mascaras = _mascaras_centinelas(df, codigos)
+    if not mascaras:
+        return df, {}
+
+    df_norm = df.copy() if copiar else df
+    conteos = {}
+    for cols, mascara in mascaras:
+        por_columna = mascara.sum()
+        afectadas = por_columna[por_columna > 0].index.tolist()
+        if not afectadas:
+            continue
+
+        # Tipos enteros con máscara y asignación en bloque
+        bloque = df_norm[afectadas].astype(_tipos_con_mascara(df_norm, afectadas))
+        df_norm[afectadas] = bloque.mask(mascara[afectadas])
+        conteos.update({col: int(por_columna[col]) for col in afectadas})
 
-    # 1. Selección de columnas
-    # Asegura que solo se usan columnas que existen en el dataframe
-    columnas_validas = [col for col in columnas_a_mantener if col in df_limpio.columns]
-    df_limpio = df_limpio[columnas_validas]
+    return df_norm, conteos
+
+# ==============================================================================
+# PLAN DE LIMPIEZA: pasos declarativos, optimizador y ejecución
+# ==============================================================================
+
+def construir_plan(opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados, columnas_a_mantener, normalizar_faltantes=False, columnas_grupo=None,
+                   claves_duplicados=None, politica_duplicados='primero'):
+    """
+    Traduce las opciones de la barra lateral a una lista de pasos declarativos.
+    Cada paso es un dict con la clave 'op' (proyectar, normalizar, filtrar, imputar, deduplicar).
+    Las opciones "... por grupo" usan `columnas_grupo` (p. ej. dominio, estrato, departamento).
+    Con `claves_duplicados` (p. ej. conglome, vivienda, hogar) se deduplica por clave y no por fila
+    completa, conservando la fila que indique `politica_duplicados` (primero, ultimo, mas_completo).
+    """
+    plan = [{'op': 'proyectar', 'columnas': list(columnas_a_mantener)}]
+    if normalizar_faltantes:
+        plan.append({'op': 'normalizar'})
 
-    # 2. Manejo de nulos
     if opcion_nulos_num == "Eliminar filas con nulos":
         # Nota: Esto eliminará filas con CUALQUIER nulo, no solo numérico. Es un comportamiento común.
-        df_limpio.dropna(inplace=True)
+        plan.append({'op': 'filtrar', 'criterio': 'nulos'})
     else:
-        # Lógica para nulos numéricos
-        numeric_cols = df_limpio.select_dtypes(include='number').columns
-        if opcion_nulos_num == "Rellenar con la media":
-            df_limpio[numeric_cols] = df_limpio[numeric_cols].fillna(df_limpio[numeric_cols].mean())
-        elif opcion_nulos_num == "Rellenar con la mediana":
-            df_limpio[numeric_cols] = df_limpio[numeric_cols].fillna(df_limpio[numeric_cols].median())
-
-        # Lógica para nulos categóricos
-        cat_cols = df_limpio.select_dtypes(include=['object', 'category']).columns
-        if opcion_nulos_cat == "Rellenar con la moda":
-            # Rellenar cada columna con su propia moda
-            for col in cat_cols:
-                if not df_limpio[col].mode().empty:
-                    df_limpio[col].fillna(df_limpio[col].mode()[0], inplace=True)
-        elif opcion_nulos_cat == "Rellenar con 'Desconocido'":
-            df_limpio[cat_cols] = df_limpio[cat_cols].fillna('Desconocido')
-
-    # 3. Eliminar duplicados
+        if opcion_nulos_num.startswith("Rellenar con"):
+            plan.append({'op': 'imputar', 'numerico': opcion_nulos_num})
+        if opcion_nulos_cat.startswith("Rellenar con"):
+            plan.append({'op': 'imputar', 'categorico': opcion_nulos_cat})
+        if columnas_grupo and "por grupo" in f"{opcion_nulos_num} {opcion_nulos_cat}":
+            for paso in plan:
+                if paso['op'] == 'imputar':
+                    paso['grupos'] = list(columnas_grupo)
+
     if eliminar_duplicados:
-        df_limpio.drop_duplicates(inplace=True)
+        paso = {'op': 'deduplicar'}
+        if claves_duplicados:
+            paso.update({'claves': list(claves_duplicados), 'politica': politica_duplicados})
+        plan.append(paso)
+    return plan
+
+def optimizar_plan(plan):
+    """
+    Reordena y fusiona los pasos del plan:
+    - La proyección de columnas va primero, así nunca se copia el DataFrame completo.
+    - Los filtros de filas se adelantan a la imputación y la deduplicación.
+    - Normalizar + filtrar se fusionan en una sola máscara de filas.
+    - Las imputaciones numérica y categórica se fusionan en una sola asignación.
+    """
+    # sorted es estable: los pasos con igual prioridad conservan su orden
+    ordenado = sorted(plan, key=lambda paso: _PRIORIDAD_PASOS[paso['op']])
+
+    optimizado = []
+    for paso in ordenado:
+        anterior = optimizado[-1] if optimizado else None
+        if anterior and anterior['op'] == 'proyectar' and paso['op'] == 'proyectar':
+            # Dos proyecciones seguidas equivalen a su intersección
+            optimizado[-1] = {'op': 'proyectar', 'columnas': [c for c in anterior['columnas'] if c in paso['columnas']]}
+        elif anterior and anterior['op'] == 'normalizar' and paso['op'] == 'filtrar':
+            optimizado[-1] = {'op': 'normalizar_filtrar', 'criterio': paso['criterio']}
+        elif anterior and anterior['op'] == 'imputar' and paso['op'] == 'imputar':
+            optimizado[-1] = {**anterior, **paso}
+        elif anterior and anterior['op'] == paso['op'] and paso['op'] in ('normalizar', 'filtrar', 'deduplicar'):
+            continue
+        else:
+            optimizado.append(dict(paso))
+    return optimizado
+
+def _codificar(serie):
+    """Códigos enteros (-1 = nulo) y valores únicos ordenados de una columna (o arreglo)."""
+    if isinstance(getattr(serie, 'dtype', None), pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    try:
+        return pd.factorize(serie, sort=True)
+    except TypeError:
+        # Tipos mezclados que no se pueden ordenar: se usa el orden de aparición
+        return pd.factorize(serie)
+
+def _moda_por_codigos(codigos, valores):
+    """Valor más frecuente dados los códigos de una columna (-1 = nulo); en empate, el menor."""
+    conteos = np.bincount(codigos + 1, minlength=len(valores) + 1)[1:]
+    if not conteos.size or not conteos.max():
+        return None
+    empatados = np.flatnonzero(conteos == conteos.max())
+    if len(empatados) == 1:
+        return valores[empatados[0]]
+    try:
+        return min(valores[empatados])
+    except TypeError:
+        return valores[empatados[0]]
+
+def _modas_categoricas(df, columnas):
+    """
+    Moda de cada columna categórica. Las de tipo category cuentan sus `cat.codes` con
+    `np.bincount` (sin volver a hashear los valores); en las de texto (object y str)
+    `Series.mode()` es más rápido que factorizar y contar, así que se usa directamente.
+    En caso de empate gana el valor menor, igual que `Series.mode()[0]`.
+    """
+    modas = {}
+    for col in columnas:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            moda = _moda_por_codigos(serie.cat.codes.to_numpy(), serie.cat.categories)
+        else:
+            moda = serie.mode()
+            moda = moda.iloc[0] if not moda.empty else None
+        if moda is not None:
+            modas[col] = moda
+    return modas
+
+# ==============================================================================
+# IMPUTACIÓN POR GRUPO: estadísticos por grupo en una pasada, sin bucles por grupo
+# ==============================================================================
+
+def _serie_clave(df, clave):
+    if clave == CLAVE_DEPARTAMENTO and clave not in df.columns:
+        # Los dos primeros dígitos del ubigeo (6 dígitos) identifican el departamento
+        return pd.to_numeric(df['ubigeo'], errors='coerce') // 10000
+    return df[clave]
+
+def claves_grupo_validas(columnas, claves):
+    """Filtra las claves de agrupación que se pueden construir con las columnas dadas."""
+    return [c for c in claves if c in columnas or (c == CLAVE_DEPARTAMENTO and 'ubigeo' in columnas)]
+
+def ids_grupo(df, claves):
+    """
+    Codifica la combinación de claves de cada fila como un id entero denso (0..G-1).
+    Las filas con alguna clave nula reciben -1 y se imputan con el estadístico global.
+    """
+    ids = np.zeros(len(df), dtype=np.int64)
+    nulos = np.zeros(len(df), dtype=bool)
+    for clave in claves:
+        codigos, unicos = pd.factorize(_serie_clave(df, clave))
+        nulos |= codigos < 0
+        # Se vuelve a densificar tras cada clave para que los ids no desborden
+        ids, _ = pd.factorize(ids * (len(unicos) + 1) + codigos + 1)
+    ids[nulos] = -1
+    return ids
+
+def _media_por_grupo(valores, ids, n_grupos):
+    validos = (ids >= 0) & ~np.isnan(valores)
+    sumas = np.bincount(ids[validos], weights=valores[validos], minlength=n_grupos)
+    conteos = np.bincount(ids[validos], minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sumas / conteos
+
+def _mediana_por_grupo(valores, ids, n_grupos):
+    """Mediana por grupo con un solo ordenamiento (grupo, valor)."""
+    validos = (ids >= 0) & ~np.isnan(valores)
+    grupos, x = ids[validos], valores[validos]
+    orden = np.lexsort((x, grupos))
+    x = x[orden]
+    conteos = np.bincount(grupos, minlength=n_grupos)
+    inicios = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+    medianas = np.full(n_grupos, np.nan)
+    hay = conteos > 0
+    bajo = inicios[hay] + (conteos[hay] - 1) // 2
+    alto = inicios[hay] + conteos[hay] // 2
+    medianas[hay] = (x[bajo] + x[alto]) / 2
+    return medianas
+
+def _moda_por_grupo(codigos, num_categorias, ids, n_grupos):
+    """Código de la moda por grupo (-1 si el grupo no tiene valores); empates -> código menor."""
+    validos = (ids >= 0) & (codigos >= 0)
+    pares = ids[validos] * num_categorias + codigos[validos]
+    unicos, conteos = np.unique(pares, return_counts=True)
+    grupos, cods = unicos // num_categorias, unicos % num_categorias
+    orden = np.lexsort((cods, -conteos, grupos))
+    grupos, cods = grupos[orden], cods[orden]
+    _, primeros = np.unique(grupos, return_index=True)
+    modas = np.full(n_grupos, -1, dtype=np.int64)
+    modas[grupos[primeros]] = cods[primeros]
+    return modas
+
+def _relleno_por_grupo(df, paso, ids):
+    """
+    Calcula, para cada columna afectada, una serie con el estadístico de su grupo
+    difundido a cada fila (sin bucles por grupo).
+    """
+    n_grupos = int(ids.max()) + 1 if len(ids) else 0
+    relleno = {}
+    if n_grupos == 0:
+        return relleno
+
+    estrategia_num = paso.get('numerico', '')
+    if estrategia_num.endswith("por grupo"):
+        estadistico = _media_por_grupo if "media " in estrategia_num else _mediana_por_grupo
+        for col in df.select_dtypes(include='number').columns:
+            valores = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            # Se agrega un NaN al final para que el id -1 (sin grupo) no reciba valor
+            por_grupo = np.append(estadistico(valores, ids, n_grupos), np.nan)
+            relleno[col] = por_grupo[ids]
+
+    if paso.get('categorico', '').endswith("por grupo"):
+        for col in df.select_dtypes(include=['object', 'category']).columns:
+            codigos, categorias = _codificar(df[col])
+            modas = np.append(_moda_por_grupo(codigos, len(categorias), ids, n_grupos), -1)
+            relleno[col] = categorias.take(modas[ids], allow_fill=True, fill_value=None)
+
+    return relleno
+
+def _valores_imputacion(df, paso):
+    """
+    Calcula los valores de relleno globales de las columnas afectadas por un paso 'imputar'.
+    En las opciones por grupo sirven de respaldo para los grupos sin datos.
+    """
+    valores = {}
+
+    # Lógica para nulos numéricos
+    numeric_cols = df.select_dtypes(include='number').columns
+    # "mediana" se evalúa primero: "Rellenar con la mediana" también empieza con "Rellenar con la media"
+    if paso.get('numerico', '').startswith("Rellenar con la mediana"):
+        valores.update(df[numeric_cols].median().dropna().to_dict())
+    elif paso.get('numerico', '').startswith("Rellenar con la media"):
+        valores.update(df[numeric_cols].mean().dropna().to_dict())
+
+    # Lógica para nulos categóricos
+    cat_cols = df.select_dtypes(include=['object', 'category']).columns
+    if paso.get('categorico', '').startswith("Rellenar con la moda"):
+        # Rellenar cada columna con su propia moda (se aplica junto al resto en un solo fillna)
+        valores.update(_modas_categoricas(df, cat_cols))
+    elif paso.get('categorico') == "Rellenar con 'Desconocido'":
+        valores.update({col: 'Desconocido' for col in cat_cols})
+    return valores
+
+def _tiene_decimales(valores):
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[~np.isnan(valores)]
+    return bool(np.any(valores != np.floor(valores)))
+
+def _imputar(df, paso, ids=None):
+    """
+    Rellena los nulos de todas las columnas del paso en una sola asignación.
+    Con `ids` (grupo de cada fila) primero se usa el estadístico del grupo y luego el global.
+    """
+    valores = _valores_imputacion(df, paso)
+    relleno = _relleno_por_grupo(df, paso, ids) if ids is not None else {}
+    if not valores and not relleno:
+        return df
+
+    # Las columnas enteras con máscara no aceptan una media/mediana con decimales
+    a_float = [col for col in set(valores) | set(relleno)
+               if pd.api.types.is_extension_array_dtype(df[col]) and pd.api.types.is_integer_dtype(df[col])
+               and _tiene_decimales(np.append(relleno.get(col, []), valores.get(col, np.nan)))]
+    if a_float:
+        df = df.astype({col: 'Float64' for col in a_float})
+    if relleno:
+        df = df.fillna(pd.DataFrame(relleno, index=df.index))
+    return df.fillna(valores) if valores else df
+
+def _normalizar_y_filtrar(df, info):
+    """
+    Paso fusionado: una sola máscara de filas con nulos reales o códigos de no respuesta.
+    Las filas conservadas ya no tienen centinelas, así que solo se ajustan los tipos.
+    """
+    filas_invalidas = df.isna().any(axis=1)
+    conteos, afectadas = {}, []
+    for cols, mascara in _mascaras_centinelas(df, MISSING_CODES):
+        por_columna = mascara.sum()
+        conteos.update({col: int(n) for col, n in por_columna.items() if n > 0})
+        afectadas += [col for col in cols if por_columna[col] > 0]
+        filas_invalidas |= mascara.any(axis=1)
 
-    # 4. Resetear el índice para evitar problemas futuros
-    df_limpio.reset_index(drop=True, inplace=True)
-    
-    return df_limpio
\ No newline at end of file
+    info['codigos_faltantes'] = conteos
+    df = df[~filas_invalidas]
+    return df.astype(_tipos_con_mascara(df, afectadas)) if afectadas else df
+
+def ejecutar_plan(df, plan, resetear_indice=True):
+    """
+    Ejecuta un plan (idealmente ya optimizado) sobre `df` sin modificar el original.
+    Devuelve el DataFrame resultante con el índice reiniciado; el resumen de códigos
+    de no respuesta convertidos queda en `attrs['codigos_faltantes']`.
+    Con `resetear_indice=False` se conserva el índice de `df` (p. ej. para el historial de versiones).
+    """
+    df_limpio = df
+    info = {'codigos_faltantes': {}}
+
+    # Los ids de grupo se calculan sobre `df` (antes de proyectar) para que las claves
+    # de agrupación no tengan que conservarse entre las columnas elegidas
+    claves = next((paso['grupos'] for paso in plan if paso.get('grupos')), None)
+    claves = claves_grupo_validas(df.columns, claves) if claves else None
+    ids_origen = pd.Series(ids_grupo(df, claves), index=df.index) if claves else None
+    # Igual para la deduplicación por clave: las claves pueden no estar entre las columnas elegidas
+    claves_dup = next((paso['claves'] for paso in plan if paso.get('claves')), None)
+    ids_claves = pd.Series(IndiceClaves(df, claves_dup).ids, index=df.index) if claves_dup else None
+    # 'mas_completo' compara los nulos reales: se cuentan antes de imputar (después todas las filas se ven completas)
+    contar_nulos = any(paso.get('politica') == 'mas_completo' for paso in plan)
+    nulos_previos = None
+    # Cada paso devuelve un DataFrame nuevo; solo hace falta copiar si aún trabajamos sobre `df`
+    propio = False
+
+    for paso in plan:
+        op = paso['op']
+        if op == 'proyectar':
+            # Asegura que solo se usan columnas que existen en el dataframe
+            columnas_validas = [col for col in paso['columnas'] if col in df_limpio.columns]
+            df_limpio = df_limpio[columnas_validas]
+        elif op == 'normalizar':
+            df_limpio, info['codigos_faltantes'] = normalizar_codigos_faltantes(df_limpio, copiar=not propio)
+        elif op == 'filtrar':
+            df_limpio = df_limpio.dropna()
+        elif op == 'normalizar_filtrar':
+            df_limpio = _normalizar_y_filtrar(df_limpio, info)
+        elif op == 'imputar':
+            if contar_nulos and nulos_previos is None:
+                nulos_previos = df_limpio.isna().sum(axis=1)
+            ids = ids_origen.reindex(df_limpio.index).to_numpy() if ids_origen is not None and paso.get('grupos') else None
+            df_limpio = _imputar(df_limpio, paso, ids)
+        elif op == 'deduplicar' and paso.get('claves'):
+            politica = paso.get('politica', 'primero')
+            nulos = None
+            if politica == 'mas_completo':
+                nulos = (nulos_previos.reindex(df_limpio.index) if nulos_previos is not None else df_limpio.isna().sum(axis=1)).to_numpy()
+            df_limpio = df_limpio.iloc[seleccionar_filas(ids_claves.reindex(df_limpio.index).to_numpy(), politica, nulos)]
+        elif op == 'deduplicar':
+            df_limpio = df_limpio.drop_duplicates()
+        propio = propio or df_limpio is not df
+
+    # Resetear el índice una sola vez, al final (también garantiza un objeto nuevo)
+    df_limpio = df_limpio.reset_index(drop=True) if resetear_indice else df_limpio.copy(deep=False)
+    df_limpio.attrs['codigos_faltantes'] = info['codigos_faltantes']
+    return df_limpio
+
+def estimar_costo_plan(df, plan, tamano_muestra=10_000):
+    """
+    Estima, sin ejecutarlo, cuántas filas y columnas procesa cada paso y cuánta memoria recorre.
+    La selectividad de los filtros se estima con una muestra de filas.
+    """
+    filas = len(df)
+    columnas = list(df.columns)
+    bytes_por_columna = df.memory_usage(index=False, deep=False)
+    muestra = df.sample(n=min(tamano_muestra, filas), random_state=0) if filas else df
+
+    registros = []
+    for paso in plan:
+        op = paso['op']
+        if op == 'proyectar':
+            columnas = [col for col in paso['columnas'] if col in df.columns]
+            detalle = f"{len(columnas)} columnas"
+        elif op in ('filtrar', 'normalizar_filtrar'):
+            sub = muestra[columnas]
+            invalidas = sub.isna().any(axis=1)
+            if op == 'normalizar_filtrar':
+                for _, mascara in _mascaras_centinelas(sub, MISSING_CODES):
+                    invalidas |= mascara.any(axis=1)
+            detalle = "Filas con nulos" + (" o códigos de no respuesta" if op == 'normalizar_filtrar' else "")
+        elif op == 'normalizar':
+            detalle = "Códigos de no respuesta -> nulos"
+        elif op == 'imputar':
+            detalle = " + ".join(str(paso[k]) for k in ('numerico', 'categorico') if k in paso)
+            if paso.get('grupos'):
+                detalle += f" (grupos: {', '.join(paso['grupos'])})"
+        elif paso.get('claves'):
+            detalle = f"Duplicados por clave ({', '.join(paso['claves'])}), política: {paso.get('politica', 'primero')}"
+        else:
+            detalle = "Filas duplicadas"
+
+        escala = filas / len(df) if len(df) else 0
+        mb = float(bytes_por_columna[columnas].sum()) * escala / 1e6 if columnas else 0.0
+        registros.append({'Paso': op, 'Detalle': detalle, 'Filas (est.)': int(filas),
+                          'Columnas': len(columnas), 'MB procesados (est.)': round(mb, 2)})
+
+        if op in ('filtrar', 'normalizar_filtrar') and len(muestra):
+            # Las filas que sobreviven al filtro son las que procesan los pasos siguientes
+            filas = int(filas * (1 - invalidas.mean()))
+
+    return pd.DataFrame(registros)
+
+def limpiar_dataframe(df, opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados, columnas_a_mantener, normalizar_faltantes=False, columnas_grupo=None,
+                      claves_duplicados=None, politica_duplicados='primero', motor='pandas', resetear_indice=True):
+    """
+    Aplica las operaciones de limpieza seleccionadas al DataFrame.
+    Esta función solo procesa datos, no muestra nada en la UI.
+    Construye el plan de limpieza, lo optimiza y lo ejecuta una sola vez.
+    Si `normalizar_faltantes` es True, los códigos de no respuesta se convierten en nulos
+    antes de imputar; el conteo por variable queda en `df_limpio.attrs['codigos_faltantes']`.
+    Las opciones "... por grupo" imputan con el estadístico de cada grupo de `columnas_grupo`.
+    `claves_duplicados` y `politica_duplicados` deduplican por clave (ver app/utils/claves.py).
+    `motor` elige quién ejecuta el plan: 'pandas', 'polars' o 'auto' (ver app/utils/backends.py).
+    Con `resetear_indice=False` el resultado conserva el índice de las filas de `df`.
+    """
+    plan = optimizar_plan(construir_plan(opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados, columnas_a_mantener, normalizar_faltantes, columnas_grupo,
+                                         claves_duplicados, politica_duplicados))
+    if motor == 'pandas':
+        return ejecutar_plan(df, plan, resetear_indice)
+    # Importación diferida: backends depende de este módulo
+    from app.utils.backends import obtener_backend
+    return obtener_backend(motor, df).ejecutar_plan(df, plan, resetear_indice)
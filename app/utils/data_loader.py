@@ -11,6 +11,18 @@ def cargar_datos(archivo_subido):
     Carga datos desde un archivo CSV o Excel subido por el usuario.
     Maneja diferentes codificaciones de texto para CSV.
     """
+    return leer_archivo(archivo_subido)
+
+def cargar_datos_desde_ruta(ruta):
+    """Igual que `cargar_datos`, pero lee un archivo del disco (sin Streamlit, p. ej. desde la CLI)."""
+    with open(ruta, 'rb') as archivo:
+        return leer_archivo(archivo)
+
+def leer_archivo(archivo_subido):
+    """
+    Lee un CSV o Excel desde un objeto tipo archivo con atributo `name`.
+    Devuelve (df, mensaje); df es None si hubo un error.
+    """
     try:
         extension = archivo_subido.name.split('.')[-1].lower()
         
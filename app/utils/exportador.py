@@ -0,0 +1,263 @@
+# app/utils/exportador.py
+# Exportación bajo demanda: se escribe por bloques a un archivo temporal y se reutiliza por versión.
+
+import gzip
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.utils.codebooks import obtener_descripcion, obtener_etiquetas
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Sin pyarrow solo se ofrece CSV
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyreadstat
+except ImportError:  # Sin pyreadstat no se ofrece .sav
+    pyreadstat = None
+
+TAMANO_BLOQUE = 100_000
+
+# formato -> (etiqueta, extensión, tipo MIME)
+FORMATOS_EXPORTACION = {
+    'parquet': ("Parquet (rápido y compacto)", '.parquet', 'application/octet-stream'),
+    'feather': ("Feather / Arrow IPC (el más rápido de leer)", '.feather', 'application/octet-stream'),
+    'csv.gz': ("CSV comprimido (gzip)", '.csv.gz', 'application/gzip'),
+    'csv.zst': ("CSV comprimido (zstd)", '.csv.zst', 'application/zstd'),
+    'csv': ("CSV sin comprimir", '.csv', 'text/csv'),
+    'dta': ("Stata .dta (con etiquetas)", '.dta', 'application/x-stata-dta'),
+    'sav': ("SPSS .sav (con etiquetas)", '.sav', 'application/x-spss-sav'),
+}
+
+# Rangos de los enteros de Stata (los valores más altos están reservados para faltantes)
+_ENTEROS_STATA = [('Int8', -127, 100), ('Int16', -32767, 32740), ('Int32', -2147483647, 2147483620)]
+MAX_ETIQUETA_VARIABLE = 80
+MAX_NOMBRE_STATA = 32
+# Palabras que Stata no acepta como nombre de variable
+_RESERVADAS_STATA = frozenset({
+    'aggregate', 'array', 'boolean', 'break', 'byte', 'case', 'catch', 'class', 'colvector', 'complex', 'const',
+    'continue', 'default', 'delegate', 'delete', 'do', 'double', 'else', 'eltypedef', 'end', 'enum', 'explicit',
+    'export', 'external', 'float', 'for', 'friend', 'function', 'global', 'goto', 'if', 'inline', 'int', 'local',
+    'long', 'NULL', 'pragma', 'protected', 'quad', 'rowvector', 'short', 'typedef', 'typename', 'virtual',
+    '_all', '_N', '_skip', '_b', '_pi', 'str#', 'in', '_pred', 'strL', '_coef', '_rc', 'using', '_cons', '_se',
+    'with', '_n',
+})
+
+_DIRECTORIO = None
+
+
+def _directorio_temporal():
+    global _DIRECTORIO
+    if _DIRECTORIO is None:
+        _DIRECTORIO = Path(tempfile.mkdtemp(prefix='enaho_export_'))
+    return _DIRECTORIO
+
+
+def formatos_disponibles():
+    """Formatos que se pueden generar con los paquetes instalados."""
+    disponibles = []
+    for formato in FORMATOS_EXPORTACION:
+        if formato in ('parquet', 'feather') and pa is None:
+            continue
+        if formato == 'csv.zst' and zstandard is None:
+            continue
+        if formato == 'sav' and pyreadstat is None:
+            continue
+        disponibles.append(formato)
+    return disponibles
+
+
+def _bloques(df, tamano_bloque):
+    for inicio in range(0, max(len(df), 1), tamano_bloque):
+        yield df.iloc[inicio:inicio + tamano_bloque]
+
+
+def _escribir_csv(df, ruta, formato, tamano_bloque):
+    if formato == 'csv.gz':
+        destino = gzip.open(ruta, 'wt', encoding='utf-8', newline='', compresslevel=6)
+    elif formato == 'csv.zst':
+        crudo = open(ruta, 'wb')
+        destino = io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(crudo), encoding='utf-8', newline='')
+    else:
+        destino = open(ruta, 'w', encoding='utf-8', newline='')
+    with destino:
+        for i, bloque in enumerate(_bloques(df, tamano_bloque)):
+            bloque.to_csv(destino, index=False, header=(i == 0))
+
+
+def _escribir_arrow(df, ruta, formato, tamano_bloque):
+    # El esquema se fija con todo el DataFrame para que los bloques no difieran en tipos
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    if formato == 'parquet':
+        escritor = pq.ParquetWriter(ruta, esquema, compression='zstd')
+        escribir = escritor.write_table
+    else:
+        escritor = pa_ipc.new_file(str(ruta), esquema, options=pa_ipc.IpcWriteOptions(compression='lz4'))
+        escribir = escritor.write
+    with escritor:
+        for bloque in _bloques(df, tamano_bloque):
+            escribir(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+
+def _entero_compacto(serie):
+    """Tipo entero más chico de Stata que contiene a la columna, o None si tiene decimales o no cabe."""
+    valores = serie.dropna().to_numpy(dtype='float64')
+    if valores.size == 0:
+        return 'Int8'
+    if not np.all(valores == np.floor(valores)):
+        return None
+    minimo, maximo = valores.min(), valores.max()
+    return next((tipo for tipo, bajo, alto in _ENTEROS_STATA if bajo <= minimo and maximo <= alto), None)
+
+
+def _etiquetas_enteras(etiquetas):
+    """Etiquetas de valores con códigos enteros (Stata y SPSS solo etiquetan códigos numéricos)."""
+    enteras = {}
+    for codigo, texto in etiquetas.items():
+        try:
+            valor = float(codigo)
+        except (TypeError, ValueError):
+            continue
+        if valor.is_integer():
+            enteras[int(valor)] = str(texto)
+    return enteras
+
+
+def _nombre_stata(nombre):
+    """Letras, dígitos y '_' (p1171$01 -> p1171_01), sin empezar con dígito ni ser palabra reservada."""
+    nombre = ''.join(c if (c.isascii() and (c.isalnum() or c == '_')) or (ord(c) >= 192 and c not in '×÷') else '_'
+                     for c in str(nombre)) or '_'
+    if nombre in _RESERVADAS_STATA or nombre[0].isdigit():
+        nombre = '_' + nombre
+    return nombre[:MAX_NOMBRE_STATA]
+
+
+def nombres_stata(columnas):
+    """
+    Nombres válidos en Stata para `columnas`, sin repetidos. Devuelve {original: nuevo}.
+    Renombrar antes de escribir evita que `to_stata` lo haga por su cuenta y las etiquetas,
+    guardadas con el nombre original, se pierdan.
+    """
+    candidatos = {col: _nombre_stata(col) for col in columnas}
+    usados = {nuevo for col, nuevo in candidatos.items() if nuevo == col}
+    nombres = {}
+    for col, nuevo in candidatos.items():
+        if nuevo != col:
+            base, n = nuevo, 1
+            while nuevo in usados:
+                sufijo = f"_{n}"
+                nuevo, n = base[:MAX_NOMBRE_STATA - len(sufijo)] + sufijo, n + 1
+            usados.add(nuevo)
+        nombres[col] = nuevo
+    return nombres
+
+
+def preparar_etiquetado(df, año=None, formato='dta'):
+    """
+    Prepara `df` para Stata/SPSS: etiquetas de variable (codebook del año) y de valores,
+    variables codificadas en el entero más chico posible (solo .dta; SPSS guarda todo como double)
+    y texto como `str`. En .dta las columnas se renombran con `nombres_stata` y las etiquetas
+    usan los nombres nuevos. Devuelve (df_convertido, etiquetas_variables, etiquetas_valores).
+    El resultado es una copia completa de `df`: mientras se escribe, la memoria llega a cerca del doble
+    del dataset (menos si los enteros compactos reducen las columnas numéricas).
+    """
+    nombres = nombres_stata(df.columns) if formato == 'dta' else {col: col for col in df.columns}
+    datos, etiquetas_variables, etiquetas_valores = {}, {}, {}
+    for col in df.columns:
+        serie = df[col]
+        destino = nombres[col]
+        descripcion = obtener_descripcion(str(col), año)
+        if descripcion:
+            etiquetas_variables[destino] = descripcion[:MAX_ETIQUETA_VARIABLE]
+
+        if pd.api.types.is_bool_dtype(serie):
+            serie = serie.astype('Int8')
+        elif pd.api.types.is_numeric_dtype(serie):
+            tipo = _entero_compacto(serie)
+            if tipo is not None:
+                etiquetas = _etiquetas_enteras(obtener_etiquetas(str(col), año))
+                if etiquetas:
+                    etiquetas_valores[destino] = etiquetas
+                serie = serie.astype(tipo) if formato == 'dta' else serie.astype('float64')
+            else:
+                serie = serie.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            # Texto (también categorías y objetos mixtos): cadenas con faltantes vacíos
+            serie = serie.astype(str).where(serie.notna(), '')
+        datos[destino] = serie
+    return pd.DataFrame(datos, index=df.index), etiquetas_variables, etiquetas_valores
+
+
+def _escribir_etiquetado(df, ruta, formato, año):
+    df, etiquetas_variables, etiquetas_valores = preparar_etiquetado(df, año, formato)
+    if formato == 'dta':
+        # Versión 118: Stata 14+, admite UTF-8 (tildes y ñ en nombres y etiquetas)
+        df.to_stata(ruta, write_index=False, version=118,
+                    variable_labels=etiquetas_variables, value_labels=etiquetas_valores)
+    else:
+        pyreadstat.write_sav(df, str(ruta), column_labels=[etiquetas_variables.get(c) for c in df.columns],
+                             variable_value_labels=etiquetas_valores, row_compress=True)
+
+
+def exportar(df, formato, ruta=None, tamano_bloque=TAMANO_BLOQUE, año=None):
+    """
+    Escribe `df` en `formato` por bloques (sin armar el archivo completo en memoria).
+    Stata y SPSS se escriben de una vez (sus escritores no admiten bloques) desde una copia
+    convertida con las etiquetas del codebook de `año`, así que necesitan cerca del doble de memoria.
+    Si no se indica `ruta` se usa un archivo temporal. Devuelve la ruta escrita.
+    """
+    if formato not in formatos_disponibles():
+        raise ValueError(f"Formato de exportación no disponible: {formato!r}.")
+    if ruta is None:
+        descriptor, ruta = tempfile.mkstemp(suffix=FORMATOS_EXPORTACION[formato][1], dir=_directorio_temporal())
+        os.close(descriptor)
+    ruta = Path(ruta)
+    try:
+        if formato.startswith('csv'):
+            _escribir_csv(df, ruta, formato, tamano_bloque)
+        elif formato in ('dta', 'sav'):
+            _escribir_etiquetado(df, ruta, formato, año)
+        else:
+            _escribir_arrow(df, ruta, formato, tamano_bloque)
+    except Exception:
+        ruta.unlink(missing_ok=True)
+        raise
+    return ruta
+
+
+def obtener_exportacion(dataset, formato):
+    """
+    Devuelve el archivo exportado del `df_limpio` del dataset, generándolo solo si no existe
+    para su versión actual. Los archivos de versiones anteriores se borran.
+    """
+    version = dataset.get('version', 0)
+    exportaciones = dataset.setdefault('exportaciones', {})
+    for (v, f), ruta in list(exportaciones.items()):
+        if v != version:
+            Path(ruta).unlink(missing_ok=True)
+            del exportaciones[(v, f)]
+
+    ruta = exportaciones.get((version, formato))
+    if ruta is None or not Path(ruta).exists():
+        ruta = exportar(dataset['df_limpio'], formato, año=dataset.get('año'))
+        exportaciones[(version, formato)] = ruta
+    return ruta
+
+
+def exportacion_lista(dataset, formato):
+    """True si ya hay un archivo generado para la versión actual en ese formato."""
+    ruta = dataset.get('exportaciones', {}).get((dataset.get('version', 0), formato))
+    return ruta is not None and Path(ruta).exists()
@@ -0,0 +1,210 @@
+# app/utils/historial.py
+# Historial de versiones de limpieza (deshacer / rehacer / ramas) con columnas compartidas.
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Version:
+    """
+    Un estado de `df_limpio`. No guarda una copia del DataFrame:
+    - `filas`: posiciones de sus filas en `df_original` (se comparte con el padre si no cambian).
+    - `columnas`: {columna: Serie propia o None}. None significa "igual a la columna de
+      `df_original` en esas filas"; una Serie heredada es el mismo objeto que la del padre.
+    """
+
+    def __init__(self, id_version: int, padre: Optional[int], descripcion: str,
+                 filas: np.ndarray, columnas: Dict[str, Optional[pd.Series]], info: Optional[dict] = None):
+        self.id = id_version
+        self.padre = padre
+        self.descripcion = descripcion
+        self.filas = filas
+        self.columnas = columnas
+        self.info = info or {}
+
+
+def _mismos_valores(a: pd.Series, b: pd.Series) -> bool:
+    """Compara valores y tipo de dos columnas alineadas por posición (ignora el índice)."""
+    if a.dtype != b.dtype or len(a) != len(b):
+        return False
+    return a.reset_index(drop=True).equals(b.reset_index(drop=True))
+
+
+class HistorialLimpieza:
+    """
+    Árbol de versiones de la limpieza de un dataset. La versión 0 es `df_original`.
+    Aplicar desde una versión anterior crea una rama nueva; deshacer va al padre y
+    rehacer vuelve al último hijo visitado.
+    """
+
+    def __init__(self, df_original: pd.DataFrame):
+        self.df_original = df_original
+        filas = np.arange(len(df_original))
+        self.versiones: Dict[int, Version] = {
+            0: Version(0, None, "Datos originales", filas, {col: None for col in df_original.columns})
+        }
+        self.actual = 0
+        # padre -> último hijo visitado (destino de "rehacer")
+        self._ultimo_hijo: Dict[int, int] = {}
+
+    # --- Registro de versiones ---------------------------------------------
+
+    def _posiciones(self, df: pd.DataFrame) -> np.ndarray:
+        """Posiciones en `df_original` de las filas de `df` (que debe conservar su índice)."""
+        posiciones = self.df_original.index.get_indexer(df.index)
+        if (posiciones < 0).any():
+            raise ValueError("El DataFrame no conserva el índice de df_original; usa resetear_indice=False.")
+        return posiciones
+
+    def registrar(self, df: pd.DataFrame, descripcion: str, info: Optional[dict] = None) -> int:
+        """
+        Agrega `df` como hija de la versión actual y la convierte en la actual.
+        Solo se guardan las columnas cuyos valores difieren del original y del padre.
+        """
+        padre, raiz = self.versiones[self.actual], self.versiones[0]
+        filas = self._posiciones(df)
+        # Se reutiliza el mismo arreglo de posiciones cuando las filas no cambian
+        if np.array_equal(filas, padre.filas):
+            filas = padre.filas
+        elif np.array_equal(filas, raiz.filas):
+            filas = raiz.filas
+
+        columnas = {}
+        for col in df.columns:
+            serie = df[col]
+            if col in self.df_original.columns:
+                base = self.df_original[col]
+                base = base if filas is raiz.filas else base.take(filas)
+                if _mismos_valores(serie, base):
+                    columnas[col] = None
+                    continue
+            heredada = padre.columnas.get(col)
+            if filas is padre.filas and heredada is not None and _mismos_valores(serie, heredada):
+                columnas[col] = heredada
+            else:
+                columnas[col] = serie.reset_index(drop=True)
+
+        id_version = max(self.versiones) + 1
+        self.versiones[id_version] = Version(id_version, padre.id, descripcion, filas, columnas, info)
+        self._ultimo_hijo[padre.id] = id_version
+        self.actual = id_version
+        return id_version
+
+    # --- Navegación ----------------------------------------------------------
+
+    def puede_deshacer(self) -> bool:
+        return self.versiones[self.actual].padre is not None
+
+    def puede_rehacer(self) -> bool:
+        return self.actual in self._ultimo_hijo
+
+    def deshacer(self) -> int:
+        if self.puede_deshacer():
+            self.actual = self.versiones[self.actual].padre
+        return self.actual
+
+    def rehacer(self) -> int:
+        if self.puede_rehacer():
+            self.actual = self._ultimo_hijo[self.actual]
+        return self.actual
+
+    def ir_a(self, id_version: int) -> int:
+        """Salta a cualquier versión del árbol (p. ej. otra rama)."""
+        if id_version not in self.versiones:
+            raise KeyError(f"No existe la versión {id_version}.")
+        self.actual = id_version
+        padre = self.versiones[id_version].padre
+        if padre is not None:
+            self._ultimo_hijo[padre] = id_version
+        return self.actual
+
+    # --- Lectura -------------------------------------------------------------
+
+    def materializar(self, id_version: Optional[int] = None) -> pd.DataFrame:
+        """Reconstruye el DataFrame de una versión (índice reiniciado, como `df_limpio`)."""
+        version = self.versiones[self.actual if id_version is None else id_version]
+        todas = version.filas is self.versiones[0].filas
+        datos = {}
+        for col, serie in version.columnas.items():
+            if serie is None:
+                base = self.df_original[col]
+                serie = base if todas else base.take(version.filas)
+            datos[col] = serie.reset_index(drop=True)
+        df = pd.DataFrame(datos, index=pd.RangeIndex(len(version.filas)))
+        df.attrs.update(version.info)
+        return df
+
+    def bytes_propios(self, id_version: int) -> int:
+        """Memoria que agrega una versión: sus columnas nuevas y, si cambian, sus posiciones de filas."""
+        version = self.versiones[id_version]
+        padre = self.versiones.get(version.padre)
+        propias = {id(s): s for s in version.columnas.values()
+                   if s is not None and (padre is None or all(s is not p for p in padre.columnas.values()))}
+        total = sum(int(s.memory_usage(index=False, deep=True)) for s in propias.values())
+        if padre is None or version.filas is not padre.filas:
+            total += version.filas.nbytes
+        return total
+
+    def resumen(self) -> pd.DataFrame:
+        """Tabla de versiones para la interfaz."""
+        registros = []
+        for version in self.versiones.values():
+            registros.append({
+                'Versión': version.id,
+                'Padre': version.padre,
+                'Descripción': version.descripcion,
+                'Filas': len(version.filas),
+                'Columnas': len(version.columnas),
+                'Columnas modificadas': sum(s is not None for s in version.columnas.values()),
+                'MB propios': round(self.bytes_propios(version.id) / 1e6, 3),
+                'Actual': '✅' if version.id == self.actual else '',
+            })
+        return pd.DataFrame(registros)
+
+    def comparar(self, id_a: int, id_b: int) -> Dict[str, object]:
+        """Diferencias de estructura entre dos versiones (filas y columnas)."""
+        a, b = self.versiones[id_a], self.versiones[id_b]
+        cols_a, cols_b = set(a.columnas), set(b.columnas)
+        comunes = [col for col in a.columnas if col in cols_b]
+        if a.filas is b.filas or np.array_equal(a.filas, b.filas):
+            distintas = [col for col in comunes if a.columnas[col] is not b.columnas[col]
+                         and not _mismos_valores(self._columna(a, col), self._columna(b, col))]
+        else:
+            distintas = comunes
+        return {
+            'filas_solo_en_a': int(np.setdiff1d(a.filas, b.filas, assume_unique=True).size),
+            'filas_solo_en_b': int(np.setdiff1d(b.filas, a.filas, assume_unique=True).size),
+            'columnas_solo_en_a': sorted(cols_a - cols_b),
+            'columnas_solo_en_b': sorted(cols_b - cols_a),
+            'columnas_con_cambios': distintas,
+        }
+
+    def _columna(self, version: Version, col: str) -> pd.Series:
+        serie = version.columnas[col]
+        if serie is None:
+            return self.df_original[col].take(version.filas)
+        return serie
+
+    def ramas(self) -> List[int]:
+        """Versiones hoja (puntas de cada rama)."""
+        padres = {v.padre for v in self.versiones.values()}
+        return [id_version for id_version in self.versiones if id_version not in padres]
+
+
+def obtener_historial(dataset: dict) -> HistorialLimpieza:
+    """Devuelve (creándolo si hace falta) el historial guardado en la entrada del dataset."""
+    if 'historial' not in dataset:
+        dataset['historial'] = HistorialLimpieza(dataset['df_original'])
+    return dataset['historial']
+
+
+def activar_version(dataset: dict, id_version: Optional[int] = None):
+    """Hace de `id_version` (o de la versión actual) el `df_limpio` del dataset."""
+    historial = obtener_historial(dataset)
+    if id_version is not None:
+        historial.ir_a(id_version)
+    dataset['df_limpio'] = historial.materializar()
+    dataset['reporte_faltantes'] = dataset['df_limpio'].attrs.get('codigos_faltantes', {})
+    dataset['version'] = historial.actual
@@ -785,8 +785,7 @@ VARIABLE_DESCRIPTIONS = {
     'ingreso_pc': 'Ingreso per cápita mensual (S/.)',
     'dominio_region': 'Dominio regional ampliado',
     'area': 'Área de residencia (1=Urbano, 2=Rural)',
-    'factor07': 'Factor de expansión anual (proyecciones CPV-2007)',
-    'facpob07': 'Factor de expansión de población (CPV-2007)',
+    # factor07 y facpob07 se documentan en Identificación y Módulo 200 (no se repiten aquí)
     'fac500a': 'Factor de expansión para módulo 500A',
     'fac500b': 'Factor de expansión para módulo 500B',
 }
@@ -1406,7 +1405,32 @@ VALUE_LABELS = {
 }
 
 # ==============================================================================
-# SECCIÓN 3: FUNCIONES AUXILIARES PARA MANEJO DE DATOS
+# SECCIÓN 3: CÓDIGOS DE NO RESPUESTA (MISSING_CODES)
+# Solo se listan los códigos que el diccionario de INEI documenta para cada variable
+# (p. ej. 9 = "Missing value"). No se infieren centinelas: un 9, 99 o 999999 sin
+# etiqueta puede ser un valor válido (montos, ingresos calculados de sumaria, conteos).
+# ==============================================================================
+# Etiquetas que INEI usa para la no respuesta dentro de las variables codificadas
+ETIQUETAS_NO_RESPUESTA = {'missing value', 'no especificado', 'no responde'}
+
+# Códigos documentados en el diccionario que no figuran en VALUE_LABELS (tienen prioridad)
+MISSING_CODES_MANUALES: Dict[str, List[int]] = {}
+
+def _generar_missing_codes() -> Dict[str, List[int]]:
+    """Arma el diccionario variable -> códigos de no respuesta documentados en sus etiquetas."""
+    codigos: Dict[str, List[int]] = {}
+    for variable, etiquetas in VALUE_LABELS.items():
+        faltantes = [k for k, texto in etiquetas.items()
+                     if isinstance(k, int) and str(texto).strip().lower() in ETIQUETAS_NO_RESPUESTA]
+        if faltantes:
+            codigos[variable] = sorted(faltantes)
+    codigos.update(MISSING_CODES_MANUALES)
+    return codigos
+
+MISSING_CODES: Dict[str, List[int]] = _generar_missing_codes()
+
+# ==============================================================================
+# SECCIÓN 4: FUNCIONES AUXILIARES PARA MANEJO DE DATOS
 # ==============================================================================
 
 def get_variable_label(variable_name: str) -> Optional[str]:
@@ -1417,6 +1441,10 @@ def get_value_labels(variable_name: str) -> Dict[Union[int, str], str]:
     """Devuelve el diccionario de etiquetas de valores para una variable"""
     return VALUE_LABELS.get(variable_name.lower(), {})
 
+def get_missing_codes(variable_name: str) -> List[int]:
+    """Devuelve los códigos de no respuesta (centinelas) de una variable"""
+    return MISSING_CODES.get(variable_name.lower(), [])
+
 def describe_variable(variable_name: str) -> str:
     """Provee una descripción completa de una variable con sus posibles valores"""
     label = get_variable_label(variable_name)
@@ -1432,14 +1460,18 @@ def describe_variable(variable_name: str) -> str:
 
 # ✅ Alias para compatibilidad con el resto del sistema
 obtener_descripcion = get_variable_label
-def generar_tabla_frecuencias(df: pd.DataFrame, variable: str) -> Optional[pd.DataFrame]:
-    """Genera una tabla de frecuencias profesional para una variable usando VALUE_LABELS."""
+def generar_tabla_frecuencias(df: pd.DataFrame, variable: str, etiquetas: Optional[Dict[Union[int, str], str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Genera una tabla de frecuencias profesional para una variable usando VALUE_LABELS.
+    Si se pasa `etiquetas` (p. ej. del codebook de otro año), se usan en lugar de VALUE_LABELS.
+    """
     if variable not in df.columns:
         return pd.DataFrame({'Error': [f"La variable '{variable}' no está en el dataset."]})
     
-    variable_lower = variable.lower()
+    if etiquetas is None:
+        etiquetas = VALUE_LABELS.get(variable.lower())
 
-    if variable_lower not in VALUE_LABELS:
+    if not etiquetas:
         # Si no hay etiquetas, mostrar conteo simple
         conteo = df[variable].value_counts(dropna=False).reset_index()
         conteo.columns = ['Valor', 'Frecuencia']
@@ -1451,8 +1483,7 @@ def generar_tabla_frecuencias(df: pd.DataFrame, variable: str) -> Optional[pd.Da
     conteo.columns = ['Código', 'Frecuencia']
     conteo = conteo.sort_values('Código')
 
-    etiquetas = VALUE_LABELS[variable_lower]
-    conteo['Etiqueta'] = conteo['Código'].map(etiquetas).fillna('Sin etiqueta')
+    conteo['Etiqueta'] = conteo['Código'].map(dict(etiquetas)).fillna('Sin etiqueta')
     total = conteo['Frecuencia'].sum()
     conteo['Porcentaje'] = (conteo['Frecuencia'] / total * 100).round(2)
 
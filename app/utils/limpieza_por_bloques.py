@@ -0,0 +1,296 @@
+# app/utils/limpieza_por_bloques.py
+# Limpieza fuera de memoria: lee el archivo por bloques y escribe el resultado directo a disco.
+
+import csv
+import gzip
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_cleaner import construir_plan, optimizar_plan, normalizar_codigos_faltantes
+
+ENCODINGS_CSV = ['utf-8', 'latin-1', 'windows-1252', 'iso-8859-1']
+TAMANO_BLOQUE = 100_000
+# Tamaño de la muestra (reservorio) con que se aproxima la mediana de cada columna
+TAMANO_RESERVORIO = 100_000
+# Cantidad de arreglos de hashes acumulados antes de fusionarlos en uno solo
+_MAX_SEGMENTOS_HASH = 8
+# Única carpeta del servidor que la interfaz web puede leer y escribir (vacío = función desactivada)
+DIRECTORIO_DATOS = os.environ.get('ENAHO_DIRECTORIO_DATOS', '')
+EXTENSIONES_ENTRADA = ('.csv', '.csv.gz', '.parquet')
+EXTENSIONES_SALIDA = ('.csv', '.csv.gz', '.parquet')
+
+
+def ruta_en_directorio_datos(ruta, directorio=DIRECTORIO_DATOS):
+    """
+    Resuelve `ruta` (relativa a `directorio`) y la rechaza si queda fuera de él,
+    incluso mediante '..', rutas absolutas o enlaces simbólicos.
+    """
+    if not directorio:
+        raise ValueError("No hay un directorio de datos configurado (ENAHO_DIRECTORIO_DATOS).")
+    base = Path(directorio).resolve()
+    destino = (base / ruta).resolve()
+    if destino == base or not destino.is_relative_to(base):
+        raise ValueError(f"La ruta '{ruta}' está fuera del directorio de datos.")
+    return destino
+
+
+def archivos_de_datos(directorio=DIRECTORIO_DATOS):
+    """Archivos CSV/Parquet dentro del directorio de datos, como rutas relativas a él."""
+    if not directorio or not Path(directorio).is_dir():
+        return []
+    base = Path(directorio).resolve()
+    return sorted(str(ruta.relative_to(base)) for ruta in base.rglob('*')
+                  if ruta.is_file() and ruta.name.lower().endswith(EXTENSIONES_ENTRADA) and ruta.resolve().is_relative_to(base))
+
+
+class _Reservorio:
+    """Muestra aleatoria uniforme de tamaño fijo (algoritmo R) para aproximar cuantiles."""
+
+    def __init__(self, capacidad=TAMANO_RESERVORIO, semilla=0):
+        self.capacidad = capacidad
+        self.vistos = 0
+        self.muestra = np.empty(0, dtype='float64')
+        self._rng = np.random.default_rng(semilla)
+
+    def agregar(self, valores):
+        valores = valores[~np.isnan(valores)]
+        libres = self.capacidad - len(self.muestra)
+        if libres > 0:
+            self.muestra = np.concatenate([self.muestra, valores[:libres]])
+            self.vistos += min(libres, len(valores))
+            valores = valores[libres:]
+        if len(valores):
+            # El elemento i-ésimo del flujo reemplaza una posición al azar con probabilidad k/i
+            posiciones = self._rng.integers(0, self.vistos + np.arange(1, len(valores) + 1))
+            reemplaza = posiciones < self.capacidad
+            self.muestra[posiciones[reemplaza]] = valores[reemplaza]
+            self.vistos += len(valores)
+
+    def mediana(self):
+        return float(np.median(self.muestra)) if len(self.muestra) else np.nan
+
+
+class _HashesVistos:
+    """Conjunto de hashes de filas guardado como arreglos ordenados (8 bytes por fila distinta)."""
+
+    def __init__(self):
+        self.segmentos = []
+
+    def contiene(self, hashes):
+        encontrados = np.zeros(len(hashes), dtype=bool)
+        for segmento in self.segmentos:
+            pos = np.searchsorted(segmento, hashes).clip(max=len(segmento) - 1)
+            encontrados |= segmento[pos] == hashes
+        return encontrados
+
+    def agregar(self, hashes):
+        if len(hashes):
+            self.segmentos.append(np.unique(hashes))
+        if len(self.segmentos) > _MAX_SEGMENTOS_HASH:
+            self.segmentos = [np.unique(np.concatenate(self.segmentos))]
+
+
+def _detectar_formato_csv(ruta, encoding=None):
+    """Detecta codificación y separador leyendo solo el inicio del archivo (descomprimido si es .csv.gz)."""
+    abrir = gzip.open if str(ruta).lower().endswith('.gz') else open
+    for enc in ([encoding] if encoding else ENCODINGS_CSV):
+        try:
+            with abrir(ruta, 'rt', encoding=enc) as f:
+                inicio = f.read(64_000)
+        except UnicodeDecodeError:
+            continue
+        try:
+            separador = csv.Sniffer().sniff(inicio, delimiters=',;|\t').delimiter
+        except csv.Error:
+            separador = ','
+        return enc, separador
+    raise ValueError("No se pudo decodificar el archivo CSV con las codificaciones comunes.")
+
+
+def _leer_bloques(ruta, columnas=None, tamano_bloque=TAMANO_BLOQUE, encoding=None):
+    """Genera DataFrames de `tamano_bloque` filas con los nombres de columna en minúsculas."""
+    # Por el final del nombre: 'datos.csv.gz' es CSV comprimido, no un formato 'gz'
+    nombre = Path(ruta).name.lower()
+    seleccion = {c.lower() for c in columnas} if columnas is not None else None
+
+    if nombre.endswith(('.csv', '.csv.gz')):
+        enc, separador = _detectar_formato_csv(ruta, encoding)
+        usecols = (lambda c: c.lower() in seleccion) if seleccion is not None else None
+        for bloque in pd.read_csv(ruta, sep=separador, encoding=enc, usecols=usecols, chunksize=tamano_bloque,
+                                  compression='infer'):
+            bloque.columns = [c.lower() for c in bloque.columns]
+            yield bloque
+    elif nombre.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta)
+        nombres = [n for n in archivo.schema_arrow.names if seleccion is None or n.lower() in seleccion]
+        for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=nombres):
+            bloque = lote.to_pandas()
+            bloque.columns = [c.lower() for c in bloque.columns]
+            yield bloque
+    else:
+        raise ValueError(f"Formato de '{Path(ruta).name}' no soportado para limpieza por bloques (use CSV, CSV.GZ o Parquet).")
+
+
+class _Escritor:
+    """Escribe los bloques limpios a CSV (opcionalmente .csv.gz) o Parquet sin acumularlos en memoria."""
+
+    def __init__(self, ruta, tipos):
+        self.ruta = str(ruta)
+        self.es_parquet = self.ruta.lower().endswith('.parquet')
+        self.tipos = tipos
+        self._archivo = None
+
+    def escribir(self, bloque):
+        if self.es_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._archivo is None:
+                # Esquema fijo desde la primera pasada: un bloque con una columna vacía no cambia el tipo
+                equivalentes = {'Int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string()}
+                self._esquema = pa.schema([(col, equivalentes[tipo]) for col, tipo in self.tipos.items()])
+                self._archivo = pq.ParquetWriter(self.ruta, self._esquema)
+            self._archivo.write_table(pa.Table.from_pandas(bloque, schema=self._esquema, preserve_index=False))
+        else:
+            primero = self._archivo is None
+            if primero:
+                abrir = gzip.open if self.ruta.lower().endswith('.gz') else open
+                self._archivo = abrir(self.ruta, 'wt', encoding='utf-8', newline='')
+            bloque.to_csv(self._archivo, index=False, header=primero)
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+
+
+def _tipos_destino(numericas, enteras, categoricas):
+    """Esquema fijo para todos los bloques (evita que cada bloque infiera tipos distintos)."""
+    tipos = {col: 'Int64' if col in enteras else 'float64' for col in numericas}
+    tipos.update({col: 'string' for col in categoricas})
+    return tipos
+
+
+def _recolectar_estadisticas(ruta, plan, columnas, tamano_bloque, encoding):
+    """Primera pasada: tipos de columna, medias, medianas (reservorio) y conteos para la moda."""
+    imputar = next((p for p in plan if p['op'] == 'imputar'), {})
+    normalizar = any(p['op'] in ('normalizar', 'normalizar_filtrar') for p in plan)
+
+    vistas, no_numericas, no_enteras = [], set(), set()
+    sumas, conteos, reservorios, frecuencias = {}, {}, {}, {}
+    for bloque in _leer_bloques(ruta, columnas, tamano_bloque, encoding):
+        if normalizar:
+            bloque, _ = normalizar_codigos_faltantes(bloque, copiar=False)
+        for col in bloque.columns:
+            if col not in vistas:
+                vistas.append(col)
+            serie = bloque[col]
+            if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+                no_numericas.add(col)
+                if imputar.get('categorico', '').startswith("Rellenar con la moda"):
+                    conteo = serie.value_counts()
+                    frecuencias[col] = conteo if col not in frecuencias else frecuencias[col].add(conteo, fill_value=0)
+                continue
+            if not pd.api.types.is_integer_dtype(serie):
+                # Un bloque con nulos se lee como float aunque los valores sean enteros
+                valores_validos = serie.dropna()
+                if (valores_validos != np.floor(valores_validos)).any():
+                    no_enteras.add(col)
+            valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+            sumas[col] = sumas.get(col, 0.0) + np.nansum(valores)
+            conteos[col] = conteos.get(col, 0) + int((~np.isnan(valores)).sum())
+            if imputar.get('numerico', '').startswith("Rellenar con la mediana"):
+                reservorios.setdefault(col, _Reservorio()).agregar(valores)
+
+    if columnas is not None:
+        vistas = [c.lower() for c in columnas if c.lower() in vistas]
+    numericas = [c for c in vistas if c not in no_numericas]
+    categoricas = [c for c in vistas if c in no_numericas]
+
+    valores = {}
+    if imputar.get('numerico', '').startswith("Rellenar con la mediana"):
+        valores.update({c: reservorios[c].mediana() for c in numericas if c in reservorios and reservorios[c].vistos})
+    elif imputar.get('numerico', '').startswith("Rellenar con la media"):
+        valores.update({c: sumas[c] / conteos[c] for c in numericas if conteos.get(c)})
+    if imputar.get('categorico', '').startswith("Rellenar con la moda"):
+        for col in categoricas:
+            if col in frecuencias and len(frecuencias[col]):
+                empatados = frecuencias[col][frecuencias[col] == frecuencias[col].max()].index
+                try:
+                    # En empate gana el valor menor, como Series.mode()
+                    valores[col] = min(empatados)
+                except TypeError:
+                    valores[col] = empatados[0]
+    elif imputar.get('categorico') == "Rellenar con 'Desconocido'":
+        valores.update({col: 'Desconocido' for col in categoricas})
+
+    # Las columnas enteras que se rellenan con decimales pasan a float
+    enteras = {c for c in numericas if c not in no_enteras
+               and (c not in valores or float(valores[c]).is_integer())}
+    return vistas, numericas, enteras, categoricas, valores
+
+
+def limpiar_archivo_por_bloques(ruta_entrada, ruta_salida, opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados,
+                                columnas_a_mantener=None, normalizar_faltantes=False,
+                                tamano_bloque=TAMANO_BLOQUE, encoding=None):
+    """
+    Aplica las mismas opciones que `limpiar_dataframe` a un archivo que no cabe en memoria.
+    Hace dos pasadas: la primera recoge estadísticos globales (medias, medianas aproximadas
+    con un reservorio, modas) y la segunda imputa, deduplica y escribe cada bloque a
+    `ruta_salida` (.csv, .csv.gz o .parquet). La memoria depende del tamaño de bloque y no
+    del archivo, salvo los hashes de deduplicación (8 bytes por fila distinta).
+    Devuelve un dict con el resumen de la ejecución.
+    """
+    if "por grupo" in f"{opcion_nulos_num} {opcion_nulos_cat}":
+        raise ValueError("La imputación por grupo no está disponible en la limpieza por bloques.")
+
+    inicio = time.perf_counter()
+    plan = optimizar_plan(construir_plan(opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados,
+                                         columnas_a_mantener or [], normalizar_faltantes))
+    columnas = columnas_a_mantener if columnas_a_mantener else None
+    filtrar = any(p['op'] in ('filtrar', 'normalizar_filtrar') for p in plan)
+
+    # 1. Primera pasada: estadísticos globales
+    vistas, numericas, enteras, categoricas, valores = _recolectar_estadisticas(
+        ruta_entrada, plan, columnas, tamano_bloque, encoding)
+    tipos = _tipos_destino(numericas, enteras, categoricas)
+    tipos = {col: tipos[col] for col in vistas}
+
+    # 2. Segunda pasada: limpiar y escribir bloque a bloque
+    resumen = {'filas_leidas': 0, 'filas_filtradas': 0, 'duplicados': 0, 'filas_escritas': 0, 'codigos_faltantes': {}}
+    hashes = _HashesVistos()
+    escritor = _Escritor(ruta_salida, tipos)
+    try:
+        for bloque in _leer_bloques(ruta_entrada, columnas, tamano_bloque, encoding):
+            resumen['filas_leidas'] += len(bloque)
+            bloque = bloque.reindex(columns=vistas)
+            if normalizar_faltantes:
+                bloque, conteos = normalizar_codigos_faltantes(bloque, copiar=False)
+                for col, n in conteos.items():
+                    resumen['codigos_faltantes'][col] = resumen['codigos_faltantes'].get(col, 0) + n
+            # Primero el esquema fijo: las enteras que se rellenan con decimales ya son float
+            bloque = bloque.astype(tipos)
+            if filtrar:
+                filas = len(bloque)
+                bloque = bloque.dropna()
+                resumen['filas_filtradas'] += filas - len(bloque)
+            elif valores:
+                bloque = bloque.fillna(valores)
+
+            if eliminar_duplicados:
+                h = pd.util.hash_pandas_object(bloque, index=False).to_numpy()
+                repetidas = pd.Series(h).duplicated().to_numpy() | hashes.contiene(h)
+                hashes.agregar(h[~repetidas])
+                resumen['duplicados'] += int(repetidas.sum())
+                bloque = bloque[~repetidas]
+
+            escritor.escribir(bloque)
+            resumen['filas_escritas'] += len(bloque)
+    finally:
+        escritor.cerrar()
+
+    resumen['segundos'] = round(time.perf_counter() - inicio, 2)
+    return resumen
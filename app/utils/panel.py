@@ -0,0 +1,155 @@
+# app/utils/panel.py
+# Panel de varios años de un mismo módulo ENAHO: esquemas alineados, categorías compartidas y columna año.
+
+import numpy as np
+import pandas as pd
+
+from app.utils.codebooks import COLUMNAS_AÑO, detectar_año, obtener_descripcion
+
+COLUMNA_AÑO = 'año'
+
+
+def año_de_dataset(dataset):
+    """Año de un dataset cargado: el guardado al cargarlo o, si falta, el detectado en sus datos."""
+    año = dataset.get('año') or detectar_año(dataset['df_limpio'])
+    return int(año) if año else None
+
+
+def alinear_esquemas(frames, renombres=None, usar_codebook=True):
+    """
+    Nombres de columna comunes para `frames` ({año: DataFrame}). Devuelve {año: {original: final}}.
+    - Los nombres se pasan a minúsculas y las variantes de la columna del año se descartan (el panel trae la suya).
+    - `renombres` ({año: {original: final}}) fija equivalencias conocidas entre años.
+    - Con `usar_codebook`, una columna que no existe en el año más reciente se renombra a la de ese año
+      con la misma descripción en el codebook, si hay una sola candidata.
+    """
+    renombres = renombres or {}
+    años = sorted(frames)
+    mapas = {}
+    for año in años:
+        explicitos = {k.lower(): v for k, v in renombres.get(año, {}).items()}
+        mapas[año] = {c: explicitos.get(c.lower(), c.lower()) for c in frames[año].columns
+                      if c.lower() not in COLUMNAS_AÑO}
+
+    if usar_codebook and len(años) > 1:
+        referencia = set(mapas[años[-1]].values())
+        for año in años[:-1]:
+            propias = set(mapas[año].values())
+            # Descripciones de las columnas del año de referencia que faltan en este año
+            por_descripcion = {}
+            for columna in referencia - propias:
+                descripcion = obtener_descripcion(columna, años[-1])
+                if descripcion:
+                    por_descripcion.setdefault(descripcion.strip().lower(), []).append(columna)
+            for original, final in mapas[año].items():
+                if final in referencia:
+                    continue
+                descripcion = obtener_descripcion(final, año)
+                candidatas = por_descripcion.get(descripcion.strip().lower(), []) if descripcion else []
+                if len(candidatas) == 1:
+                    mapas[año][original] = candidatas[0]
+
+    for año, mapa in mapas.items():
+        repetidas = pd.Index(list(mapa.values()))
+        if repetidas.has_duplicates:
+            raise ValueError(f"En {año} varias columnas terminan con el mismo nombre: {', '.join(repetidas[repetidas.duplicated()].unique())}.")
+    return mapas
+
+
+def _texto(valores):
+    """
+    Valores únicos como texto. Los textos se conservan tal cual (ubigeo '010101');
+    solo los números enteros se escriben sin decimales (12.0 -> '12').
+    """
+    return np.array([str(int(v)) if isinstance(v, (int, float, np.number)) and not isinstance(v, bool) and float(v).is_integer()
+                     else str(v) for v in valores], dtype=object)
+
+
+def _codigos_minimos(n_categorias):
+    return next(t for t in (np.int8, np.int16, np.int32, np.int64) if n_categorias < np.iinfo(t).max)
+
+
+def _tipo_columna(series, incompleta):
+    """Tipo final de una columna: numérico común (con decimales si falta en algún año) o None para categórica."""
+    tipos = [s.dtype for s in series]
+    if all(pd.api.types.is_numeric_dtype(t) or pd.api.types.is_bool_dtype(t) for t in tipos):
+        if any(isinstance(t, pd.api.extensions.ExtensionDtype) for t in tipos):
+            # Enteros con nulos (Int64) o columnas Arrow: float64 guarda sus nulos como NaN
+            return np.dtype('float64')
+        # float32 representa exactamente enteros de hasta 16 bits; con int32/int64 se sube a float64
+        return np.result_type(*tipos, np.float32) if incompleta else np.result_type(*tipos)
+    if all(t.kind == 'M' for t in tipos) and len(set(tipos)) == 1:
+        return tipos[0]
+    return None
+
+
+def construir_panel(frames, renombres=None, usar_codebook=True):
+    """
+    Apila `frames` ({año: DataFrame}) en un panel con columna `año`.
+    Cada columna se escribe una sola vez en un arreglo reservado con el total de filas
+    (sin las copias intermedias de `pd.concat` ni su paso a object):
+    - numéricas: al tipo común más chico (float si la columna falta en algún año);
+    - texto y categorías: categórica con un diccionario compartido; cada año se factoriza una vez
+      y solo sus valores únicos se traducen al diccionario, así no se reescriben los textos fila por fila.
+    """
+    if not frames:
+        raise ValueError("No hay datasets para construir el panel.")
+    años = sorted(frames)
+    mapas = alinear_esquemas(frames, renombres, usar_codebook)
+    inversos = {año: {final: original for original, final in mapas[año].items()} for año in años}
+    filas = {año: len(frames[año]) for año in años}
+    total = sum(filas.values())
+    inicios = dict(zip(años, np.cumsum([0] + [filas[a] for a in años[:-1]])))
+
+    # Columnas del año más reciente primero y después las que solo tienen años anteriores
+    columnas = list(dict.fromkeys(c for año in reversed(años) for c in mapas[año].values()))
+    panel = {COLUMNA_AÑO: np.repeat(np.array(años, dtype=np.int16), [filas[a] for a in años])}
+
+    for columna in columnas:
+        presentes = [año for año in años if columna in inversos[año]]
+        series = {año: frames[año][inversos[año][columna]] for año in presentes}
+        tipo = _tipo_columna(list(series.values()), incompleta=len(presentes) < len(años))
+
+        if tipo is not None:
+            destino = np.empty(total, dtype=tipo)
+            if len(presentes) < len(años):
+                destino[:] = np.datetime64('NaT') if tipo.kind == 'M' else np.nan
+            for año, serie in series.items():
+                destino[inicios[año]:inicios[año] + filas[año]] = serie.to_numpy(dtype=tipo, na_value=np.nan) if tipo.kind == 'f' else serie.to_numpy()
+            panel[columna] = destino
+            continue
+
+        # Categórica: factorizar cada año y unir sus únicos en un diccionario ordenado
+        factorizados = {}
+        for año, serie in series.items():
+            codigos, unicos = pd.factorize(serie)
+            factorizados[año] = (codigos, _texto(np.asarray(unicos, dtype=object)))
+        categorias = pd.Index(np.concatenate([u for _, u in factorizados.values()])).unique().sort_values()
+        destino = np.full(total, -1, dtype=_codigos_minimos(len(categorias)))
+        for año, (codigos, unicos) in factorizados.items():
+            traduccion = np.append(categorias.get_indexer(unicos), -1).astype(destino.dtype)
+            # El código -1 (nulo) toma el último elemento de la traducción, que también es -1
+            destino[inicios[año]:inicios[año] + filas[año]] = traduccion[codigos]
+        panel[columna] = pd.Categorical.from_codes(destino, dtype=pd.CategoricalDtype(categorias))
+
+    resultado = pd.DataFrame(panel, copy=False)
+    resultado.attrs['panel'] = {
+        'años': años,
+        'filas_por_año': {año: filas[año] for año in años},
+        'renombres': {año: {o: f for o, f in mapas[año].items() if o != f} for año in años},
+        'columnas_incompletas': [c for c in columnas if any(c not in inversos[año] for año in años)],
+    }
+    return resultado
+
+
+def panel_desde_datasets(datasets, nombres, renombres=None, usar_codebook=True):
+    """Construye el panel con los `df_limpio` de los datasets cargados `nombres` (un dataset por año)."""
+    frames = {}
+    for nombre in nombres:
+        año = año_de_dataset(datasets[nombre])
+        if año is None:
+            raise ValueError(f"No se pudo determinar el año de '{nombre}'.")
+        if año in frames:
+            raise ValueError(f"Hay más de un dataset del año {año}; elige uno por año.")
+        frames[año] = datasets[nombre]['df_limpio']
+    return construir_panel(frames, renombres, usar_codebook)
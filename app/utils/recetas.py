@@ -0,0 +1,101 @@
+# app/utils/recetas.py
+# Recetas de limpieza: las opciones de la barra lateral guardadas como JSON reutilizable.
+
+import json
+from pathlib import Path
+
+from app.utils.data_cleaner import limpiar_dataframe
+from app.utils.claves import POLITICAS_DUPLICADOS
+
+VERSION_RECETA = 1
+
+OPCIONES_NULOS_NUM = [
+    "No hacer nada", "Eliminar filas con nulos", "Rellenar con la media", "Rellenar con la mediana",
+    "Rellenar con la media por grupo", "Rellenar con la mediana por grupo",
+]
+OPCIONES_NULOS_CAT = ["No hacer nada", "Rellenar con la moda", "Rellenar con 'Desconocido'", "Rellenar con la moda por grupo"]
+
+# Opciones de limpiar_dataframe que forman una receta y su valor por defecto
+_CAMPOS_RECETA = {
+    'opcion_nulos_num': "No hacer nada",
+    'opcion_nulos_cat': "No hacer nada",
+    'eliminar_duplicados': False,
+    'columnas_a_mantener': None,  # None = todas las columnas del archivo
+    'normalizar_faltantes': False,
+    'columnas_grupo': None,
+    'claves_duplicados': None,  # None = duplicados de fila completa
+    'politica_duplicados': 'primero',
+}
+
+
+def crear_receta(opcion_nulos_num, opcion_nulos_cat, eliminar_duplicados, columnas_a_mantener=None,
+                 normalizar_faltantes=False, columnas_grupo=None, claves_duplicados=None, politica_duplicados='primero'):
+    """Empaqueta las opciones de limpieza (las mismas de `limpiar_dataframe`) en una receta."""
+    return validar_receta({
+        'version': VERSION_RECETA,
+        'opcion_nulos_num': opcion_nulos_num,
+        'opcion_nulos_cat': opcion_nulos_cat,
+        'eliminar_duplicados': bool(eliminar_duplicados),
+        'columnas_a_mantener': list(columnas_a_mantener) if columnas_a_mantener is not None else None,
+        'normalizar_faltantes': bool(normalizar_faltantes),
+        'columnas_grupo': list(columnas_grupo) if columnas_grupo else None,
+        'claves_duplicados': list(claves_duplicados) if claves_duplicados else None,
+        'politica_duplicados': politica_duplicados,
+    })
+
+
+def validar_receta(receta):
+    """Completa los campos faltantes con sus valores por defecto y rechaza opciones desconocidas."""
+    if not isinstance(receta, dict):
+        raise ValueError("La receta debe ser un objeto JSON.")
+    if receta.get('version', VERSION_RECETA) > VERSION_RECETA:
+        raise ValueError(f"Versión de receta no soportada: {receta['version']}.")
+    desconocidos = set(receta) - set(_CAMPOS_RECETA) - {'version'}
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos en la receta: {', '.join(sorted(desconocidos))}.")
+
+    completa = {'version': VERSION_RECETA, **_CAMPOS_RECETA, **receta}
+    if completa['opcion_nulos_num'] not in OPCIONES_NULOS_NUM:
+        raise ValueError(f"Opción de nulos numéricos no válida: {completa['opcion_nulos_num']!r}.")
+    if completa['opcion_nulos_cat'] not in OPCIONES_NULOS_CAT:
+        raise ValueError(f"Opción de nulos categóricos no válida: {completa['opcion_nulos_cat']!r}.")
+    if completa['politica_duplicados'] not in POLITICAS_DUPLICADOS:
+        raise ValueError(f"Política de duplicados no válida: {completa['politica_duplicados']!r}.")
+    return completa
+
+
+def receta_a_json(receta):
+    return json.dumps(validar_receta(receta), ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def receta_desde_json(texto):
+    return validar_receta(json.loads(texto))
+
+
+def guardar_receta(receta, ruta):
+    Path(ruta).write_text(receta_a_json(receta), encoding='utf-8')
+
+
+def cargar_receta(ruta):
+    return receta_desde_json(Path(ruta).read_text(encoding='utf-8'))
+
+
+def aplicar_receta(df, receta, **opciones):
+    """
+    Aplica una receta a un DataFrame con `limpiar_dataframe`.
+    `opciones` se pasa tal cual (p. ej. motor='polars').
+    """
+    receta = validar_receta(receta)
+    columnas = receta['columnas_a_mantener']
+    return limpiar_dataframe(
+        df,
+        receta['opcion_nulos_num'],
+        receta['opcion_nulos_cat'],
+        receta['eliminar_duplicados'],
+        list(df.columns) if columnas is None else columnas,
+        receta['normalizar_faltantes'],
+        receta['columnas_grupo'],
+        receta['claves_duplicados'],
+        receta['politica_duplicados'],
+        **opciones
+    )
@@ -0,0 +1,192 @@
+# app/utils/uniones.py
+# Unión de módulos ENAHO por claves de hogar / persona sobre códigos enteros compactos.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.utils.claves import CLAVES_HOGAR, CLAVES_PERSONA, codificar_claves
+
+TIPOS_UNION = {
+    'left': "Conservar todas las filas del dataset activo",
+    'inner': "Solo filas con clave en ambos datasets",
+}
+RELACIONES = ['1:1', '1:m', 'm:1', 'm:m']
+ESTRATEGIAS = ['auto', 'hash', 'orden']
+# Tope de memoria para el resultado de una unión (MB); configurable por variable de entorno
+LIMITE_MB_UNION = float(os.environ.get('ENAHO_LIMITE_UNION_MB', 4096))
+
+
+def claves_comunes(df_izq, df_der):
+    """Claves ENAHO presentes en ambos datasets: de persona si las dos tienen codperso, si no de hogar."""
+    for claves in (CLAVES_PERSONA, CLAVES_HOGAR):
+        if all(c in df_izq.columns and c in df_der.columns for c in claves):
+            return list(claves)
+    return [c for c in CLAVES_HOGAR if c in df_izq.columns and c in df_der.columns]
+
+
+def _alinear_clave(izq, der):
+    """
+    Lleva una clave de ambos lados a un tipo común: numérico si los textos son números
+    (p. ej. '0012' y 12 en módulos distintos), o texto en otro caso.
+    """
+    if izq.dtype == der.dtype:
+        return izq, der
+    num_izq, num_der = pd.to_numeric(izq, errors='coerce'), pd.to_numeric(der, errors='coerce')
+    if num_izq.isna().sum() == izq.isna().sum() and num_der.isna().sum() == der.isna().sum():
+        return num_izq.astype('float64'), num_der.astype('float64')
+    return _texto_clave(izq, num_izq), _texto_clave(der, num_der)
+
+
+def _texto_clave(serie, numeros):
+    """Clave como texto; los valores numéricos enteros se escriben sin ceros ni decimales ('0012', 12.0 -> '12')."""
+    texto = serie.astype(str).str.strip().astype(object)
+    enteros = numeros.notna() & (numeros % 1 == 0)
+    texto[enteros] = numeros[enteros].astype('int64').astype(str)
+    return texto.where(serie.notna())
+
+
+def codificar_union(df_izq, df_der, claves, metodo='hash'):
+    """
+    Ids enteros de las claves de ambos lados en un mismo espacio de códigos (-1 = clave nula).
+    Se codifican juntas con `codificar_claves`, así la misma clave recibe el mismo id en los dos lados.
+    """
+    faltantes = [c for c in claves if c not in df_izq.columns or c not in df_der.columns]
+    if faltantes:
+        raise KeyError(f"Las columnas clave no están en ambos datasets: {', '.join(faltantes)}.")
+    columnas = {}
+    for clave in claves:
+        izq, der = _alinear_clave(df_izq[clave].reset_index(drop=True), df_der[clave].reset_index(drop=True))
+        columnas[clave] = pd.concat([izq, der], ignore_index=True)
+    ids, _ = codificar_claves(pd.DataFrame(columnas), list(claves), metodo)
+    return ids[:len(df_izq)], ids[len(df_izq):]
+
+
+def relacion_claves(ids_izq, ids_der):
+    """Cardinalidad de la unión según si las claves se repiten en cada lado: '1:1', '1:m', 'm:1' o 'm:m'."""
+    n = int(max(ids_izq.max(initial=-1), ids_der.max(initial=-1))) + 1
+    repite_izq = bool((np.bincount(ids_izq[ids_izq >= 0], minlength=n) > 1).any())
+    repite_der = bool((np.bincount(ids_der[ids_der >= 0], minlength=n) > 1).any())
+    return f"{'m' if repite_izq else '1'}:{'m' if repite_der else '1'}"
+
+
+def emparejar(ids_izq, ids_der, how='left', estrategia='auto'):
+    """
+    Posiciones emparejadas (izquierda, derecha) de la unión; -1 en la derecha = sin pareja.
+    - 'hash': `Index.get_indexer` sobre los ids de la derecha (requiere claves únicas a la derecha).
+    - 'orden': ordena la derecha por id y expande cada fila izquierda a su bloque de filas iguales;
+      admite claves repetidas (1:m, m:m).
+    'auto' usa hash si la derecha es única y orden si no. Las claves nulas nunca emparejan.
+    """
+    n_ids = int(max(ids_izq.max(initial=-1), ids_der.max(initial=-1))) + 1
+    conteos = np.bincount(ids_der[ids_der >= 0], minlength=n_ids)
+    derecha_unica = bool((conteos <= 1).all())
+    if estrategia == 'auto':
+        estrategia = 'hash' if derecha_unica else 'orden'
+    if estrategia == 'hash' and not derecha_unica:
+        raise ValueError("La estrategia 'hash' necesita claves únicas en el dataset a unir; use 'orden'.")
+
+    if estrategia == 'hash':
+        # El índice se arma solo con las filas de clave no nula (las nulas repetirían un mismo id)
+        validas_der = np.flatnonzero(ids_der >= 0)
+        encontradas = pd.Index(ids_der[validas_der]).get_indexer(ids_izq)
+        pos_der = np.where((encontradas >= 0) & (ids_izq >= 0), validas_der[np.maximum(encontradas, 0)], -1)
+        pos_izq = np.arange(len(ids_izq))
+    elif estrategia == 'orden':
+        orden = np.argsort(ids_der, kind='stable')
+        inicios = np.searchsorted(ids_der[orden], np.arange(n_ids))
+        repeticiones = np.where(ids_izq >= 0, conteos[np.maximum(ids_izq, 0)], 0)
+        pos_izq = np.repeat(np.arange(len(ids_izq)), repeticiones)
+        # Desplazamiento de cada fila expandida dentro del bloque de su clave
+        desplazamiento = np.arange(len(pos_izq)) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+        pos_der = orden[inicios[ids_izq[pos_izq]] + desplazamiento]
+        if how == 'left':
+            sin_pareja = np.flatnonzero(repeticiones == 0)
+            pos_izq = np.concatenate([pos_izq, sin_pareja])
+            pos_der = np.concatenate([pos_der, np.full(len(sin_pareja), -1)])
+            # Se restituye el orden del dataset izquierdo (estable dentro de cada fila)
+            reorden = np.argsort(pos_izq, kind='stable')
+            pos_izq, pos_der = pos_izq[reorden], pos_der[reorden]
+    else:
+        raise ValueError(f"Estrategia de unión desconocida: {estrategia!r}.")
+
+    if how == 'inner':
+        con_pareja = pos_der >= 0
+        pos_izq, pos_der = pos_izq[con_pareja], pos_der[con_pareja]
+    elif how != 'left':
+        raise ValueError(f"Tipo de unión desconocido: {how!r}.")
+    return pos_izq, pos_der, estrategia
+
+
+def _bytes_por_fila(df, columnas):
+    if not columnas or len(df) == 0:
+        return 0.0
+    muestra = df[columnas].iloc[:min(len(df), 10_000)]
+    return muestra.memory_usage(index=False, deep=True).sum() / len(muestra)
+
+
+def estimar_union(df_izq, df_der, claves, how='left', columnas_izq=None, columnas_der=None):
+    """
+    Antes de unir: filas exactas del resultado (contadas sobre los ids, sin materializar nada),
+    relación entre claves y memoria estimada del resultado en MB.
+    """
+    columnas_izq, columnas_der = _proyeccion(df_izq, df_der, claves, columnas_izq, columnas_der)
+    ids_izq, ids_der = codificar_union(df_izq, df_der, claves)
+    n_ids = int(max(ids_izq.max(initial=-1), ids_der.max(initial=-1))) + 1
+    conteos = np.bincount(ids_der[ids_der >= 0], minlength=n_ids)
+    parejas = np.where(ids_izq >= 0, conteos[np.maximum(ids_izq, 0)], 0)
+    filas = int(parejas.sum() + ((parejas == 0).sum() if how == 'left' else 0))
+    mb = filas * (_bytes_por_fila(df_izq, columnas_izq) + _bytes_por_fila(df_der, columnas_der)) / 1e6
+    return {
+        'filas': filas,
+        'filas_izquierda': len(df_izq),
+        'filas_con_pareja': int((parejas > 0).sum()),
+        'relacion': relacion_claves(ids_izq, ids_der),
+        'mb_estimados': round(float(mb), 1),
+        'supera_limite': bool(mb > LIMITE_MB_UNION),
+    }
+
+
+def _proyeccion(df_izq, df_der, claves, columnas_izq, columnas_der):
+    columnas_izq = list(df_izq.columns) if columnas_izq is None else [c for c in columnas_izq if c in df_izq.columns]
+    # Las claves ya vienen del lado izquierdo
+    columnas_der = [c for c in (df_der.columns if columnas_der is None else columnas_der) if c in df_der.columns and c not in claves]
+    return columnas_izq, columnas_der
+
+
+def unir_datasets(df_izq, df_der, claves, how='left', columnas_izq=None, columnas_der=None,
+                  validar=None, estrategia='auto', sufijo_der='_der', limite_mb=LIMITE_MB_UNION):
+    """
+    Une `df_der` a `df_izq` por `claves` y devuelve solo las columnas pedidas de cada lado.
+    `validar` ('1:1', 'm:1', '1:m') lanza ValueError si la relación real no la cumple.
+    La unión se rechaza si el resultado estimado supera `limite_mb`.
+    """
+    columnas_izq, columnas_der = _proyeccion(df_izq, df_der, claves, columnas_izq, columnas_der)
+    ids_izq, ids_der = codificar_union(df_izq, df_der, claves)
+    relacion = relacion_claves(ids_izq, ids_der)
+    if validar is not None:
+        if validar not in RELACIONES:
+            raise ValueError(f"Relación no válida: {validar!r}.")
+        # Una relación más estricta que la pedida también la cumple (1:1 cumple m:1)
+        if any(esperado == '1' and real == 'm' for esperado, real in zip(validar.split(':'), relacion.split(':'))):
+            raise ValueError(f"Las claves no cumplen la relación {validar}: la relación real es {relacion}.")
+
+    pos_izq, pos_der, estrategia = emparejar(ids_izq, ids_der, how, estrategia)
+    mb = len(pos_izq) * (_bytes_por_fila(df_izq, columnas_izq) + _bytes_por_fila(df_der, columnas_der)) / 1e6
+    if limite_mb and mb > limite_mb:
+        raise ValueError(f"La unión ocuparía ~{mb:,.0f} MB (límite {limite_mb:,.0f} MB). Elija menos columnas o una unión 'inner'.")
+
+    # Lado izquierdo: un solo `take` por bloques de tipos (no hay faltantes que rellenar)
+    resultado = df_izq[columnas_izq].take(pos_izq).reset_index(drop=True)
+    relleno = bool((pos_der < 0).any())
+    for col in columnas_der:
+        nombre = f"{col}{sufijo_der}" if col in resultado.columns else col
+        # Las filas sin pareja (-1) quedan como faltantes; los enteros pasan a float como en pandas.merge
+        valores = df_der[col].array.take(pos_der, allow_fill=relleno)
+        resultado[nombre] = pd.Series(valores, dtype=object if df_der[col].dtype == object else None)
+    resultado.attrs['union'] = {
+        'claves': list(claves), 'relacion': relacion, 'estrategia': estrategia, 'tipo': how,
+        'filas_con_pareja': int((pos_der >= 0).sum()), 'filas': len(resultado),
+    }
+    return resultado
@@ -0,0 +1,279 @@
+# app/visualization/agregaciones.py
+# Agregaciones en el servidor para los gráficos: a Plotly solo llegan las series ya resumidas.
+
+import numpy as np
+import pandas as pd
+
+# Factores de expansión ENAHO: población (módulos de personas) y hogar
+FACTORES_EXPANSION = ['facpob07', 'factor07']
+FACTOR_AUTO = 'auto'
+BINS_POR_DEFECTO = 'auto'
+MAX_BINS = 200
+# Por encima de este número de puntos los gráficos de dispersión se muestrean o se rasterizan
+LIMITE_PUNTOS = 50_000
+CELDAS_MUESTREO = 64
+# Atípicos que se envían por caja (los más extremos siempre se incluyen)
+MAX_ATIPICOS = 200
+# Grupos (colores o cajas) por gráfico; los menos frecuentes se juntan en "Otros"
+MAX_GRUPOS = 20
+
+
+def detectar_factor(df):
+    """Primer factor de expansión presente en el DataFrame (o None)."""
+    return next((f for f in FACTORES_EXPANSION if f in df.columns), None)
+
+
+def resolver_factor(df, factor=FACTOR_AUTO):
+    """'auto' busca un factor de expansión; None desactiva la ponderación."""
+    if factor == FACTOR_AUTO:
+        return detectar_factor(df)
+    if factor is not None and factor not in df.columns:
+        raise KeyError(f"El factor de expansión '{factor}' no está en el dataset.")
+    return factor
+
+
+def _pesos(df, factor):
+    if factor is None:
+        return None
+    return pd.to_numeric(df[factor], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def bordes_histograma(valores, bins=BINS_POR_DEFECTO):
+    """Bordes de los bins (regla de NumPy o número fijo), con un máximo de MAX_BINS."""
+    valores = valores[np.isfinite(valores)]
+    if valores.size == 0:
+        return np.array([0.0, 1.0])
+    bordes = np.histogram_bin_edges(valores, bins=bins)
+    if len(bordes) - 1 > MAX_BINS:
+        bordes = np.histogram_bin_edges(valores, bins=MAX_BINS)
+    return bordes
+
+
+def codigos_grupo(valores, max_grupos=MAX_GRUPOS):
+    """
+    Códigos 0..G-1 de los grupos en orden (-1 = nulo) y sus nombres. Si hay más de `max_grupos`,
+    se conservan los `max_grupos - 1` más frecuentes y el resto se junta en "Otros".
+    """
+    try:
+        codigos, grupos = pd.factorize(valores, sort=True)
+    except TypeError:
+        codigos, grupos = pd.factorize(pd.Series(valores).astype(str).where(pd.notna(valores)).to_numpy(), sort=True)
+    grupos = np.asarray(grupos, dtype=object)
+    if len(grupos) > max_grupos:
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(grupos))
+        principales = np.sort(np.argsort(-conteos, kind='stable')[:max_grupos - 1])
+        nuevos = np.full(len(grupos), max_grupos - 1)
+        nuevos[principales] = np.arange(max_grupos - 1)
+        codigos = np.where(codigos >= 0, nuevos[np.maximum(codigos, 0)], -1)
+        grupos = np.append(grupos[principales], "Otros")
+    return codigos, grupos
+
+
+def histograma(df, columna, color_col=None, factor=FACTOR_AUTO, bins=BINS_POR_DEFECTO, max_grupos=MAX_GRUPOS):
+    """
+    Conteos por bin (sumas del factor si se pondera), opcionalmente por grupo de `color_col`.
+    Todas las filas se asignan a su bin con `searchsorted` y se cuentan con un solo `bincount`.
+    Devuelve un DataFrame largo: [grupo,] inicio, fin, centro, conteo.
+    """
+    factor = resolver_factor(df, factor)
+    valores = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    pesos = _pesos(df, factor)
+    validos = np.isfinite(valores) if pesos is None else np.isfinite(valores) & np.isfinite(pesos)
+
+    bordes = bordes_histograma(valores[validos], bins)
+    n_bins = len(bordes) - 1
+    # El último bin es cerrado por la derecha, igual que np.histogram
+    posicion = np.clip(np.searchsorted(bordes, valores[validos], side='right') - 1, 0, n_bins - 1)
+    pesos_validos = None if pesos is None else pesos[validos]
+
+    if color_col:
+        codigos, grupos = codigos_grupo(df[color_col].to_numpy()[validos], max_grupos)
+        con_grupo = codigos >= 0
+        conteos = np.bincount(
+            codigos[con_grupo] * n_bins + posicion[con_grupo],
+            weights=None if pesos_validos is None else pesos_validos[con_grupo],
+            minlength=len(grupos) * n_bins,
+        ).reshape(len(grupos), n_bins)
+        etiquetas_grupo = np.repeat(np.asarray(grupos, dtype=object), n_bins)
+    else:
+        conteos = np.bincount(posicion, weights=pesos_validos, minlength=n_bins)[None, :]
+        etiquetas_grupo = None
+
+    n_grupos = conteos.shape[0]
+    resultado = pd.DataFrame({
+        'inicio': np.tile(bordes[:-1], n_grupos),
+        'fin': np.tile(bordes[1:], n_grupos),
+        'centro': np.tile((bordes[:-1] + bordes[1:]) / 2, n_grupos),
+        'conteo': conteos.ravel(),
+    })
+    if etiquetas_grupo is not None:
+        resultado.insert(0, color_col, etiquetas_grupo)
+    resultado.attrs['factor'] = factor
+    return resultado
+
+
+def frecuencias(df, columna, factor=FACTOR_AUTO, limite=None):
+    """
+    Frecuencia (o población expandida) de cada categoría, de mayor a menor, con su porcentaje.
+    Con `limite`, las categorías restantes se suman en "Otros".
+    """
+    factor = resolver_factor(df, factor)
+    codigos, categorias = pd.factorize(df[columna])
+    pesos = _pesos(df, factor)
+    validos = codigos >= 0
+    if pesos is not None:
+        validos &= np.isfinite(pesos)
+        pesos = pesos[validos]
+    conteos = np.bincount(codigos[validos], weights=pesos, minlength=len(categorias))
+
+    orden = np.argsort(-conteos, kind='stable')
+    tabla = pd.DataFrame({columna: np.asarray(categorias, dtype=object)[orden], 'Frecuencia': conteos[orden]})
+    if limite and len(tabla) > limite:
+        otros = tabla['Frecuencia'].iloc[limite:].sum()
+        tabla = pd.concat([tabla.iloc[:limite], pd.DataFrame({columna: ["Otros"], 'Frecuencia': [otros]})], ignore_index=True)
+    total = conteos.sum()
+    tabla['Porcentaje'] = tabla['Frecuencia'] / total * 100 if total else 0.0
+    tabla.attrs['factor'] = factor
+    return tabla
+
+
+def _tope_por_estrato(tamanos, n_max):
+    """Mayor tope t tal que sum(min(tamaño, t)) <= n_max (búsqueda binaria sobre t)."""
+    bajo, alto = 0, int(tamanos.max(initial=0))
+    while bajo < alto:
+        medio = (bajo + alto + 1) // 2
+        if np.minimum(tamanos, medio).sum() <= n_max:
+            bajo = medio
+        else:
+            alto = medio - 1
+    return bajo
+
+
+def muestra_estratificada(estratos, n_max=LIMITE_PUNTOS, semilla=0):
+    """
+    Posiciones (ordenadas) de una muestra de a lo sumo `n_max` filas. Cada estrato aporta
+    min(tamaño, tope) filas al azar, con el tope elegido para llenar `n_max`: los estratos
+    chicos se conservan completos y solo se adelgazan los más densos.
+    """
+    codigos, _ = pd.factorize(np.asarray(estratos))
+    if len(codigos) <= n_max:
+        return np.arange(len(codigos))
+    tope = _tope_por_estrato(np.bincount(codigos), n_max)
+    permutacion = np.random.default_rng(semilla).permutation(len(codigos))
+    # Rango de cada fila dentro de su estrato en un orden aleatorio
+    rango = pd.Series(codigos[permutacion]).groupby(codigos[permutacion]).cumcount().to_numpy()
+    return np.sort(permutacion[rango < tope])
+
+
+def celdas_dispersion(x, y, celdas=CELDAS_MUESTREO):
+    """Celda de una grilla `celdas` x `celdas` sobre el rango de (x, y) para cada punto."""
+    def _indice(v):
+        minimo, maximo = v.min(), v.max()
+        escala = celdas / (maximo - minimo) if maximo > minimo else 0.0
+        return np.clip(((v - minimo) * escala).astype(np.int64), 0, celdas - 1)
+    return _indice(x) * celdas + _indice(y)
+
+
+def densidad_2d(x, y, bins=100, pesos=None):
+    """Conteos en una grilla 2D (np.histogram2d). Devuelve (conteos[y, x], centros_x, centros_y)."""
+    conteos, bordes_x, bordes_y = np.histogram2d(x, y, bins=bins, weights=pesos)
+    return conteos.T, (bordes_x[:-1] + bordes_x[1:]) / 2, (bordes_y[:-1] + bordes_y[1:]) / 2
+
+
+def tendencias_lineales(x, y, grupos=None):
+    """
+    Recta de mínimos cuadrados y = a + b·x por grupo (forma cerrada, dos pasadas con `bincount`).
+    `grupos` son códigos enteros 0..G-1 (None = un solo grupo).
+    Devuelve un DataFrame con intercepto, pendiente, r2, n, x_min y x_max por grupo.
+    """
+    grupos = np.zeros(len(x), dtype=np.int64) if grupos is None else np.asarray(grupos)
+    n_grupos = int(grupos.max(initial=-1)) + 1
+    n = np.bincount(grupos, minlength=n_grupos).astype('float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_x = np.bincount(grupos, weights=x, minlength=n_grupos) / n
+        media_y = np.bincount(grupos, weights=y, minlength=n_grupos) / n
+        # Sumas centradas: evitan la cancelación de E[x²] - E[x]² con valores grandes (ingresos)
+        dx, dy = x - media_x[grupos], y - media_y[grupos]
+        sxx = np.bincount(grupos, weights=dx * dx, minlength=n_grupos)
+        sxy = np.bincount(grupos, weights=dx * dy, minlength=n_grupos)
+        syy = np.bincount(grupos, weights=dy * dy, minlength=n_grupos)
+        pendiente = sxy / sxx
+        r2 = sxy * sxy / (sxx * syy)
+    x_min = np.full(n_grupos, np.inf)
+    x_max = np.full(n_grupos, -np.inf)
+    np.minimum.at(x_min, grupos, x)
+    np.maximum.at(x_max, grupos, x)
+    return pd.DataFrame({
+        'intercepto': media_y - pendiente * media_x, 'pendiente': pendiente, 'r2': r2,
+        'n': n.astype(np.int64), 'x_min': x_min, 'x_max': x_max,
+    })
+
+
+def _cuantil_ordenado(valores, inicios, tamanos, p):
+    """Cuantil p de cada segmento ya ordenado (interpolación lineal, igual que np.quantile)."""
+    posicion = (tamanos - 1) * p
+    bajo = np.floor(posicion).astype(np.int64)
+    alto = np.minimum(bajo + 1, tamanos - 1)
+    fraccion = posicion - bajo
+    return valores[inicios + bajo] * (1 - fraccion) + valores[inicios + alto] * fraccion
+
+
+def resumen_cajas(df, columna, grupo_col=None, max_atipicos=MAX_ATIPICOS, max_grupos=MAX_GRUPOS):
+    """
+    Resumen exacto de un diagrama de caja por grupo: cuartiles, bigotes de Tukey (1.5·IQR,
+    hasta el dato más extremo dentro de la valla) y media, con un solo ordenamiento por (grupo, valor).
+    Devuelve (resumen, atipicos): a lo sumo `max_atipicos` atípicos por grupo, repartidos
+    a lo largo de su rango e incluyendo siempre los extremos.
+    """
+    valores = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    if grupo_col:
+        codigos, grupos = codigos_grupo(df[grupo_col].to_numpy(), max_grupos)
+    else:
+        codigos, grupos = np.zeros(len(valores), dtype=np.int64), np.array([columna], dtype=object)
+    validos = np.isfinite(valores) & (codigos >= 0)
+    valores, codigos = valores[validos], codigos[validos]
+
+    orden = np.lexsort((valores, codigos))
+    valores, codigos = valores[orden], codigos[orden]
+    tamanos = np.bincount(codigos, minlength=len(grupos))
+    con_datos = tamanos > 0
+    inicios = np.concatenate(([0], np.cumsum(tamanos)[:-1]))[con_datos]
+    tamanos, grupos = tamanos[con_datos], grupos[con_datos]
+    # Códigos densos 0..G-1 solo para los grupos con datos
+    codigos = np.repeat(np.arange(len(tamanos)), tamanos)
+
+    q1, mediana, q3 = (_cuantil_ordenado(valores, inicios, tamanos, p) for p in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    valla_inf, valla_sup = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    dentro = (valores >= valla_inf[codigos]) & (valores <= valla_sup[codigos])
+    # Como cada segmento está ordenado, el bigote es el primer / último valor dentro de las vallas
+    bigote_inf = np.full(len(tamanos), np.nan)
+    bigote_sup = np.full(len(tamanos), np.nan)
+    posiciones_dentro = np.flatnonzero(dentro)
+    primeras = np.unique(codigos[posiciones_dentro], return_index=True)[1]
+    ultimas = len(posiciones_dentro) - 1 - np.unique(codigos[posiciones_dentro][::-1], return_index=True)[1]
+    bigote_inf[codigos[posiciones_dentro[primeras]]] = valores[posiciones_dentro[primeras]]
+    bigote_sup[codigos[posiciones_dentro[ultimas]]] = valores[posiciones_dentro[ultimas]]
+
+    n_atipicos = np.bincount(codigos[~dentro], minlength=len(tamanos))
+    resumen = pd.DataFrame({
+        'grupo': grupos, 'n': tamanos,
+        'media': np.bincount(codigos, weights=valores, minlength=len(tamanos)) / tamanos,
+        'minimo': valores[inicios], 'q1': q1, 'mediana': mediana, 'q3': q3,
+        'bigote_inf': bigote_inf, 'bigote_sup': bigote_sup,
+        'maximo': valores[inicios + tamanos - 1], 'atipicos': n_atipicos,
+    })
+
+    # Atípicos: todos si son pocos; si no, una selección equiespaciada en orden (mínimo y máximo incluidos)
+    posiciones_fuera = np.flatnonzero(~dentro)
+    seleccion = []
+    for g, cantidad in enumerate(n_atipicos):
+        if cantidad == 0:
+            continue
+        del_grupo = posiciones_fuera[codigos[posiciones_fuera] == g] if len(n_atipicos) > 1 else posiciones_fuera
+        if cantidad > max_atipicos:
+            del_grupo = del_grupo[np.unique(np.linspace(0, cantidad - 1, max_atipicos).round().astype(np.int64))]
+        seleccion.append(del_grupo)
+    seleccion = np.concatenate(seleccion) if seleccion else np.empty(0, dtype=np.int64)
+    atipicos = pd.DataFrame({'grupo': grupos[codigos[seleccion]], 'valor': valores[seleccion]})
+    return resumen, atipicos
@@ -0,0 +1,118 @@
+# app/visualization/cache_figuras.py
+# Caché LRU de figuras y agregados por (dataset, versión, tipo de gráfico, columnas, opciones).
+
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+MAX_ENTRADAS = 64
+MAX_MB = 256
+
+
+def _tamano(valor):
+    """Bytes aproximados de una entrada: DataFrames por su memoria y figuras por sus arreglos."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, tuple):
+        return sum(_tamano(v) for v in valor)
+    total = 0
+    for traza in getattr(valor, 'data', ()):
+        for propiedad in traza.to_plotly_json().values():
+            if isinstance(propiedad, np.ndarray):
+                total += propiedad.nbytes
+            elif isinstance(propiedad, (list, tuple)):
+                total += 8 * len(propiedad)
+    return total
+
+
+class CacheFiguras:
+    """
+    Caché LRU en memoria limitada por cantidad de entradas y MB.
+    Las figuras guardadas se tratan como de solo lectura.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_mb=MAX_MB):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_mb * 1e6
+        self._entradas = OrderedDict()
+        self._bytes = {}
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        if clave in self._entradas:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return self._entradas[clave]
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, valor):
+        self._entradas[clave] = valor
+        self._entradas.move_to_end(clave)
+        self._bytes[clave] = _tamano(valor)
+        # Se expulsan las menos usadas, pero nunca la recién guardada
+        while len(self._entradas) > 1 and (len(self._entradas) > self.max_entradas or sum(self._bytes.values()) > self.max_bytes):
+            expulsada, _ = self._entradas.popitem(last=False)
+            del self._bytes[expulsada]
+
+    def descartar_dataset(self, id_dataset):
+        """Elimina todas las entradas de un dataset (p. ej. al cerrarlo)."""
+        for clave in [c for c in self._entradas if c[0] == id_dataset]:
+            del self._entradas[clave]
+            del self._bytes[clave]
+
+    def limpiar(self):
+        self._entradas.clear()
+        self._bytes.clear()
+
+    def estadisticas(self):
+        return {
+            'entradas': len(self._entradas),
+            'mb': round(sum(self._bytes.values()) / 1e6, 2),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+        }
+
+
+def obtener_cache_figuras():
+    """Caché de la sesión actual (las figuras dependen de los datasets de la sesión)."""
+    if 'cache_figuras' not in st.session_state:
+        st.session_state['cache_figuras'] = CacheFiguras()
+    return st.session_state['cache_figuras']
+
+
+def _congelar(valor):
+    """Convierte listas y dicts en tuplas para usarlos dentro de la clave."""
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple, pd.Index)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def clave_figura(dataset, tipo, *argumentos, **opciones):
+    """
+    Clave de caché: identificador del dataset cargado (uno nuevo por carga, aunque se repita
+    el nombre), su versión del historial, el tipo de gráfico, las columnas y las opciones.
+    """
+    id_dataset = dataset.setdefault('id_cache', uuid.uuid4().hex)
+    return (id_dataset, dataset.get('version', 0), tipo, _congelar(argumentos), _congelar(opciones))
+
+
+def en_cache(dataset, tipo, funcion, *argumentos, cache=None, **opciones):
+    """
+    Devuelve `funcion(df_limpio, *argumentos, **opciones)` desde la caché si ya se calculó
+    para esta versión del dataset; si no, la calcula y la guarda. Sirve para figuras y agregados.
+    """
+    cache = obtener_cache_figuras() if cache is None else cache
+    clave = clave_figura(dataset, tipo, *argumentos, **opciones)
+    resultado = cache.obtener(clave)
+    if resultado is None:
+        resultado = funcion(dataset['df_limpio'], *argumentos, **opciones)
+        if resultado is not None:
+            cache.guardar(clave, resultado)
+    return resultado
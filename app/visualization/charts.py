@@ -1,60 +1,235 @@
 # app/visualization/charts.py
 
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 
-def plot_histogram(df, column, color_col=None):
-    """Genera un histograma interactivo."""
+from app.visualization.agregaciones import (
+    FACTOR_AUTO, BINS_POR_DEFECTO, LIMITE_PUNTOS, CELDAS_MUESTREO, MAX_ATIPICOS,
+    codigos_grupo, histograma, resumen_cajas, frecuencias, muestra_estratificada, celdas_dispersion, densidad_2d, tendencias_lineales
+)
+from app.visualization.correlaciones import (
+    METODOS_CORRELACION, MUESTRA_APROXIMADA, MAX_COLUMNAS_MAPA,
+    matriz_correlacion, columnas_mas_correlacionadas, orden_por_conglomerados
+)
+
+def plot_histogram(df, column, color_col=None, factor=FACTOR_AUTO, bins=BINS_POR_DEFECTO):
+    """Genera un histograma interactivo. Los bins se calculan en el servidor (ponderados si hay factor de expansión)."""
+    agregado = histograma(df, column, color_col, factor, bins)
+    factor = agregado.attrs['factor']
     title = f'<b>Distribución de: {column}</b>'
     if color_col:
         title += f' (coloreado por {color_col})'
-    fig = px.histogram(df, x=column, title=title, template='plotly_white', color=color_col,
-                       color_discrete_sequence=px.colors.qualitative.Plotly if color_col else ['#0083B8'])
-    fig.update_layout(title_x=0.5, bargap=0.1)
+    if factor:
+        title += f'<br><sup>Ponderado por {factor}</sup>'
+    eje_y = 'Población expandida' if factor else 'Frecuencia'
+    fig = px.bar(agregado, x='centro', y='conteo', title=title, template='plotly_white', color=color_col,
+                 hover_data={'inicio': ':.4g', 'fin': ':.4g', 'centro': False},
+                 labels={'centro': column, 'conteo': eje_y},
+                 color_discrete_sequence=px.colors.qualitative.Plotly if color_col else ['#0083B8'])
+    # Bins contiguos como en px.histogram (apilados si hay color)
+    ancho = float(agregado['fin'].iloc[0] - agregado['inicio'].iloc[0]) if len(agregado) else None
+    fig.update_traces(width=ancho)
+    fig.update_layout(title_x=0.5, bargap=0.1, barmode='relative')
     return fig
 
-def plot_bar_chart(df, column):
-    """Genera un gráfico de barras interactivo de frecuencias."""
+def plot_bar_chart(df, column, factor=FACTOR_AUTO, limite=50):
+    """Genera un gráfico de barras interactivo de frecuencias (las categorías fuera del top `limite` van en "Otros")."""
     if column not in df.columns:
         return None
-    value_counts = df[column].value_counts().reset_index()
-    value_counts.columns = [column, 'Frecuencia']
+    value_counts = frecuencias(df, column, factor, limite)
+    factor = value_counts.attrs['factor']
     title = f'<b>Frecuencia de categorías en: {column}</b>'
-    fig = px.bar(value_counts, x=column, y='Frecuencia', title=title, text_auto=True, template='plotly_white', color_discrete_sequence=['#0083B8'])
+    if factor:
+        title += f'<br><sup>Ponderado por {factor}</sup>'
+    value_counts[column] = value_counts[column].astype(str)
+    fig = px.bar(value_counts, x=column, y='Frecuencia', title=title, text_auto='.3s' if factor else True, template='plotly_white',
+                 hover_data={'Porcentaje': ':.1f'}, color_discrete_sequence=['#0083B8'])
     fig.update_traces(textposition='outside')
-    fig.update_layout(title_x=0.5)
+    fig.update_layout(title_x=0.5, xaxis_type='category')
     return fig
 
-def plot_scatter(df, x_column, y_column, color_col=None):
-    """Genera un gráfico de dispersión interactivo con línea de tendencia."""
+def _trazas_tendencia(fig, tendencias, nombres=None):
+    """Agrega una recta por grupo con su ecuación y R² en la leyenda."""
+    for i, fila in tendencias.iterrows():
+        if fila['n'] < 2 or not np.isfinite(fila['pendiente']):
+            continue
+        xs = np.array([fila['x_min'], fila['x_max']])
+        prefijo = f"{nombres[i]}: " if nombres is not None else ""
+        fig.add_trace(go.Scattergl(
+            x=xs, y=fila['intercepto'] + fila['pendiente'] * xs, mode='lines', line=dict(width=2, dash='dash'),
+            name=f"{prefijo}y = {fila['intercepto']:.4g} + {fila['pendiente']:.4g}·x (R² = {fila['r2']:.3f})",
+        ))
+
+def plot_scatter(df, x_column, y_column, color_col=None, modo='auto', limite=LIMITE_PUNTOS, color_categorico=None):
+    """
+    Genera un gráfico de dispersión interactivo con línea de tendencia (MCO sobre todos los datos).
+    Con más de `limite` puntos se usa WebGL y una muestra estratificada por zonas del gráfico
+    (modo 'auto' o 'muestra'), o una grilla de densidad calculada en el servidor (modo 'densidad').
+    `color_categorico` fuerza a tratar el color como grupos (por defecto: si no es numérico).
+    """
     if x_column not in df.columns or y_column not in df.columns:
         return None
+    x = pd.to_numeric(df[x_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    y = pd.to_numeric(df[y_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    validos = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    x, y = x[validos], y[validos]
     title = f'<b>Relación entre {x_column} y {y_column}</b>'
     if color_col:
         title += f' (coloreado por {color_col})'
-    fig = px.scatter(df, x=x_column, y=y_column, title=title, template='plotly_white', trendline="ols", color=color_col,
-                     color_discrete_sequence=px.colors.qualitative.Plotly if color_col else ['#0083B8'])
-    fig.update_layout(title_x=0.5)
+
+    # La tendencia se ajusta sobre todos los puntos válidos (por grupo si el color es categórico)
+    grupos = nombres = None
+    if color_categorico is None:
+        color_categorico = bool(color_col) and not pd.api.types.is_numeric_dtype(df[color_col])
+    if color_col and color_categorico:
+        grupos, nombres = codigos_grupo(df[color_col].to_numpy()[validos])
+        con_grupo = grupos >= 0
+        tendencias = tendencias_lineales(x[con_grupo], y[con_grupo], grupos[con_grupo])
+    else:
+        tendencias = tendencias_lineales(x, y)
+
+    n = len(validos)
+    if modo == 'densidad':
+        conteos, centros_x, centros_y = densidad_2d(x, y, bins=100)
+        fig = go.Figure(go.Heatmap(
+            x=centros_x, y=centros_y, z=np.where(conteos > 0, conteos, np.nan),
+            colorscale='Blues', colorbar=dict(title='Puntos'), hovertemplate='x=%{x:.4g}<br>y=%{y:.4g}<br>puntos=%{z:,}<extra></extra>'
+        ))
+        fig.update_layout(template='plotly_white', xaxis_title=x_column, yaxis_title=y_column)
+        aviso = f"Densidad de {n:,} puntos en una grilla de 100×100"
+    else:
+        posiciones = np.arange(n)
+        aviso = None
+        if n > limite:
+            estratos = celdas_dispersion(x, y)
+            if grupos is not None:
+                estratos = estratos + (grupos.astype(np.int64) + 1) * CELDAS_MUESTREO ** 2
+            posiciones = muestra_estratificada(estratos, limite)
+            aviso = f"Muestra de {len(posiciones):,} de {n:,} puntos (estratificada por zona del gráfico; la tendencia usa todos)"
+        # Solo las columnas del gráfico; el color categórico ya viene con los grupos acotados
+        puntos = pd.DataFrame({x_column: x[posiciones], y_column: y[posiciones]})
+        if grupos is not None:
+            puntos[color_col] = np.where(grupos[posiciones] >= 0, nombres.astype(str)[np.maximum(grupos[posiciones], 0)], None)
+        elif color_col:
+            puntos[color_col] = df[color_col].to_numpy()[validos[posiciones]]
+        fig = px.scatter(puntos, x=x_column, y=y_column, title=title, template='plotly_white', color=color_col,
+                         render_mode='webgl' if n > limite else 'auto',
+                         category_orders={color_col: [str(g) for g in nombres]} if nombres is not None else None,
+                         color_discrete_sequence=px.colors.qualitative.Plotly if color_col else ['#0083B8'])
+    _trazas_tendencia(fig, tendencias, nombres)
+    fig.update_layout(title_text=title, title_x=0.5)
+    if aviso:
+        fig.add_annotation(text=aviso, xref='paper', yref='paper', x=0, y=1.02, xanchor='left', yanchor='bottom',
+                           showarrow=False, font=dict(size=11, color='gray'))
+        fig.update_layout(meta={'muestreado': True, 'aviso': aviso})
     return fig
-    
-def plot_box_plot(df, num_column, cat_column=None):
-    """Genera un diagrama de caja interactivo."""
+
+def plot_box_plot(df, num_column, cat_column=None, max_atipicos=MAX_ATIPICOS):
+    """
+    Genera un diagrama de caja interactivo a partir de cuartiles calculados en el servidor.
+    Solo se envían las estadísticas de cada caja y hasta `max_atipicos` atípicos por grupo.
+    """
     if num_column not in df.columns:
         return None
     title = f'<b>Diagrama de Caja de {num_column}</b>'
     if cat_column and cat_column in df.columns:
         title += f' (agrupado por {cat_column})'
-    fig = px.box(df, y=num_column, x=cat_column, title=title, template='plotly_white', color=cat_column, color_discrete_sequence=px.colors.qualitative.Plotly)
-    fig.update_layout(title_x=0.5)
+    else:
+        cat_column = None
+    resumen, atipicos = resumen_cajas(df, num_column, cat_column, max_atipicos)
+
+    fig = go.Figure()
+    colores = px.colors.qualitative.Plotly
+    for i, fila in resumen.iterrows():
+        color = colores[i % len(colores)]
+        nombre = str(fila['grupo'])
+        fig.add_trace(go.Box(
+            x=[nombre], q1=[fila['q1']], median=[fila['mediana']], q3=[fila['q3']],
+            lowerfence=[fila['bigote_inf']], upperfence=[fila['bigote_sup']], mean=[fila['media']],
+            name=nombre, marker_color=color, boxpoints=False, legendgroup=nombre, showlegend=cat_column is not None,
+        ))
+        puntos = atipicos.loc[atipicos['grupo'] == fila['grupo'], 'valor']
+        if len(puntos):
+            fig.add_trace(go.Scattergl(
+                x=[nombre] * len(puntos), y=puntos, mode='markers', marker=dict(color=color, size=4, opacity=0.6),
+                name=f"Atípicos {nombre}", legendgroup=nombre, showlegend=False,
+            ))
+    fig.update_layout(title_text=title, title_x=0.5, template='plotly_white', yaxis_title=num_column,
+                      xaxis_title=cat_column or '', xaxis_type='category')
+    recortados = int((resumen['atipicos'] > max_atipicos).sum())
+    if recortados:
+        fig.add_annotation(text=f"Se muestran hasta {max_atipicos:,} atípicos por grupo ({recortados} grupo(s) recortados)",
+                           xref='paper', yref='paper', x=0, y=1.02, xanchor='left', yanchor='bottom',
+                           showarrow=False, font=dict(size=11, color='gray'))
     return fig
 
-def plot_correlation_heatmap(df):
-    """Genera un mapa de calor de correlaciones para columnas numéricas."""
-    numeric_df = df.select_dtypes(include='number')
-    if numeric_df.shape[1] < 2:
+def plot_correlation_heatmap(df, metodo='pearson', columnas=None, reordenar=True, aproximada=False, corr=None, max_texto=20):
+    """
+    Genera un mapa de calor de correlaciones para columnas numéricas.
+    `corr` permite pasar una matriz ya calculada (p. ej. de `obtener_correlaciones`).
+    Con `aproximada` se usa una muestra de filas; con `reordenar` las variables
+    correlacionadas quedan juntas. Los valores se escriben solo si hay pocas columnas.
+    """
+    if corr is None:
+        corr = matriz_correlacion(df, columnas, metodo, muestra=MUESTRA_APROXIMADA if aproximada else None)
+    if corr.shape[1] < 2:
         return None
-    corr_matrix = numeric_df.corr()
-    title = '<b>Mapa de Calor de Correlaciones Numéricas</b>'
-    fig = px.imshow(corr_matrix, text_auto=True, aspect="auto", title=title, template='plotly_white', color_continuous_scale='RdBu_r')
+    total_columnas = corr.shape[1]
+    if total_columnas > MAX_COLUMNAS_MAPA:
+        elegidas = columnas_mas_correlacionadas(corr, MAX_COLUMNAS_MAPA)
+        corr = corr.loc[elegidas, elegidas]
+    if reordenar:
+        orden = orden_por_conglomerados(corr)
+        corr = corr.loc[orden, orden]
+    title = f"<b>Mapa de Calor de Correlaciones Numéricas ({METODOS_CORRELACION[corr.attrs.get('metodo', metodo)]})</b>"
+    if corr.attrs.get('aproximada'):
+        title += f"<br><sup>Aproximada: muestra de {corr.attrs['filas']:,} filas</sup>"
+    if total_columnas > MAX_COLUMNAS_MAPA:
+        title += f"<br><sup>{MAX_COLUMNAS_MAPA} de {total_columnas} variables (las más correlacionadas)</sup>"
+    fig = px.imshow(corr, text_auto='.2f' if corr.shape[1] <= max_texto else False, aspect="auto", title=title,
+                    template='plotly_white', color_continuous_scale='RdBu_r', zmin=-1, zmax=1)
     fig.update_layout(title_x=0.5)
-    return fig
\ No newline at end of file
+    return fig
+
+def _texto_codigo(valor):
+    """Código como texto comparable: 1, 1.0 y '1' dan '1'."""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+    return str(int(numero)) if numero.is_integer() else str(numero)
+
+def etiquetar_figura(fig, etiquetas_x=None, etiquetas_color=None):
+    """
+    Reemplaza códigos por sus etiquetas (p. ej. de VALUE_LABELS): en las categorías del eje X
+    y en los nombres de la leyenda. Los códigos sin etiqueta se dejan como están.
+    """
+    if etiquetas_x:
+        mapa = {_texto_codigo(k): v for k, v in etiquetas_x.items()}
+        categorias = []
+        for traza in fig.data:
+            if traza.x is not None and traza.type in ('bar', 'box', 'scattergl', 'scatter'):
+                categorias += [c for c in traza.x if c not in categorias]
+        if categorias and fig.layout.xaxis.type == 'category':
+            fig.update_xaxes(tickvals=categorias, ticktext=[mapa.get(_texto_codigo(c), c) for c in categorias])
+    if etiquetas_color:
+        mapa = {_texto_codigo(k): v for k, v in etiquetas_color.items()}
+        for traza in fig.data:
+            if traza.name and traza.showlegend is not False:
+                # Nombres "código" o "código: detalle" (p. ej. las rectas de tendencia por grupo)
+                codigo, separador, detalle = traza.name.partition(': ')
+                if _texto_codigo(codigo) in mapa:
+                    traza.name = mapa[_texto_codigo(codigo)] + separador + detalle
+    return fig
+
+def contar_puntos(fig):
+    """Valores que la figura envía al navegador (suma de x, y y z de todas las trazas)."""
+    total = 0
+    for traza in fig.data:
+        for eje in ('x', 'y', 'z'):
+            valores = getattr(traza, eje, None)
+            if valores is not None:
+                total += np.size(valores)
+    return total
@@ -0,0 +1,143 @@
+# app/visualization/correlaciones.py
+# Motor de correlaciones: productos matriciales por bloques con nulos enmascarados, pares más fuertes y reordenamiento.
+
+import numpy as np
+import pandas as pd
+
+METODOS_CORRELACION = {
+    'pearson': "Pearson (lineal)",
+    'spearman': "Spearman (por rangos)",
+}
+TAMANO_BLOQUE = 100_000
+MUESTRA_APROXIMADA = 200_000
+# Columnas que se dibujan en el mapa de calor (100 x 100 celdas como máximo)
+MAX_COLUMNAS_MAPA = 100
+
+
+def _matriz_numerica(df, columnas, metodo):
+    datos = df[columnas]
+    if metodo == 'spearman':
+        # Rangos promedio por columna (los nulos siguen nulos); luego Pearson sobre los rangos
+        datos = datos.rank(method='average')
+    return datos.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def correlacion_enmascarada(valores, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Correlación de Pearson por pares con nulos (como `DataFrame.corr`): cada par usa las filas
+    donde ambas columnas tienen dato. Todo se reduce a cuatro productos matriciales (BLAS)
+    acumulados por bloques de filas, así la memoria no depende del número de filas.
+    """
+    n_filas, n_cols = valores.shape
+    # Centrar con la media de cada columna reduce la cancelación numérica de las sumas
+    with np.errstate(invalid='ignore'):
+        centro = np.nan_to_num(np.nanmean(valores, axis=0)) if n_filas else np.zeros(n_cols)
+    n = np.zeros((n_cols, n_cols))
+    sx = np.zeros((n_cols, n_cols))
+    sxx = np.zeros((n_cols, n_cols))
+    sxy = np.zeros((n_cols, n_cols))
+    for inicio in range(0, n_filas, tamano_bloque):
+        bloque = valores[inicio:inicio + tamano_bloque] - centro
+        mascara = np.isfinite(bloque)
+        z = np.where(mascara, bloque, 0.0)
+        m = mascara.astype('float64')
+        n += m.T @ m           # filas válidas para el par (i, j)
+        sx += z.T @ m          # suma de x_i sobre esas filas
+        sxx += (z * z).T @ m   # suma de x_i² sobre esas filas
+        sxy += z.T @ z         # suma de x_i·x_j
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covarianza = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        r = covarianza / np.sqrt(var_i * var_i.T)
+    r[n < 2] = np.nan
+    np.fill_diagonal(r, np.where(np.diag(n) >= 2, 1.0, np.nan))
+    return np.clip(r, -1.0, 1.0)
+
+
+def matriz_correlacion(df, columnas=None, metodo='pearson', muestra=None, semilla=0):
+    """
+    Matriz de correlación de las columnas numéricas (o de `columnas`).
+    Con `muestra`, si el dataset tiene más filas se calcula sobre una muestra aleatoria
+    (modo aproximado; el resultado lo indica en `attrs`).
+    Con nulos, Spearman usa los rangos de cada columna completa (pandas re-rankea por par).
+    """
+    if metodo not in METODOS_CORRELACION:
+        raise ValueError(f"Método de correlación desconocido: {metodo!r}.")
+    if columnas is None:
+        columnas = df.select_dtypes(include='number').columns.tolist()
+    filas_totales = filas_usadas = len(df)
+    if muestra and len(df) > muestra:
+        posiciones = np.sort(np.random.default_rng(semilla).choice(len(df), muestra, replace=False))
+        df = df.iloc[posiciones]
+        filas_usadas = muestra
+    corr = pd.DataFrame(correlacion_enmascarada(_matriz_numerica(df, columnas, metodo)), index=columnas, columns=columnas)
+    corr.attrs.update({'metodo': metodo, 'filas': filas_usadas, 'aproximada': filas_usadas < filas_totales})
+    return corr
+
+
+def pares_mas_fuertes(corr, k=20):
+    """Los `k` pares distintos con mayor |r| (triángulo superior, sin la diagonal)."""
+    valores = corr.to_numpy()
+    i, j = np.triu_indices(len(valores), k=1)
+    r = valores[i, j]
+    validos = np.flatnonzero(np.isfinite(r))
+    k = min(k, len(validos))
+    if k == 0:
+        return pd.DataFrame(columns=['Variable 1', 'Variable 2', 'r'])
+    # Top-k con argpartition (O(m)) y solo esos k se ordenan
+    elegidos = validos[np.argpartition(-np.abs(r[validos]), k - 1)[:k]]
+    elegidos = elegidos[np.argsort(-np.abs(r[elegidos]), kind='stable')]
+    return pd.DataFrame({
+        'Variable 1': corr.index[i[elegidos]], 'Variable 2': corr.columns[j[elegidos]], 'r': r[elegidos],
+    })
+
+
+def columnas_mas_correlacionadas(corr, k=MAX_COLUMNAS_MAPA):
+    """Las `k` columnas con mayor |r| medio con las demás (en su orden original)."""
+    if corr.shape[1] <= k:
+        return list(corr.columns)
+    valores = np.abs(corr.to_numpy())
+    np.fill_diagonal(valores, np.nan)
+    with np.errstate(invalid='ignore'):
+        media = np.nan_to_num(np.nanmean(valores, axis=0), nan=0.0)
+    return list(corr.columns[np.sort(np.argpartition(-media, k - 1)[:k])])
+
+
+def orden_por_conglomerados(corr):
+    """
+    Orden de las variables según un agrupamiento jerárquico de enlace promedio con
+    distancia 1 - |r|: variables muy correlacionadas quedan contiguas en el mapa de calor.
+    """
+    distancias = 1.0 - np.abs(np.nan_to_num(corr.to_numpy(), nan=0.0))
+    n = len(distancias)
+    np.fill_diagonal(distancias, np.inf)
+    hojas = [[i] for i in range(n)]
+    tamanos = np.ones(n)
+    activos = np.ones(n, dtype=bool)
+    for _ in range(n - 1):
+        a, b = np.unravel_index(np.argmin(distancias), distancias.shape)
+        a, b = min(a, b), max(a, b)
+        # Enlace promedio: la distancia del nuevo grupo es la media ponderada por tamaño
+        nueva = (tamanos[a] * distancias[a] + tamanos[b] * distancias[b]) / (tamanos[a] + tamanos[b])
+        distancias[a, :], distancias[:, a] = nueva, nueva
+        distancias[a, a] = np.inf
+        distancias[b, :], distancias[:, b] = np.inf, np.inf
+        hojas[a] = hojas[a] + hojas[b]
+        tamanos[a] += tamanos[b]
+        activos[b] = False
+    return [corr.index[i] for i in hojas[int(np.flatnonzero(activos)[0])]] if n else []
+
+
+def obtener_correlaciones(dataset, columnas=None, metodo='pearson', muestra=None):
+    """
+    Matriz de correlación del `df_limpio` del dataset, guardada por (versión, columnas, método, muestra).
+    Al cambiar de versión se descartan las matrices anteriores.
+    """
+    version = dataset.get('version', 0)
+    cache = dataset.setdefault('correlaciones', {})
+    for clave in [c for c in cache if c[0] != version]:
+        del cache[clave]
+    clave = (version, tuple(columnas) if columnas is not None else None, metodo, muestra)
+    if clave not in cache:
+        cache[clave] = matriz_correlacion(dataset['df_limpio'], columnas, metodo, muestra)
+    return cache[clave]
@@ -1,7 +1,7 @@
 # app/main.py
 import streamlit as st
 from app.components import file_uploader, data_selector
-from app.pages import analysis, cleaning, visualization
+from app.pages import analysis, cleaning, visualization, graficos, uniones
 
 st.set_page_config(layout="wide", page_title="App de Análisis Multi-Dataset")
 
@@ -19,7 +19,7 @@ dataset_activo_nombre, dataset_activo = data_selector.select_active_dataset()
 st.markdown("---")
 modo = st.radio(
     "Elige un modo de operación:",
-    ('🔍 Análisis General', '🧹 Limpieza y Transformación', '📊 Visualización de Datos'),
+    ('🔍 Análisis General', '🧹 Limpieza y Transformación', '📊 Visualización de Datos', '📈 Constructor de Gráficos', '🔗 Unir Módulos'),
     horizontal=True, key=f'modo_{dataset_activo_nombre}'
 )
 
@@ -28,7 +28,11 @@ if modo == '🔍 Análisis General':
 elif modo == '🧹 Limpieza y Transformación':
     cleaning.display(dataset_activo, dataset_activo_nombre)
 elif modo == '📊 Visualización de Datos':
-    visualization.display(dataset_activo['df_limpio'], dataset_activo_nombre)
+    visualization.display(dataset_activo, dataset_activo_nombre)
+elif modo == '📈 Constructor de Gráficos':
+    graficos.display(dataset_activo, dataset_activo_nombre)
+elif modo == '🔗 Unir Módulos':
+    uniones.display(dataset_activo, dataset_activo_nombre)
     
     
     
@@ -0,0 +1,75 @@
+# tests/test_agregaciones.py
+# Las agregaciones para gráficos deben coincidir con np.histogram, value_counts, polyfit y los cuantiles de numpy.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.visualization.agregaciones import (LIMITE_PUNTOS, MAX_ATIPICOS, celdas_dispersion, frecuencias, histograma,
+                                            muestra_estratificada, resumen_cajas, tendencias_lineales)
+
+
+@pytest.fixture(scope='module')
+def df_prueba():
+    rng = np.random.default_rng(0)
+    n = 100_000
+    df = pd.DataFrame({
+        'ingreso': rng.lognormal(7, 1, n),
+        'area': rng.choice(['Urbana', 'Rural'], n),
+        'facpob07': rng.uniform(50, 500, n),
+    })
+    df.loc[::13, 'ingreso'] = np.nan
+    return df
+
+
+def test_histograma_equivale_a_np_histogram(df_prueba):
+    h = histograma(df_prueba, 'ingreso', factor=None, bins=40)
+    esperado, _ = np.histogram(df_prueba['ingreso'].dropna(), bins=40)
+    assert np.array_equal(h['conteo'].to_numpy(), esperado)
+
+
+def test_histograma_ponderado_usa_el_factor_de_expansion(df_prueba):
+    hp = histograma(df_prueba, 'ingreso', bins=40)
+    validos = df_prueba['ingreso'].notna()
+    esperado, _ = np.histogram(df_prueba['ingreso'][validos], bins=40, weights=df_prueba['facpob07'][validos])
+    assert np.allclose(hp['conteo'].to_numpy(), esperado) and hp.attrs['factor'] == 'facpob07'
+
+
+def test_histograma_por_color_conserva_el_total(df_prueba):
+    hg = histograma(df_prueba, 'ingreso', color_col='area', factor=None, bins=40)
+    assert hg.groupby('area')['conteo'].sum().sum() == df_prueba['ingreso'].notna().sum()
+
+
+def test_frecuencias_equivalen_a_value_counts(df_prueba):
+    f = frecuencias(df_prueba, 'area', factor=None)
+    assert f.set_index('area')['Frecuencia'].to_dict() == df_prueba['area'].value_counts().to_dict()
+
+
+def test_tendencias_lineales_equivalen_a_polyfit(df_prueba):
+    rng = np.random.default_rng(1)
+    x = df_prueba['facpob07'].to_numpy()
+    y = 3 + 0.5 * x + rng.normal(0, 10, len(x))
+    codigos, grupos = pd.factorize(df_prueba['area'], sort=True)
+    t = tendencias_lineales(x, y, codigos)
+    for i in range(len(grupos)):
+        b, a = np.polyfit(x[codigos == i], y[codigos == i], 1)
+        assert np.isclose(t['pendiente'][i], b) and np.isclose(t['intercepto'][i], a)
+
+
+def test_muestra_estratificada_sin_repetidos_y_con_tope(df_prueba):
+    x = df_prueba['facpob07'].to_numpy()
+    y = np.random.default_rng(2).normal(0, 1, len(x))
+    muestra = muestra_estratificada(celdas_dispersion(x, y), LIMITE_PUNTOS)
+    assert len(muestra) <= LIMITE_PUNTOS and len(np.unique(muestra)) == len(muestra)
+
+
+def test_resumen_cajas_equivale_a_los_cuantiles(df_prueba):
+    resumen, atipicos = resumen_cajas(df_prueba, 'ingreso', 'area')
+    for _, fila in resumen.iterrows():
+        v = df_prueba.loc[df_prueba['area'] == fila['grupo'], 'ingreso'].dropna().to_numpy()
+        q1, q3 = np.quantile(v, [0.25, 0.75])
+        dentro = v[(v >= q1 - 1.5 * (q3 - q1)) & (v <= q3 + 1.5 * (q3 - q1))]
+        assert np.allclose([fila['q1'], fila['mediana'], fila['q3']], np.quantile(v, [0.25, 0.5, 0.75]))
+        assert fila['bigote_inf'] == dentro.min() and fila['bigote_sup'] == dentro.max()
+        assert fila['atipicos'] == len(v) - len(dentro)
+    assert atipicos.groupby('grupo').size().max() <= MAX_ATIPICOS
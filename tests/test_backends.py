@@ -0,0 +1,98 @@
+# tests/test_backends.py
+# Los motores de ejecución (pandas / Polars) deben dar los mismos resultados que el motor de referencia.
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.backends import BackendPandas, _conversiones, obtener_backend, polars_disponible
+from app.utils.data_cleaner import CLAVE_DEPARTAMENTO, construir_plan, ejecutar_plan, optimizar_plan
+
+MOTORES = ['pandas', pytest.param('polars', marks=pytest.mark.skipif(not polars_disponible(), reason="polars no instalado"))]
+
+OPCIONES_NUM = ["No hacer nada", "Eliminar filas con nulos", "Rellenar con la media", "Rellenar con la mediana",
+                "Rellenar con la media por grupo", "Rellenar con la mediana por grupo"]
+OPCIONES_CAT = ["No hacer nada", "Rellenar con la moda", "Rellenar con 'Desconocido'", "Rellenar con la moda por grupo"]
+DUPLICADOS = [(False, None, 'primero'), (True, None, 'primero')] + [(True, ['dominio', 'hogar'], p) for p in ('primero', 'ultimo', 'mas_completo')]
+
+
+@pytest.fixture(scope='module')
+def df_prueba():
+    rng = np.random.default_rng(0)
+    filas = 5_000
+    df = pd.DataFrame({
+        'dominio': rng.integers(1, 9, filas),
+        'ubigeo': rng.choice([10101, 150101, 150102, 40101], filas),
+        'p104': rng.choice([1, 2, 3, 4, 99], filas),
+        'p522': np.where(rng.random(filas) < 0.2, np.nan, rng.normal(1500, 300, filas).round()),
+        'texto': pd.Series(rng.choice(['a', 'b', 'c', None], filas), dtype=object),
+        # 9 = "Missing value" en el diccionario: lo convierte la normalización de faltantes
+        'p105a': rng.choice([1, 2, 3, 9], filas),
+    })
+    df = pd.concat([df, df.head(200)], ignore_index=True)
+    df['hogar'] = pd.array(rng.choice([1, 2, 3, None], len(df)), dtype='Int64')
+    return df
+
+
+def _comparable(df):
+    # None y NaN cuentan como el mismo faltante (los tipos se comparan aparte)
+    return df.astype(object).where(df.notna(), None)
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+@pytest.mark.parametrize('num, cat', list(itertools.product(OPCIONES_NUM, OPCIONES_CAT)))
+def test_ejecutar_plan_equivale_a_pandas(df_prueba, motor, num, cat):
+    backend = obtener_backend(motor)
+    for (dup, claves, politica), norm in itertools.product(DUPLICADOS, [False, True]):
+        plan = optimizar_plan(construir_plan(num, cat, dup, list(df_prueba.columns[:-1]), norm,
+                                             ['dominio', CLAVE_DEPARTAMENTO], claves, politica))
+        referencia, resultado = ejecutar_plan(df_prueba, plan), backend.ejecutar_plan(df_prueba, plan)
+        pd.testing.assert_series_equal(referencia.dtypes, resultado.dtypes)
+        pd.testing.assert_frame_equal(_comparable(referencia), _comparable(resultado), rtol=1e-9)
+        assert referencia.attrs == resultado.attrs
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_mas_completo_cuenta_nulos_antes_de_imputar(motor):
+    # La fila con nulos se ve completa tras imputar; aun así debe ganar la que tenía los datos reales
+    df = pd.DataFrame({'conglome': [1, 1, 2], 'hogar': [1, 1, 1],
+                       'p522': [np.nan, 1200.0, 900.0], 't': pd.Series([None, 'b', 'c'], dtype=object)})
+    plan = optimizar_plan(construir_plan("Rellenar con la media", "Rellenar con 'Desconocido'", True, list(df.columns), False,
+                                         [], ['conglome', 'hogar'], 'mas_completo'))
+    resultado = obtener_backend(motor).ejecutar_plan(df, plan)
+    assert resultado['t'].tolist() == ['b', 'c'] and resultado['p522'].tolist() == [1200.0, 900.0]
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_perfilado_equivale_a_pandas(df_prueba, motor):
+    referencia, backend = BackendPandas(), obtener_backend(motor)
+    pd.testing.assert_frame_equal(referencia.describir_numericas(df_prueba), backend.describir_numericas(df_prueba), check_dtype=False)
+    pd.testing.assert_series_equal(referencia.nulos_por_columna(df_prueba), backend.nulos_por_columna(df_prueba))
+    assert referencia.contar_duplicados(df_prueba) == backend.contar_duplicados(df_prueba)
+    categoricas = backend.describir_categoricas(df_prueba)
+    assert categoricas.loc['texto', 'unique'] == 3 and categoricas.loc['texto', 'count'] == df_prueba['texto'].notna().sum()
+    assert backend.contar_valores(df_prueba, 'p104').sort_index().to_dict() == df_prueba['p104'].value_counts().sort_index().to_dict()
+
+
+@pytest.mark.skipif(not polars_disponible(), reason="polars no instalado")
+def test_polars_convierte_cada_dataframe_una_vez(df_prueba, monkeypatch):
+    import polars as pl
+    conversiones = []
+    original = pl.from_pandas
+    monkeypatch.setattr(pl, 'from_pandas', lambda df, **kw: conversiones.append(id(df)) or original(df, **kw))
+    _conversiones.clear()
+
+    backend = obtener_backend('polars')
+    for _ in range(2):  # dos reruns sobre la misma versión
+        backend.contar_duplicados(df_prueba)
+        backend.nulos_por_columna(df_prueba)
+        backend.describir_numericas(df_prueba)
+        backend.describir_categoricas(df_prueba)
+        backend.contar_valores(df_prueba, 'p104')
+    assert conversiones == [id(df_prueba)]
+
+    # Una versión nueva (otro objeto) se convierte de nuevo
+    backend.nulos_por_columna(df_prueba.copy())
+    assert len(conversiones) == 2
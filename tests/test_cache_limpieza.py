@@ -0,0 +1,37 @@
+# tests/test_cache_limpieza.py
+# La caché de limpieza separa los resultados por motor y no falla si Parquet no puede guardar una entrada.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.backends import polars_disponible
+from app.utils.cache_limpieza import CacheLimpieza, limpiar_con_cache
+from app.utils.recetas import crear_receta
+
+
+@pytest.fixture
+def df_prueba():
+    return pd.DataFrame({'p522': [1200.0, np.nan, 900.0], 'texto': pd.Series(['a', None, 'b'], dtype=object)})
+
+
+@pytest.mark.skipif(not polars_disponible(), reason="polars no instalado")
+def test_el_motor_forma_parte_de_la_clave(df_prueba):
+    cache, receta = CacheLimpieza(), crear_receta("Rellenar con la media", "No hacer nada", False)
+    assert not limpiar_con_cache(df_prueba, receta, cache, motor='pandas')[1]
+    assert not limpiar_con_cache(df_prueba, receta, cache, motor='polars')[1]
+    assert limpiar_con_cache(df_prueba, receta, cache, motor='polars')[1]
+    assert cache.estadisticas()['entradas'] == 2
+
+
+def test_error_de_arrow_deja_la_entrada_en_memoria(df_prueba, tmp_path, monkeypatch):
+    pa = pytest.importorskip('pyarrow')
+
+    def falla(*args, **kwargs):
+        raise pa.ArrowNotImplementedError("tipo no soportado")
+
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', falla)
+    cache = CacheLimpieza(directorio=tmp_path)
+    cache.guardar('clave', df_prueba)
+    assert cache.obtener('clave') is df_prueba
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,84 @@
+# tests/test_claves.py
+# Índice de claves ENAHO: codificación 'hash' y 'orden', políticas de duplicados y colisiones.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.claves import CLAVES_HOGAR, IndiceClaves, codificar_claves, detectar_nivel, seleccionar_filas
+
+
+@pytest.fixture(scope='module')
+def df_claves():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    return pd.DataFrame({
+        # conglome con rango grande (va por factorize); vivienda con nulos; ubigeo como texto
+        'conglome': rng.choice([10, 5_000_000, 123_456_789], n),
+        'vivienda': pd.array(rng.choice([1, 2, 3, None], n, p=[0.3, 0.3, 0.3, 0.1]), dtype='Int64'),
+        'hogar': rng.integers(11, 14, n),
+        'ubigeo': rng.choice(['010101', '150101', '040101'], n),
+        'p522': np.where(rng.random(n) < 0.3, np.nan, 1.0),
+    })
+
+
+@pytest.mark.parametrize('metodo', ['hash', 'orden'])
+def test_ids_densos_con_nulos(df_claves, metodo):
+    claves = ['conglome', 'vivienda', 'hogar', 'ubigeo']
+    ids, orden = codificar_claves(df_claves, claves, metodo)
+    nulos = df_claves['vivienda'].isna().to_numpy()
+    assert (ids[nulos] == -1).all() and (ids[~nulos] >= 0).all()
+    # Mismas claves <=> mismo id, sin huecos entre 0 y K-1
+    esperado = df_claves[~nulos].groupby(claves).ngroup().to_numpy()
+    assert len(np.unique(ids[~nulos])) == ids.max() + 1 == esperado.max() + 1
+    assert pd.crosstab(ids[~nulos], esperado).astype(bool).sum(axis=1).eq(1).all()
+    assert (orden is None) == (metodo == 'hash')
+
+
+def test_orden_numera_en_el_orden_de_las_claves(df_claves):
+    claves = ['conglome', 'hogar', 'ubigeo']
+    ids, orden = codificar_claves(df_claves, claves, 'orden')
+    # groupby ordena por las claves: sus números de grupo son exactamente los ids
+    assert np.array_equal(ids, df_claves.groupby(claves).ngroup().to_numpy())
+    assert np.array_equal(orden, np.lexsort([pd.factorize(df_claves[c], sort=True)[0] for c in claves[::-1]]))
+    hash_ids, _ = codificar_claves(df_claves, claves, 'hash')
+    assert pd.crosstab(ids, hash_ids).astype(bool).sum(axis=1).eq(1).all()
+
+
+def test_sin_claves_cada_fila_es_distinta():
+    ids, orden = codificar_claves(pd.DataFrame({'a': [1, 1, 1]}), [])
+    assert ids.tolist() == [0, 1, 2] and orden is None
+
+
+@pytest.mark.parametrize('politica, keep', [('primero', 'first'), ('ultimo', 'last')])
+def test_primero_y_ultimo_equivalen_a_drop_duplicates(df_claves, politica, keep):
+    ids, _ = codificar_claves(df_claves, CLAVES_HOGAR)
+    elegidas = seleccionar_filas(ids, politica)
+    con_clave = df_claves.dropna(subset=CLAVES_HOGAR)
+    esperado = np.sort(np.concatenate([df_claves.index.get_indexer(con_clave.drop_duplicates(CLAVES_HOGAR, keep=keep).index),
+                                       np.flatnonzero(ids < 0)]))
+    assert np.array_equal(elegidas, esperado)
+
+
+def test_mas_completo_elige_menos_nulos_y_en_empate_la_primera():
+    ids = np.array([0, 0, 0, 1, 1, -1, -1])
+    nulos = np.array([2, 0, 0, 1, 1, 3, 0])
+    assert seleccionar_filas(ids, 'mas_completo', nulos).tolist() == [1, 3, 5, 6]
+    with pytest.raises(ValueError):
+        seleccionar_filas(ids, 'mas_completo')
+    with pytest.raises(ValueError):
+        seleccionar_filas(ids, 'al_azar')
+
+
+def test_colisiones_y_resumen():
+    df = pd.DataFrame({'conglome': [1, 1, 1, 2, 2, 3, np.nan], 'vivienda': 1, 'hogar': 11, 'p522': [1.0, np.nan, 2.0, 3.0, 4.0, 5.0, 6.0]})
+    indice = IndiceClaves(df, CLAVES_HOGAR)
+    colisiones = indice.colisiones()
+    assert colisiones['conglome'].tolist() == [1.0, 2.0] and colisiones['repeticiones'].tolist() == [3, 2]
+    assert indice.colisiones(limite=1)['conglome'].tolist() == [1.0]
+    assert indice.resumen() == {'claves': CLAVES_HOGAR, 'filas': 7, 'claves_distintas': 3, 'filas_sin_clave': 1,
+                                'claves_repetidas': 2, 'filas_duplicadas': 3, 'es_unico': False}
+    assert indice.deduplicar('mas_completo').index.tolist() == [0, 3, 5, 6]
+    assert detectar_nivel(df) == 'desconocido' and detectar_nivel(df.iloc[[0, 3, 5, 6]]) == 'hogar'
+    with pytest.raises(KeyError):
+        IndiceClaves(df, CLAVES_HOGAR + ['codperso'])
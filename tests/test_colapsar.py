@@ -0,0 +1,52 @@
+# tests/test_colapsar.py
+# El colapso a hogar debe coincidir con groupby.agg y tratar los pesos nulos como Stata.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.claves import CLAVES_HOGAR
+from app.utils.colapsar import colapsar
+
+
+@pytest.fixture(scope='module')
+def personas():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    df = pd.DataFrame({
+        'conglome': rng.integers(100000, 100600, n), 'vivienda': rng.integers(1, 20, n), 'hogar': rng.integers(11, 13, n),
+        'p207': rng.choice([1.0, 2.0], n), 'p208a': rng.integers(0, 99, n).astype(float), 'i524': rng.lognormal(7, 1, n),
+        'p300a': rng.choice([1, 2, 3, 4, np.nan], n),
+    })
+    df.loc[::17, 'i524'] = np.nan
+    return df
+
+
+def test_equivale_a_groupby_agg(personas):
+    colapsado = colapsar(personas, {'p208a': ['media', 'max', 'min'], 'i524': ['suma', 'media', 'conteo', 'max'], 'p207': ['proporcion']})
+    referencia = personas.groupby(CLAVES_HOGAR).agg(
+        p208a_media=('p208a', 'mean'), p208a_max=('p208a', 'max'), p208a_min=('p208a', 'min'),
+        i524_suma=('i524', 'sum'), i524_media=('i524', 'mean'), i524_conteo=('i524', 'count'), i524_max=('i524', 'max'),
+        p207_prop_2=('p207', lambda s: (s == 2).mean()),
+    ).reset_index()
+    assert len(colapsado) == len(referencia)
+    for col in ['p208a_media', 'p208a_max', 'p208a_min', 'i524_suma', 'i524_media', 'i524_conteo', 'i524_max', 'p207_prop_2']:
+        assert np.allclose(colapsado[col].to_numpy(dtype='float64'), referencia[col].to_numpy(dtype='float64'), equal_nan=True), col
+    assert colapsado[CLAVES_HOGAR].equals(referencia[CLAVES_HOGAR])
+
+
+def test_proporciones_suman_uno(personas):
+    proporciones = colapsar(personas, {'p300a': ['proporcion']}).filter(like='p300a_prop_')
+    # Hogares sin ningún dato de p300a: todas sus proporciones quedan nulas
+    con_dato = proporciones.notna().all(axis=1)
+    assert np.allclose(proporciones[con_dato].sum(axis=1), 1) and proporciones[~con_dato].isna().all(axis=None)
+
+
+def test_pesos_nulos_no_cuentan_en_suma_media_ni_proporcion():
+    df = pd.DataFrame({'conglome': [1, 1, 1, 2, 2], 'vivienda': 1, 'hogar': 11,
+                       'i524': [100.0, 300.0, 500.0, 50.0, 70.0], 'p207': [1, 2, 2, 1, 2],
+                       'facpob07': [1.0, 3.0, np.nan, 2.0, 2.0]})
+    colapsado = colapsar(df, {'i524': ['suma', 'media'], 'p207': ['proporcion']}, pesos='facpob07')
+    assert colapsado['i524_suma'].tolist() == [1000.0, 240.0]
+    assert colapsado['i524_media'].tolist() == [250.0, 60.0]
+    assert colapsado['p207_prop_2'].tolist() == [0.75, 0.5]
@@ -0,0 +1,46 @@
+# tests/test_correlaciones.py
+# El motor de correlaciones debe coincidir con DataFrame.corr con nulos, por bloques y en Spearman.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.visualization.correlaciones import (correlacion_enmascarada, matriz_correlacion, orden_por_conglomerados,
+                                              pares_mas_fuertes)
+
+
+@pytest.fixture(scope='module')
+def df_prueba():
+    rng = np.random.default_rng(0)
+    n, p = 20_000, 30
+    base = rng.normal(size=(n, 5))
+    # Desplazamiento grande: el cálculo enmascarado no debe perder precisión por cancelación
+    datos = base[:, rng.integers(0, 5, p)] + rng.normal(scale=0.5, size=(n, p)) + 1e4
+    datos[rng.random((n, p)) < 0.05] = np.nan
+    return pd.DataFrame(datos, columns=[f'v{i}' for i in range(p)])
+
+
+def test_pearson_con_nulos_equivale_a_corr(df_prueba):
+    corr = matriz_correlacion(df_prueba)
+    assert np.allclose(corr.to_numpy(), df_prueba.corr().to_numpy(), atol=1e-8, equal_nan=True)
+    assert corr.attrs == {'metodo': 'pearson', 'filas': len(df_prueba), 'aproximada': False}
+
+
+def test_bloques_pequenos_dan_el_mismo_resultado(df_prueba):
+    valores = df_prueba.to_numpy()
+    assert np.allclose(correlacion_enmascarada(valores, tamano_bloque=3_000), correlacion_enmascarada(valores), equal_nan=True)
+
+
+def test_spearman_sin_nulos_equivale_a_corr():
+    sin_nulos = pd.DataFrame(np.random.default_rng(1).normal(size=(5_000, 8)), columns=list('abcdefgh'))
+    assert np.allclose(matriz_correlacion(sin_nulos, metodo='spearman'), sin_nulos.corr(method='spearman'))
+
+
+def test_pares_mas_fuertes_y_orden(df_prueba):
+    corr = matriz_correlacion(df_prueba)
+    pares = pares_mas_fuertes(corr, 5)
+    i, j = np.triu_indices(len(corr), k=1)
+    esperado = np.sort(np.abs(corr.to_numpy()[i, j]))[::-1][:5]
+    assert np.allclose(np.abs(pares['r'].to_numpy()), esperado)
+    assert all(corr.loc[a, b] == r for a, b, r in pares.itertuples(index=False))
+    assert sorted(orden_por_conglomerados(corr)) == sorted(corr.columns)
@@ -0,0 +1,33 @@
+# tests/test_data_cleaner.py
+# Las modas categóricas deben coincidir con Series.mode() en texto (str/object) y en category.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.data_cleaner import _moda_por_codigos, _modas_categoricas
+
+
+@pytest.fixture(scope='module')
+def datos():
+    rng = np.random.default_rng(0)
+    categorias = np.array(['Costa', 'Sierra', 'Selva', 'Lima', 'Rural', 'Urbano'], dtype=object)
+    datos = {}
+    for i in range(8):
+        valores = categorias[rng.integers(0, len(categorias), 2_000)]
+        valores[rng.random(2_000) < 0.1] = None
+        datos[f'c{i}'] = valores
+    # Empate exacto: gana el menor valor, como en Series.mode()
+    datos['empate'] = np.array(['Sierra', 'Costa'] * 1_000, dtype=object)
+    datos['vacia'] = np.full(2_000, None, dtype=object)
+    return datos
+
+
+@pytest.mark.parametrize('tipo', ['str', 'object', 'category'])
+def test_modas_categoricas_equivalen_a_series_mode(datos, tipo):
+    df = pd.DataFrame(datos).astype(tipo)
+    columnas = list(df.columns)
+    esperado = {col: moda.iloc[0] for col in columnas if not (moda := df[col].mode()).empty}
+    assert _modas_categoricas(df, columnas) == esperado
+    assert {col: _moda_por_codigos(*pd.factorize(df[col])) for col in columnas if col in esperado} == esperado
+    assert esperado['empate'] == 'Costa' and 'vacia' not in _modas_categoricas(df, columnas)
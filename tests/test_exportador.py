@@ -0,0 +1,111 @@
+# tests/test_exportador.py
+# Exportación por bloques: los archivos se leen de vuelta con los mismos datos y se reutilizan por versión.
+# Stata / SPSS: nombres válidos y etiquetas del codebook.
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.exportador import (MAX_NOMBRE_STATA, exportacion_lista, exportar, formatos_disponibles, nombres_stata,
+                                  obtener_exportacion, preparar_etiquetado)
+
+
+@pytest.fixture
+def df_prueba():
+    rng = np.random.default_rng(0)
+    n = 1_000
+    return pd.DataFrame({
+        'conglome': rng.integers(100000, 130000, n), 'p207': rng.choice([1.0, 2.0, np.nan], n),
+        'i524': rng.lognormal(7, 1, n), 'estrato': rng.choice(['urbano', 'rural', None], n),
+    })
+
+
+def _leer(ruta, formato):
+    if formato == 'parquet':
+        return pd.read_parquet(ruta)
+    if formato == 'feather':
+        return pd.read_feather(ruta)
+    return pd.read_csv(ruta, compression={'csv.gz': 'gzip', 'csv.zst': 'zstd', 'csv': None}[formato])
+
+
+@pytest.mark.parametrize('formato', ['csv', 'csv.gz', 'csv.zst', 'parquet', 'feather'])
+def test_ida_y_vuelta(df_prueba, formato, tmp_path):
+    if formato not in formatos_disponibles():
+        pytest.skip(f"{formato} no disponible")
+    # Bloques más chicos que el DataFrame: el encabezado y el esquema se escriben una sola vez
+    ruta = exportar(df_prueba, formato, tmp_path / f'datos.{formato}', tamano_bloque=300)
+    leido = _leer(ruta, formato)
+    if formato.startswith('csv'):
+        # CSV no guarda tipos: se comparan los valores, con los faltantes de texto como None
+        leido, esperado = (df.astype({'estrato': object}).where(df.notna(), None) for df in (leido, df_prueba))
+        pd.testing.assert_frame_equal(leido, esperado, check_dtype=False)
+    else:
+        pd.testing.assert_frame_equal(leido, df_prueba)
+
+
+def test_dataframe_vacio_escribe_el_encabezado(df_prueba, tmp_path):
+    ruta = exportar(df_prueba.iloc[:0], 'csv', tmp_path / 'vacio.csv')
+    assert pd.read_csv(ruta).columns.tolist() == df_prueba.columns.tolist()
+
+
+def test_formato_no_disponible(df_prueba):
+    with pytest.raises(ValueError):
+        exportar(df_prueba, 'xlsx')
+
+
+def test_se_reutiliza_por_version_y_se_borra_la_anterior(df_prueba):
+    dataset = {'df_limpio': df_prueba, 'version': 0}
+    assert not exportacion_lista(dataset, 'csv')
+    ruta = obtener_exportacion(dataset, 'csv')
+    assert exportacion_lista(dataset, 'csv') and obtener_exportacion(dataset, 'csv') == ruta
+
+    dataset.update(df_limpio=df_prueba.head(10), version=1)
+    assert not exportacion_lista(dataset, 'csv')
+    nueva = obtener_exportacion(dataset, 'csv')
+    assert nueva != ruta and not Path(ruta).exists() and len(pd.read_csv(nueva)) == 10
+    Path(nueva).unlink()
+
+
+def test_nombres_stata_validos_y_sin_repetidos():
+    largo = 'x' * 40
+    nombres = nombres_stata(['p1171$01', 'p1171_01', 'if', '2do', largo, largo[:-1] + 'y', 'p207'])
+    assert nombres['p207'] == 'p207' and nombres['p1171_01'] == 'p1171_01'
+    # La columna que ya era válida conserva su nombre; la saneada recibe un sufijo
+    assert nombres['p1171$01'] == 'p1171_01_1'
+    assert nombres['if'] == '_if' and nombres['2do'] == '_2do'
+    assert nombres[largo] == 'x' * MAX_NOMBRE_STATA and nombres[largo[:-1] + 'y'] == 'x' * 30 + '_1'
+    assert len(set(nombres.values())) == len(nombres) and all(len(n) <= MAX_NOMBRE_STATA for n in nombres.values())
+
+
+def test_preparar_etiquetado_usa_los_nombres_nuevos():
+    df = pd.DataFrame({'p207': [1.0, 2.0, np.nan], 'p1171$01': [10.5, 20.0, 0.0], 'estrato': [1, 8, 4]})
+    convertido, variables, valores = preparar_etiquetado(df, 2022, 'dta')
+    assert convertido.columns.tolist() == ['p207', 'p1171_01', 'estrato']
+    assert str(convertido['p207'].dtype) == 'Int8' and convertido['p1171_01'].dtype == 'float64'
+    assert variables['p207'] == 'Sexo' and variables['p1171_01'] == 'Gasto mensual en agua'
+    assert valores['p207'] == {1: 'Hombre', 2: 'Mujer'} and 'p1171_01' not in valores
+
+
+def test_dta_con_etiquetas(tmp_path):
+    df = pd.DataFrame({'p207': [1.0, 2.0, np.nan], 'p1171$01': [10.5, 20.0, 0.0], 'estrato': ['urbano', None, 'rural']})
+    ruta = exportar(df, 'dta', tmp_path / 'datos.dta', año=2022)
+    with pd.io.stata.StataReader(ruta) as lector:
+        leido = lector.read(convert_categoricals=False)
+        etiquetas_variables, etiquetas_valores = lector.variable_labels(), lector.value_labels()
+    assert leido.columns.tolist() == ['p207', 'p1171_01', 'estrato']
+    assert leido['p207'].tolist()[:2] == [1, 2] and pd.isna(leido['p207'].iloc[2])
+    assert leido['estrato'].tolist() == ['urbano', '', 'rural']
+    assert etiquetas_variables['p207'] == 'Sexo' and etiquetas_variables['p1171_01'] == 'Gasto mensual en agua'
+    assert etiquetas_valores['p207'] == {1: 'Hombre', 2: 'Mujer'}
+
+
+def test_sav_con_etiquetas(tmp_path):
+    pyreadstat = pytest.importorskip('pyreadstat')
+    df = pd.DataFrame({'p207': [1.0, 2.0, np.nan], 'estrato': ['urbano', None, 'rural']})
+    ruta = exportar(df, 'sav', tmp_path / 'datos.sav', año=2022)
+    leido, meta = pyreadstat.read_sav(str(ruta))
+    assert leido['p207'].tolist()[:2] == [1.0, 2.0] and pd.isna(leido['p207'].iloc[2])
+    assert meta.column_names_to_labels['p207'] == 'Sexo'
+    assert meta.variable_value_labels['p207'] == {1: 'Hombre', 2: 'Mujer'}
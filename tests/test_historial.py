@@ -0,0 +1,79 @@
+# tests/test_historial.py
+# Historial de versiones: deshacer / rehacer, ramas y columnas compartidas sin copias.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.historial import HistorialLimpieza, activar_version
+
+
+@pytest.fixture
+def df_original():
+    return pd.DataFrame({'p522': [1200.0, np.nan, 900.0, np.nan], 'p207': [1, 2, 2, 1],
+                         'texto': pd.Series(['a', None, 'b', 'a'], dtype=object)})
+
+
+def test_deshacer_y_rehacer(df_original):
+    historial = HistorialLimpieza(df_original)
+    imputado = df_original.assign(p522=df_original['p522'].fillna(1050.0))
+    v1 = historial.registrar(imputado, "Imputar p522")
+    v2 = historial.registrar(imputado[imputado['p207'] == 2], "Filtrar p207")
+
+    assert historial.deshacer() == v1 and historial.deshacer() == 0 and not historial.puede_deshacer()
+    pd.testing.assert_frame_equal(historial.materializar(), df_original)
+    assert historial.rehacer() == v1 and historial.rehacer() == v2 and not historial.puede_rehacer()
+    pd.testing.assert_frame_equal(historial.materializar(), imputado[imputado['p207'] == 2].reset_index(drop=True))
+
+
+def test_rama_nueva_desde_version_anterior(df_original):
+    historial = HistorialLimpieza(df_original)
+    v1 = historial.registrar(df_original.assign(p522=df_original['p522'].fillna(0.0)), "Rellenar con 0")
+    historial.deshacer()
+    v2 = historial.registrar(df_original.dropna(), "Eliminar nulos")
+
+    assert historial.versiones[v1].padre == historial.versiones[v2].padre == 0
+    assert sorted(historial.ramas()) == [v1, v2]
+    # Rehacer va al último hijo visitado; ir_a otra rama lo cambia
+    historial.deshacer()
+    assert historial.rehacer() == v2
+    historial.ir_a(v1)
+    historial.deshacer()
+    assert historial.rehacer() == v1
+    with pytest.raises(KeyError):
+        historial.ir_a(99)
+
+
+def test_columnas_compartidas(df_original):
+    historial = HistorialLimpieza(df_original)
+    imputado = df_original.assign(p522=df_original['p522'].fillna(1050.0))
+    v1 = historial.registrar(imputado, "Imputar p522")
+    v2 = historial.registrar(imputado.assign(texto=imputado['texto'].fillna('Desconocido')), "Imputar texto")
+    version1, version2 = historial.versiones[v1], historial.versiones[v2]
+
+    # Columnas sin cambios: None (se leen de df_original); las heredadas son el mismo objeto que en el padre
+    assert version1.columnas['p207'] is None and version1.columnas['texto'] is None
+    assert version2.columnas['p522'] is version1.columnas['p522']
+    assert version1.filas is version2.filas is historial.versiones[0].filas
+    # Solo la columna nueva cuenta como memoria propia de la versión
+    assert historial.bytes_propios(v2) == int(version2.columnas['texto'].memory_usage(index=False, deep=True))
+    assert historial.comparar(v1, v2)['columnas_con_cambios'] == ['texto']
+
+
+def test_registrar_exige_el_indice_original(df_original):
+    historial = HistorialLimpieza(df_original)
+    with pytest.raises(ValueError):
+        historial.registrar(df_original.set_axis(range(10, 14)), "Índice ajeno")
+
+
+def test_activar_version_crea_un_df_limpio_nuevo(df_original):
+    dataset = {'df_original': df_original, 'df_limpio': df_original}
+    activar_version(dataset)
+    anterior = dataset['df_limpio']
+    historial = dataset['historial']
+    historial.registrar(df_original.dropna(), "Eliminar nulos", {'codigos_faltantes': {'p522': 0}})
+    activar_version(dataset)
+    assert dataset['df_limpio'] is not anterior and dataset['version'] == historial.actual
+    assert len(dataset['df_limpio']) == 2 and dataset['reporte_faltantes'] == {'p522': 0}
+    activar_version(dataset, 0)
+    pd.testing.assert_frame_equal(dataset['df_limpio'], df_original)
@@ -0,0 +1,25 @@
+# tests/test_limpieza_por_bloques.py
+# La limpieza por bloques lee CSV comprimidos (.csv.gz) igual que los CSV planos.
+
+import numpy as np
+import pandas as pd
+
+from app.utils.limpieza_por_bloques import limpiar_archivo_por_bloques
+
+
+def test_csv_gz_da_el_mismo_resultado_que_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'Conglome': rng.integers(1, 50, 500), 'p522': np.where(rng.random(500) < 0.2, np.nan, rng.normal(1500, 300, 500)),
+                       'estrato': rng.choice(['urbano', 'rural', None], 500)})
+    df.to_csv(tmp_path / 'datos.csv', index=False, sep=';', encoding='latin-1')
+    df.to_csv(tmp_path / 'datos.csv.gz', index=False, sep=';', encoding='latin-1')
+
+    resumenes, resultados = [], []
+    for nombre in ('datos.csv', 'datos.csv.gz'):
+        salida = tmp_path / f'limpio_{nombre}.parquet'
+        resumenes.append(limpiar_archivo_por_bloques(tmp_path / nombre, salida, "Rellenar con la media",
+                                                     "Rellenar con 'Desconocido'", True, tamano_bloque=120))
+        resultados.append(pd.read_parquet(salida))
+    assert resumenes[1]['filas_leidas'] == len(df) and resumenes[0]['filas_escritas'] == resumenes[1]['filas_escritas']
+    pd.testing.assert_frame_equal(resultados[0], resultados[1])
+    assert list(resultados[1].columns) == ['conglome', 'p522', 'estrato'] and resultados[1].notna().all(axis=None)
@@ -0,0 +1,51 @@
+# tests/test_panel.py
+# El panel de varios años debe tener los mismos valores que pd.concat con los esquemas alineados.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.panel import construir_panel
+
+
+@pytest.fixture(scope='module')
+def frames():
+    # Tres años simulados de un módulo de personas: 'sexo' se llama p207 desde 2022, i524 falta en 2021
+    rng = np.random.default_rng(0)
+    n = 20_000
+    departamentos = np.array([f"{d:02d}0101" for d in range(1, 26)])
+    frames = {}
+    for año in (2021, 2022, 2023):
+        df = pd.DataFrame({
+            'AÑO': str(año), 'conglome': rng.integers(1, 40000, n), 'hogar': rng.integers(11, 13, n).astype(np.int16),
+            'ubigeo': rng.choice(departamentos, n), 'p207': rng.choice([1.0, 2.0, np.nan], n),
+            'estrato': rng.choice(['urbano', 'rural', None], n),
+        })
+        if año >= 2022:
+            df['i524'] = rng.lognormal(7, 1, n)
+        if año == 2021:
+            df = df.rename(columns={'p207': 'sexo'}).astype({'conglome': 'Int64'})
+        frames[año] = df
+    return frames
+
+
+def test_equivale_a_concat(frames):
+    panel = construir_panel(frames, renombres={2021: {'sexo': 'p207'}})
+    referencia = pd.concat([df.rename(columns={'sexo': 'p207', 'AÑO': 'año'}).rename(columns=str.lower).assign(año=año)
+                            for año, df in frames.items()], ignore_index=True)
+    assert len(panel) == len(referencia) and set(panel.columns) == set(referencia.columns)
+    for columna in referencia.columns:
+        esperado, obtenido = referencia[columna], panel[columna]
+        if isinstance(obtenido.dtype, pd.CategoricalDtype):
+            assert (obtenido.astype(object).fillna('<NA>').to_numpy() == esperado.astype(object).fillna('<NA>').to_numpy()).all(), columna
+        else:
+            assert np.allclose(obtenido.to_numpy(dtype='float64'), pd.to_numeric(esperado).to_numpy(dtype='float64'), equal_nan=True), columna
+
+
+def test_columnas_incompletas_y_textos(frames):
+    panel = construir_panel(frames, renombres={2021: {'sexo': 'p207'}})
+    filas_2021 = len(frames[2021])
+    assert panel['i524'].iloc[:filas_2021].isna().all() and panel.attrs['panel']['columnas_incompletas'] == ['i524']
+    assert panel.attrs['panel']['renombres'][2021] == {'sexo': 'p207'}
+    # El ubigeo se conserva como texto, con sus ceros a la izquierda
+    assert '010101' in panel['ubigeo'].cat.categories
@@ -0,0 +1,83 @@
+# tests/test_uniones.py
+# Unión de módulos por claves: equivalencia con pd.merge, claves nulas y de distinto tipo, validación y estimación.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.uniones import claves_comunes, emparejar, estimar_union, unir_datasets
+
+
+@pytest.mark.parametrize('how', ['left', 'inner'])
+@pytest.mark.parametrize('estrategia', ['auto', 'hash', 'orden'])
+def test_claves_nulas_repetidas_a_la_derecha(how, estrategia):
+    izq = pd.DataFrame({'conglome': [1, 2, 3, 4], 'a': list('wxyz')})
+    der = pd.DataFrame({'conglome': [1, 2, np.nan, np.nan], 'b': [10, 20, 30, 40]})
+    unido = unir_datasets(izq, der, ['conglome'], how=how, estrategia=estrategia)
+    assert unido['conglome'].tolist() == ([1, 2, 3, 4] if how == 'left' else [1, 2])
+    assert unido['b'].tolist()[:2] == [10, 20]
+    if how == 'left':
+        assert unido['b'].iloc[2:].isna().all()
+
+
+def test_hash_nunca_empareja_nulos():
+    ids_izq = np.array([0, -1, 1, 2])
+    ids_der = np.array([-1, 1, -1, 0])
+    pos_izq, pos_der, estrategia = emparejar(ids_izq, ids_der, 'left', 'hash')
+    assert estrategia == 'hash'
+    assert pos_izq.tolist() == [0, 1, 2, 3]
+    assert pos_der.tolist() == [3, -1, 1, -1]
+
+
+@pytest.mark.parametrize('how', ['left', 'inner'])
+def test_equivale_a_merge(how):
+    rng = np.random.default_rng(0)
+    izq = pd.DataFrame({'conglome': rng.integers(0, 50, 500), 'hogar': rng.integers(11, 13, 500), 'x': rng.normal(size=500)})
+    der = pd.DataFrame({'conglome': np.arange(40).repeat(2), 'hogar': np.tile([11, 12], 40), 'y': rng.normal(size=80)})
+    unido = unir_datasets(izq, der, ['conglome', 'hogar'], how=how)
+    esperado = izq.merge(der, on=['conglome', 'hogar'], how=how)
+    pd.testing.assert_frame_equal(unido.reset_index(drop=True), esperado, check_dtype=False)
+
+
+@pytest.fixture(scope='module')
+def modulos():
+    # Módulos simulados de hogares y personas; conglome es texto en uno y número en el otro
+    rng = np.random.default_rng(0)
+    hogares = pd.DataFrame({
+        'conglome': rng.integers(1000, 9000, 20_000).astype(str), 'vivienda': rng.integers(1, 30, 20_000),
+        'hogar': rng.integers(11, 13, 20_000), 'inghog1d': rng.lognormal(9, 1, 20_000),
+    }).drop_duplicates(['conglome', 'vivienda', 'hogar'], ignore_index=True)
+    personas = hogares.sample(60_000, replace=True, random_state=0)[['conglome', 'vivienda', 'hogar']].reset_index(drop=True)
+    personas['codperso'] = personas.groupby(['conglome', 'vivienda', 'hogar']).cumcount() + 1
+    personas['p208a'] = rng.integers(0, 99, len(personas))
+    personas = pd.concat([personas, pd.DataFrame({'conglome': ['x'], 'vivienda': [1], 'hogar': [11], 'codperso': [1], 'p208a': [30]})],
+                         ignore_index=True)
+    personas['conglome'] = personas['conglome'].where(personas['conglome'] == 'x', pd.to_numeric(personas['conglome'], errors='coerce'))
+    # Referencia: las claves de texto ya normalizadas a mano
+    personas_texto = personas.assign(conglome=personas['conglome'].map(lambda v: v if v == 'x' else str(int(v))))
+    return hogares, personas, personas_texto
+
+
+def test_muchos_a_uno_con_claves_de_distinto_tipo(modulos):
+    hogares, personas, personas_texto = modulos
+    claves = claves_comunes(personas, hogares)
+    unido = unir_datasets(personas, hogares, claves, how='left', validar='m:1')
+    referencia = personas_texto.merge(hogares, on=claves, how='left', validate='m:1')
+    assert np.allclose(unido['inghog1d'].to_numpy(), referencia['inghog1d'].to_numpy(), equal_nan=True)
+    assert unido.attrs['union']['relacion'] == 'm:1' and unido.attrs['union']['filas_con_pareja'] == len(personas) - 1
+
+
+def test_uno_a_muchos_y_estimacion(modulos):
+    hogares, personas, personas_texto = modulos
+    claves = claves_comunes(personas, hogares)
+    invertido = unir_datasets(hogares, personas, claves, how='inner', columnas_der=['codperso', 'p208a'])
+    referencia = hogares.merge(personas_texto, on=claves, how='inner')
+    assert len(invertido) == len(referencia) > 0 and invertido['p208a'].sum() == referencia['p208a'].sum()
+    estimado = estimar_union(hogares, personas, claves, how='inner', columnas_der=['codperso', 'p208a'])
+    assert estimado['filas'] == len(invertido) and estimado['relacion'] == '1:m'
+
+
+def test_rechaza_relacion_no_valida(modulos):
+    hogares, personas, _ = modulos
+    with pytest.raises(ValueError):
+        unir_datasets(hogares, personas, claves_comunes(personas, hogares), validar='1:1')